@@ -0,0 +1,219 @@
+"""
+Eşzamanlı anlık görüntüler üzerinde borsalar arası arbitraj tarayıcı
+
+Özet dosyasındaki arbitrage_opportunity günün en yüksek bid'i ile en düşük
+ask'ini farklı anlardan alır; bu fırsatlar gerçekte hiç var olmamış olabilir.
+Bu modül kayıtları aynı turda alınan kotasyonlardan oluşan anlık görüntülere
+(snapshot) ayırır ve her görüntüde, komisyonlar düşüldükten sonra en kârlı
+alış/satış borsası çiftini, bid_qty/ask_qty ile sınırlı işlem büyüklüğünü ve
+fırsatın kaç görüntü boyunca sürdüğünü NumPy ile vektörel olarak hesaplar.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+import columnar_archive
+
+# Varsayılan taker komisyon oranları (hesap seviyesine göre değişir)
+DEFAULT_FEES = {
+    'Binance': 0.001,
+    'OKX': 0.001,
+    'Coinbase': 0.006,
+    'Kraken': 0.004,
+    'Bybit': 0.001,
+    'KuCoin': 0.001,
+}
+
+# Bir anlık görüntünün ilk kaydından itibaren kapsayabileceği azami süre
+DEFAULT_MAX_GAP_MS = 5000
+
+# Bir fırsatın kesintisiz sayılması için ardışık görüntüler arasındaki azami süre
+DEFAULT_MAX_RUN_GAP_MS = 120000
+
+Snapshots = namedtuple('Snapshots', ['times', 'bid', 'ask', 'bid_qty', 'ask_qty'])
+
+
+def _assign_snapshots(timestamps, exchange_ids, max_gap_ms):
+    """
+    Sıralı kayıtlara görüntü numarası verir
+
+    Bir görüntünün sınırı bir önceki görüntünün başlangıcına bağlıdır; bu yüzden
+    önce her kayıt için, görüntü o kayıtta başlasaydı sonraki görüntünün nerede
+    başlayacağı vektörel olarak hesaplanır: pencere sonu searchsorted ile, borsa
+    tekrarı aynı borsanın bir önceki kaydının konumundan. Gerçek başlangıçlar
+    ilk kayıttan başlayan bu zincirdir ve işaretçi ikiye katlamayla log(görüntü
+    sayısı) adımda işaretlenir.
+    """
+    count = timestamps.size
+    positions = np.arange(count)
+    window_end = np.searchsorted(timestamps, timestamps + max_gap_ms, side='right')
+
+    # Borsaya göre sıralı kayıtlarda ardışık çiftler aynı borsanın önceki ve sonraki kaydıdır
+    by_exchange = np.lexsort((positions, exchange_ids))
+    same = exchange_ids[by_exchange[1:]] == exchange_ids[by_exchange[:-1]]
+    repeat_end = np.full(count + 1, count, dtype=np.int64)
+    repeat_end[by_exchange[:-1][same]] = by_exchange[1:][same]
+    # s'de başlayan görüntüde önceki kaydı s veya sonrasında olan ilk kayıt
+    repeat_end = np.minimum.accumulate(repeat_end[::-1])[::-1]
+
+    jump = np.empty(count + 1, dtype=np.int64)
+    jump[:count] = np.minimum(window_end, repeat_end[:count])
+    jump[count] = count
+    starts = np.zeros(count + 1, dtype=bool)
+    starts[0] = True
+    # starts: zincirin ilk 2^k halkası, jump: 2^k adım ileri
+    while jump[0] < count:
+        starts[jump[np.flatnonzero(starts)]] = True
+        jump = jump[jump]
+    return np.cumsum(starts[:count]) - 1
+
+
+def build_snapshots(timestamps, exchange_ids, bid, ask, bid_qty, ask_qty, exchange_count,
+                    max_gap_ms=DEFAULT_MAX_GAP_MS):
+    """
+    Kotasyonları anlık görüntü x borsa matrislerine yerleştirir
+
+    Zaman sırasına dizilmiş kayıtlarda yeni bir görüntü, görüntüde zaten
+    bulunan bir borsanın kaydı geldiğinde (bir sonraki tur) veya kayıt
+    görüntünün ilk kaydından max_gap_ms'den daha sonra olduğunda başlar.
+    Pencere ilk kayda sabitlendiğinden 1 sn aralıklı turlar tek bir görüntüde
+    birleşmez. Kotasyonu olmayan hücreler NaN kalır.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if timestamps.size == 0:
+        empty = np.empty((0, exchange_count))
+        return Snapshots(np.empty(0, dtype=np.int64), empty, empty, empty, empty)
+
+    order = np.argsort(timestamps, kind='stable')
+    timestamps = timestamps[order]
+    snapshot_ids = _assign_snapshots(timestamps, np.asarray(exchange_ids)[order], max_gap_ms)
+    snapshot_count = int(snapshot_ids[-1]) + 1
+    starts = np.flatnonzero(np.concatenate(([True], np.diff(snapshot_ids) > 0)))
+
+    columns = []
+    for values in (bid, ask, bid_qty, ask_qty):
+        matrix = np.full((snapshot_count, exchange_count), np.nan)
+        matrix[snapshot_ids, np.asarray(exchange_ids)[order]] = np.asarray(values, dtype=np.float64)[order]
+        columns.append(matrix)
+
+    return Snapshots(timestamps[starts], *columns)
+
+
+def best_pairs(snapshots, fee_rates):
+    """
+    Her anlık görüntü için en kârlı (alış borsası, satış borsası) çiftini bulur
+
+    Parameters:
+    snapshots (Snapshots): build_snapshots çıktısı
+    fee_rates (np.ndarray): Borsa kimliğine göre taker komisyon oranları
+
+    Returns:
+    dict: buy, sell (borsa kimliği, çift yoksa -1), spread (birim başına net kâr),
+          size (BTC, miktar bilinmiyorsa NaN), profit (spread * size)
+    """
+    fee_rates = np.asarray(fee_rates, dtype=np.float64)
+    buy_cost = snapshots.ask * (1 + fee_rates)       # (görüntü, alış borsası)
+    sell_revenue = snapshots.bid * (1 - fee_rates)   # (görüntü, satış borsası)
+
+    # spread[s, i, j]: i'den alıp j'ye satmanın birim başına net kârı
+    spread = sell_revenue[:, None, :] - buy_cost[:, :, None]
+    exchange_count = fee_rates.size
+    spread[:, np.arange(exchange_count), np.arange(exchange_count)] = np.nan
+
+    flat = spread.reshape(len(spread), -1)
+    has_pair = ~np.all(np.isnan(flat), axis=1)
+    best = np.zeros(len(flat), dtype=np.int64)
+    best[has_pair] = np.nanargmax(flat[has_pair], axis=1)
+
+    rows = np.arange(len(flat))
+    buy = np.where(has_pair, best // exchange_count, -1)
+    sell = np.where(has_pair, best % exchange_count, -1)
+    best_spread = np.where(has_pair, flat[rows, best], np.nan)
+
+    # Büyüklük iki tarafın miktarından küçük olanıdır; biri bilinmiyorsa NaN kalır
+    ask_qty = snapshots.ask_qty[rows, np.maximum(buy, 0)]
+    bid_qty = snapshots.bid_qty[rows, np.maximum(sell, 0)]
+    size = np.where(has_pair, np.minimum(ask_qty, bid_qty), np.nan)
+
+    return {
+        'buy': buy,
+        'sell': sell,
+        'spread': best_spread,
+        'size': size,
+        'profit': best_spread * size,
+    }
+
+
+def find_opportunities(snapshots, pairs, exchange_names, min_spread=0.0, max_run_gap_ms=DEFAULT_MAX_RUN_GAP_MS):
+    """
+    Aynı çiftin art arda kârlı kaldığı görüntüleri tek bir fırsat olarak birleştirir
+
+    İki görüntü arasında max_run_gap_ms'den uzun boşluk varsa (ör. toplayıcı
+    durmuşsa) fırsat orada bölünür.
+
+    Returns:
+    list: Her fırsat için başlangıç/bitiş zamanı, süre, borsalar, en yüksek net
+          spread, büyüklük ve kâr
+    """
+    profitable = pairs['spread'] > min_spread
+    if not profitable.any():
+        return []
+
+    exchange_count = len(exchange_names)
+    key = np.where(profitable, pairs['buy'] * exchange_count + pairs['sell'], -1)
+    breaks = (key[1:] != key[:-1]) | (np.diff(snapshots.times) > max_run_gap_ms)
+    run_starts = np.flatnonzero(np.concatenate(([True], breaks)))
+    run_ends = np.concatenate((run_starts[1:], [len(key)])) - 1
+
+    # reduceat tüm dilimler üzerinde çalıştırılır, sonra yalnızca kârlı dilimler seçilir
+    spread_max = np.fmax.reduceat(pairs['spread'], run_starts)
+    size_max = np.fmax.reduceat(pairs['size'], run_starts)
+    profit_max = np.fmax.reduceat(pairs['profit'], run_starts)
+
+    selected = key[run_starts] >= 0
+    run_starts, run_ends = run_starts[selected], run_ends[selected]
+    spread_max, size_max, profit_max = spread_max[selected], size_max[selected], profit_max[selected]
+
+    opportunities = []
+    for index, (start, end) in enumerate(zip(run_starts, run_ends)):
+        opportunities.append({
+            'start': int(snapshots.times[start]),
+            'end': int(snapshots.times[end]),
+            'duration_ms': int(snapshots.times[end] - snapshots.times[start]),
+            'snapshots': int(end - start + 1),
+            'buy_exchange': exchange_names[pairs['buy'][start]],
+            'sell_exchange': exchange_names[pairs['sell'][start]],
+            'max_net_spread': float(spread_max[index]),
+            'max_size': None if np.isnan(size_max[index]) else float(size_max[index]),
+            'max_profit': None if np.isnan(profit_max[index]) else float(profit_max[index]),
+        })
+    return opportunities
+
+
+def _fee_array(exchange_names, fees):
+    """Borsa sözlüğü sırasında komisyon dizisi oluşturur"""
+    fees = DEFAULT_FEES if fees is None else fees
+    return np.array([fees.get(name, 0.0) for name in exchange_names])
+
+
+def scan_columns(columns, exchange_names, fees=None, max_gap_ms=DEFAULT_MAX_GAP_MS, min_spread=0.0):
+    """columnar_archive sütunları üzerinde arbitraj taraması yapar"""
+    snapshots = build_snapshots(columns['timestamp'], columns['exchange'], columns['bid'], columns['ask'],
+                                columns['bid_qty'], columns['ask_qty'], len(exchange_names), max_gap_ms)
+    pairs = best_pairs(snapshots, _fee_array(exchange_names, fees))
+    return find_opportunities(snapshots, pairs, exchange_names, min_spread)
+
+
+def scan_range(start_date, end_date, fees=None, max_gap_ms=DEFAULT_MAX_GAP_MS, min_spread=0.0,
+               archive_dir=columnar_archive.ARCHIVE_DIR):
+    """Sütunlu arşivdeki tarih aralığını (her iki uç dahil) tarar"""
+    columns = columnar_archive.load_range(start_date, end_date, archive_dir=archive_dir)
+    exchange_names = columnar_archive.load_dictionary(archive_dir)
+    return scan_columns(columns, exchange_names, fees, max_gap_ms, min_spread)
+
+
+def scan_records(records, fees=None, max_gap_ms=DEFAULT_MAX_GAP_MS, min_spread=0.0):
+    """btc_prices kayıt listesi üzerinde arbitraj taraması yapar"""
+    exchange_names = []
+    columns = columnar_archive.records_to_columns(records, exchange_names)
+    return scan_columns(columns, exchange_names, fees, max_gap_ms, min_spread)
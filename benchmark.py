@@ -0,0 +1,664 @@
+"""
+Performans ölçüm betikleri
+
+Kullanım:
+    python benchmark.py summary [--ticks 1440] [--exchanges 6]
+    python benchmark.py archive [--days 7] [--ticks 1440]
+    python benchmark.py arbitrage [--days 30] [--ticks 1440]
+    python benchmark.py pipeline [--days 2] [--ticks 1440] [--rate 0] [--seed-data data]
+    python benchmark.py parse [--records 20000]
+    python benchmark.py startup [--runs 10] [--seed-data data]
+    python benchmark.py sharded [--workers 1 2 4] [--copies 20] [--ticks 50] [--seed-data data]
+    python benchmark.py depth [--levels 50] [--snapshots 600]
+"""
+import argparse
+import contextlib
+import glob
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import daily_summary
+import tick_storage
+
+EXCHANGES = ['Binance', 'OKX', 'Coinbase', 'Kraken', 'Bybit', 'KuCoin']
+
+
+def legacy_summary(date, data):
+    """Eski create_daily_summary'nin pandas ile tüm günü yeniden hesaplayan sürümü (karşılaştırma için)"""
+    import pandas as pd
+
+    df = pd.DataFrame(data)
+    if df.empty:
+        return None
+
+    min_ask = df.loc[df['ask'] == df['ask'].min()]
+    max_bid = df.loc[df['bid'] == df['bid'].max()]
+    latest_data = df.groupby('exchange').last().reset_index()
+    return {
+        'date': date,
+        'latest_update': None,
+        'best_exchange_to_buy': min_ask['exchange'].values[0] if not min_ask.empty else None,
+        'best_exchange_to_sell': max_bid['exchange'].values[0] if not max_bid.empty else None,
+        'arbitrage_opportunity': float(max_bid['bid'].values[0] - min_ask['ask'].values[0]) if not min_ask.empty and not max_bid.empty else 0,
+        'exchange_data': latest_data.to_dict('records')
+    }
+
+
+def _comparable(summary):
+    """latest_update dışındaki alanları NaN dahil karşılaştırılabilir JSON metnine çevirir"""
+    summary = dict(summary, latest_update=None)
+    return json.dumps(summary, sort_keys=False, default=str)
+
+
+def generate_tick(tick_time, exchanges, price):
+    """Sentetik bir turun kayıtlarını üretir"""
+    records = []
+    for exchange in exchanges:
+        bid = round(price + random.uniform(-30, 30), 2)
+        records.append({
+            'exchange': exchange,
+            'timestamp': tick_time.strftime('%Y-%m-%d %H:%M:%S'),
+            'bid': bid,
+            'ask': round(bid + random.uniform(0.01, 2), 2),
+            'bid_qty': None if exchange == 'KuCoin' else round(random.uniform(0.001, 5), 8),
+            'ask_qty': None if exchange == 'KuCoin' else round(random.uniform(0.001, 5), 8)
+        })
+    return records
+
+
+def verify_existing_days(data_dir):
+    """data/ altındaki günler için artımlı özetin pandas sonucuyla aynı olduğunu doğrular"""
+    dates = sorted({os.path.basename(path).split('_')[-1].split('.')[0]
+                    for path in glob.glob(os.path.join(data_dir, 'btc_prices_*'))})
+    for date in dates:
+        records = tick_storage.read_day(date, data_dir)
+        engine = daily_summary.DailySummary(date)
+        engine.update(records)
+        same = _comparable(engine.to_dict()) == _comparable(legacy_summary(date, records))
+        print(f"{date}: {len(records)} kayıt, pandas çıktısıyla {'aynı' if same else 'FARKLI'}")
+
+
+def bench_summary(ticks, exchanges):
+    """Simüle edilmiş bir günde artımlı özet ile tam yeniden hesaplamayı karşılaştırır"""
+    random.seed(42)
+    exchanges = EXCHANGES[:exchanges]
+    data_dir = tempfile.mkdtemp(prefix='btc-bench-')
+    date = '2025-01-01'
+    start_time = datetime(2025, 1, 1)
+    price = 84000.0
+
+    all_records = []
+    incremental_times = []
+    legacy_times = []
+    try:
+        for tick in range(ticks):
+            price += random.uniform(-20, 20)
+            records = generate_tick(start_time + timedelta(seconds=tick * 86400 / ticks), exchanges, price)
+            all_records.extend(records)
+
+            started = time.perf_counter()
+            end_offset = tick_storage.append_records(date, records, data_dir)
+            daily_summary.update_daily_summary(date, records, end_offset, data_dir)
+            incremental_times.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            legacy = legacy_summary(date, all_records)
+            legacy_times.append(time.perf_counter() - started)
+
+        final = daily_summary.get_engine(date, data_dir).to_dict()
+        same = _comparable(final) == _comparable(legacy)
+    finally:
+        shutil.rmtree(data_dir)
+
+    buckets = 8
+    size = max(1, ticks // buckets)
+    print(f"{ticks} tur x {len(exchanges)} borsa ({ticks * len(exchanges)} kayıt)")
+    print(f"{'dilim':>12} {'artımlı ms/tur':>16} {'pandas ms/tur':>16}")
+    for index in range(0, ticks, size):
+        incremental = incremental_times[index:index + size]
+        legacy = legacy_times[index:index + size]
+        print(f"{index:>5}-{index + len(incremental) - 1:<6} "
+              f"{sum(incremental) / len(incremental) * 1000:>16.3f} "
+              f"{sum(legacy) / len(legacy) * 1000:>16.3f}")
+    print(f"Son özet pandas çıktısıyla {'aynı' if same else 'FARKLI'}")
+
+
+def bench_archive(days, ticks):
+    """Çok günlük aralık taramasını JSON ayrıştırma ile sütunlu arşiv üzerinde karşılaştırır"""
+    import numpy as np
+    import columnar_archive
+
+    random.seed(42)
+    data_dir = tempfile.mkdtemp(prefix='btc-bench-')
+    archive_dir = os.path.join(data_dir, 'columnar')
+    first_day = datetime(2025, 1, 1)
+    price = 84000.0
+    try:
+        dates = []
+        for day in range(days):
+            start_time = first_day + timedelta(days=day)
+            date = start_time.strftime('%Y-%m-%d')
+            records = []
+            for tick in range(ticks):
+                price += random.uniform(-20, 20)
+                records.extend(generate_tick(start_time + timedelta(seconds=tick * 86400 / ticks), EXCHANGES, price))
+            tick_storage.atomic_write_json(tick_storage.legacy_json_path(date, data_dir), records)
+            columnar_archive.write_day(date, records, archive_dir)
+            dates.append(date)
+
+        json_bytes = sum(os.path.getsize(tick_storage.legacy_json_path(date, data_dir)) for date in dates)
+        archive_bytes = sum(os.path.getsize(os.path.join(root, name))
+                            for root, _, names in os.walk(archive_dir) for name in names)
+
+        # Eski yöntem: her günü json.load ile okuyup borsa bazında ortalama orta fiyat
+        started = time.perf_counter()
+        totals = {}
+        for date in dates:
+            for record in tick_storage.read_day(date, data_dir):
+                total = totals.setdefault(record['exchange'], [0.0, 0])
+                total[0] += (record['bid'] + record['ask']) / 2
+                total[1] += 1
+        json_seconds = time.perf_counter() - started
+
+        # Sütunlu arşiv: aynı hesap memmap üzerinde vektörel olarak
+        started = time.perf_counter()
+        columns = columnar_archive.load_range(dates[0], dates[-1], columns=('exchange', 'bid', 'ask'),
+                                              archive_dir=archive_dir)
+        mid = (columns['bid'] + columns['ask']) / 2
+        sums = np.bincount(columns['exchange'], weights=mid)
+        counts = np.bincount(columns['exchange'])
+        archive_seconds = time.perf_counter() - started
+    finally:
+        shutil.rmtree(data_dir)
+
+    rows = days * ticks * len(EXCHANGES)
+    print(f"{days} gün, {rows} kayıt")
+    print(f"JSON:        {json_bytes / 1e6:8.2f} MB, tarama {json_seconds * 1000:9.1f} ms")
+    print(f"Sütunlu:     {archive_bytes / 1e6:8.2f} MB, tarama {archive_seconds * 1000:9.1f} ms "
+          f"({json_seconds / archive_seconds:.0f}x)")
+    print(f"Kontrol: JSON {sum(total[1] for total in totals.values())} satır, sütunlu {int(counts.sum())} satır "
+          f"(ilk borsa ortalaması {sums[0] / counts[0]:.2f})")
+
+
+def bench_arbitrage(days, ticks):
+    """Bir aylık sentetik tick verisi üzerinde arbitraj taramasının süresini ölçer"""
+    import numpy as np
+
+    import columnar_archive
+    import arbitrage_scanner
+
+    random.seed(42)
+    names = []
+    records = []
+    first_day = datetime(2025, 1, 1)
+    price = 84000.0
+    for tick in range(days * ticks):
+        price += random.uniform(-20, 20)
+        records.extend(generate_tick(first_day + timedelta(seconds=tick * 86400 / ticks), EXCHANGES, price))
+    columns = columnar_archive.records_to_columns(records, names)
+
+    started = time.perf_counter()
+    opportunities = arbitrage_scanner.scan_columns(columns, names, fees={})
+    seconds = time.perf_counter() - started
+    print(f"{days} gün, {len(records)} kayıt: tarama {seconds * 1000:.1f} ms, "
+          f"{len(opportunities)} komisyonsuz fırsat")
+
+    # Taramanın görüntü sınırlarını belirleyen adımı ayrıca ölçülür
+    order = np.argsort(columns['timestamp'], kind='stable')
+    timestamps = np.asarray(columns['timestamp'], dtype=np.int64)[order]
+    exchange_ids = np.asarray(columns['exchange'])[order]
+    started = time.perf_counter()
+    arbitrage_scanner._assign_snapshots(timestamps, exchange_ids, arbitrage_scanner.DEFAULT_MAX_GAP_MS)
+    print(f"Görüntü sınırları: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+def _per_call_us(function, items, repeat=3):
+    """Fonksiyonun öğe başına en iyi ortalama süresi (mikrosaniye)"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            function(item)
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+    return best / len(items) * 1e6
+
+
+def _legacy_record(exchange, quote):
+    """Kayıt başına datetime.now(pytz.UTC).strftime çağıran eski kayıt oluşturma (karşılaştırma için)"""
+    import pytz
+
+    bid, ask, bid_qty, ask_qty = quote
+    return {
+        'exchange': exchange,
+        'timestamp': datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S'),
+        'bid': bid,
+        'ask': ask,
+        'bid_qty': bid_qty,
+        'ask_qty': ask_qty
+    }
+
+
+def bench_parse(count):
+    """
+    Yanıt çözümleme ve kayıt oluşturma mikro ölçümleri
+
+    Borsa yanıtları replay_stub'ın yanıt biçimleriyle, NDJSON satırları
+    tick_storage'ın satır biçimiyle üretilir. Standart json modülü ile
+    fast_json arka ucu (orjson kuruluysa) karşılaştırılır.
+    """
+    import exchanges
+    import fast_json
+    import replay_stub
+
+    random.seed(42)
+    records = []
+    first_day = datetime(2025, 1, 1)
+    while len(records) < count:
+        records.extend(generate_tick(first_day + timedelta(seconds=len(records)), EXCHANGES, 84000.0))
+    records = records[:count]
+    print(f"JSON arka ucu: {fast_json.BACKEND}")
+
+    print("Borsa yanıtı başına çözümleme + ayrıştırma (µs):")
+    for path, (name, render) in replay_stub.ROUTES.items():
+        adapter = exchanges.REGISTRY[name]
+        payloads = [json.dumps(render(record)).encode() for record in records[:max(1, count // 10)]]
+        line = f"  {name:<9} {path:<34} json {_per_call_us(json.loads, payloads):6.2f}"
+        if fast_json.BACKEND != 'json':
+            line += f"  {fast_json.BACKEND} {_per_call_us(fast_json.loads, payloads):6.2f}"
+        if adapter.parse_quote is not None:
+            venue_symbol = adapter.symbols[exchanges.DEFAULT_SYMBOL]
+            decoded = [fast_json.loads(payload) for payload in payloads]
+            parse_us = _per_call_us(lambda data: adapter.parse_quote(data, venue_symbol), decoded)
+            line += f"  ayrıştırma {parse_us:6.2f}"
+        print(line)
+
+    lines = [tick_storage._encode(record).encode() for record in records]
+    json_us = _per_call_us(json.loads, lines)
+    print(f"NDJSON satırı çözümleme ({len(lines)} satır): json {json_us:.2f} µs", end='')
+    if fast_json.BACKEND != 'json':
+        fast_us = _per_call_us(fast_json.loads, lines)
+        print(f", {fast_json.BACKEND} {fast_us:.2f} µs ({json_us / fast_us:.1f}x)", end='')
+    print()
+
+    quotes = [(record['exchange'], exchanges.Quote(record['bid'], record['ask'], record['bid_qty'], record['ask_qty']))
+              for record in records]
+    legacy_us = _per_call_us(lambda item: _legacy_record(*item), quotes)
+    new_us = _per_call_us(lambda item: exchanges.make_record(item[0], item[1]), quotes)
+    print(f"Kayıt oluşturma: kayıt başına zaman damgası {legacy_us:.2f} µs, "
+          f"önbellekli epoch-ms zaman damgası {new_us:.2f} µs ({legacy_us / new_us:.1f}x)")
+
+
+def percentile(values, q):
+    """Sıralı olmayan listede en yakın sıra yöntemiyle yüzdelik değer"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def peak_rss_mb():
+    """Sürecin en yüksek bellek kullanımı (MB); resource modülü yoksa None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux kilobayt, macOS bayt döndürür
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _seed_records(seed_data):
+    """Yeniden oynatma sunucusu için kayıtlar; seed_data boşsa sentetik bir gün"""
+    import replay_stub
+
+    seed_records = replay_stub.load_seed_records(seed_data) if seed_data else []
+    if not seed_records:
+        random.seed(42)
+        price = 84000.0
+        for tick in range(1440):
+            price += random.uniform(-20, 20)
+            seed_records.extend(generate_tick(datetime(2025, 1, 1) + timedelta(minutes=tick), EXCHANGES, price))
+        print(f"{seed_data} altında kayıt bulunamadı, sentetik veri kullanılıyor")
+    return seed_records
+
+
+def children_peak_rss_mb():
+    """Beklenen alt süreçlerin en yüksek bellek kullanımı (MB); resource modülü yoksa None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def bench_startup(runs, seed_data):
+    """
+    Cron çalıştırmasının soğuk başlangıç süresini ve bellek kullanımını ölçer
+
+    Her ölçüm yeni bir Python süreci başlatır: önce yalnızca
+    crypto_price_tracker modülü içe aktarılır, ardından betik geçici bir
+    klasörde yerel yeniden oynatma sunucusuna karşı tek tur olarak çalıştırılır.
+    İçe aktarma sırasında pandas veya numpy yüklenirse raporlanır.
+    """
+    import subprocess
+
+    import replay_stub
+
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    probe = ("import sys, crypto_price_tracker; "
+             "print(','.join(m for m in ('pandas', 'numpy', 'websockets') if m in sys.modules))")
+    loaded = subprocess.run([sys.executable, '-c', probe], cwd=source_dir, capture_output=True, text=True,
+                            check=True).stdout.strip()
+    print(f"İçe aktarmada yüklenen ağır modüller: {loaded or 'yok'}")
+
+    import_times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'import crypto_price_tracker'], cwd=source_dir, check=True)
+        import_times.append(time.perf_counter() - started)
+    import_rss = children_peak_rss_mb()
+
+    server = replay_stub.start_server(replay_stub.FixtureStore(_seed_records(seed_data)))
+    host, port = server.server_address[:2]
+    env = dict(os.environ, BTC_TRACKER_API_BASE=f'http://{host}:{port}')
+    work_dir = tempfile.mkdtemp(prefix='btc-startup-')
+    run_times = []
+    try:
+        for _ in range(runs):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, os.path.join(source_dir, 'crypto_price_tracker.py')], cwd=work_dir,
+                           env=env, stdout=subprocess.DEVNULL, check=True)
+            run_times.append(time.perf_counter() - started)
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    run_rss = children_peak_rss_mb()
+
+    print(f"{'ölçüm':>14} {'p50 ms':>10} {'en iyi ms':>10} {'RSS MB':>8}")
+    for name, times, rss in (('içe aktarma', import_times, import_rss), ('tek tur', run_times, run_rss)):
+        rss_text = f"{rss:.1f}" if rss is not None else '-'
+        print(f"{name:>14} {percentile(times, 0.5) * 1000:10.1f} {min(times) * 1000:10.1f} {rss_text:>8}")
+
+
+def bench_depth(levels, snapshots):
+    """
+    Derinlik kaydının tur başına CPU ve disk maliyetini ölçer
+
+    Altı borsanın yapay emir defterleri (replay_stub'ın derinlik yanıtları)
+    ayrıştırılır, sabit noktalı tamsayılara çevrilir, kodlanır ve üç tutar için
+    VWAP hesaplanır. Kayıt boyutu aynı seviyelerin JSON metin listesi olarak
+    saklanmasıyla karşılaştırılır.
+    """
+    import depth
+    import exchanges
+    import replay_stub
+
+    random.seed(42)
+    notionals = depth.DEFAULT_NOTIONALS
+    ticks = max(1, snapshots // len(EXCHANGES))
+    books = []
+    price = 84000.0
+    for tick in range(ticks):
+        price += random.uniform(-20, 20)
+        for record in generate_tick(datetime(2025, 1, 1) + timedelta(seconds=tick), EXCHANGES, price):
+            name = record['exchange']
+            path = exchanges.REGISTRY[name].depth_path.split('?')[0].replace('{symbol}', 'BTC-USD')
+            payload = replay_stub.DEPTH_ROUTES[path][1](record, levels)
+            books.append((name, exchanges.REGISTRY[name].parse_depth(payload, exchanges.REGISTRY[name].symbols['BTC/USDT'])))
+
+    started = time.perf_counter()
+    encoded = []
+    for name, (bids, asks) in books:
+        bid_side = depth.BookSide.from_text([(price, qty) for price, qty, *_ in bids[:levels]])
+        ask_side = depth.BookSide.from_text([(price, qty) for price, qty, *_ in asks[:levels]])
+        encoded.append(depth.encode_snapshot(1735689600000, name, 'BTC/USDT', bid_side, ask_side))
+        depth.vwap_record(name, 'BTC/USDT', '2025-01-01 00:00:00', bid_side, ask_side, notionals)
+    encode_us = (time.perf_counter() - started) / len(books) * 1e6
+
+    started = time.perf_counter()
+    for payload in encoded:
+        depth.decode_snapshot(payload[4:])
+    decode_us = (time.perf_counter() - started) / len(encoded) * 1e6
+
+    binary_bytes = sum(len(payload) for payload in encoded) / len(encoded)
+    json_bytes = sum(len(json.dumps({'bids': [[str(price), str(qty)] for price, qty, *_ in bids[:levels]],
+                                     'asks': [[str(price), str(qty)] for price, qty, *_ in asks[:levels]]},
+                                    separators=(',', ':'))) + 1
+                     for _, (bids, asks) in books) / len(books)
+    per_tick = len(EXCHANGES)
+    print(f"{len(books)} defter, taraf başına {levels} seviye")
+    print(f"Kodlama + VWAP: {encode_us:.0f} µs/defter ({encode_us * per_tick / 1000:.2f} ms/tur), "
+          f"çözme: {decode_us:.0f} µs/defter")
+    print(f"Kayıt boyutu: {binary_bytes:.0f} bayt (JSON metin listesi {json_bytes:.0f} bayt, "
+          f"{json_bytes / binary_bytes:.1f}x)")
+    print(f"Saniyede bir tur ile günlük disk: {binary_bytes * per_tick * 86400 / 1024 ** 2:.0f} MB "
+          f"(JSON {json_bytes * per_tick * 86400 / 1024 ** 2:.0f} MB)")
+
+
+def _free_port():
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def bench_sharded(worker_counts, copies, ticks, seed_data):
+    """
+    Çok süreçli toplayıcının çalışan sayısına göre verimini ölçer
+
+    Borsa planı copies kez çoğaltılarak çok sayıda (borsa, sembol) çifti
+    taklit edilir. Sunucu tarafı ölçümü sınırlamasın diye her çalışan kendi
+    replay_stub sürecine bağlanır. Turlar beklemeden art arda çalışır.
+    """
+    import subprocess
+
+    import exchanges
+    import sharded_runner
+
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    units = [(adapter.name, tuple(unit)) for adapter, unit in exchanges.plan_requests()] * copies
+    print(f"{len(units)} istek birimi x {ticks} tur, {os.cpu_count()} çekirdek")
+
+    stubs = []
+    ports = []
+    try:
+        for _ in range(max(worker_counts)):
+            port = _free_port()
+            stubs.append(subprocess.Popen([sys.executable, os.path.join(source_dir, 'replay_stub.py'),
+                                           '--port', str(port), '--data', seed_data], stdout=subprocess.DEVNULL))
+            ports.append(port)
+        time.sleep(1)
+
+        print(f"{'çalışan':>8} {'kayıt':>8} {'süre sn':>8} {'kayıt/sn':>10} {'hızlanma':>9}")
+        baseline = None
+        for workers in worker_counts:
+            work_dir = tempfile.mkdtemp(prefix='btc-sharded-')
+            try:
+                with contextlib.redirect_stdout(open(os.devnull, 'w')):
+                    started = time.perf_counter()
+                    merged = sharded_runner.run_sharded(
+                        workers=workers, units=units, interval=0, flush_interval=0.5, max_ticks=ticks,
+                        data_dir=work_dir, api_bases=[f'http://127.0.0.1:{port}' for port in ports[:workers]])
+                    seconds = time.perf_counter() - started
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            rate = merged / seconds
+            baseline = baseline or rate
+            print(f"{workers:>8} {merged:>8} {seconds:>8.2f} {rate:>10.0f} {rate / baseline:>8.2f}x")
+    finally:
+        for stub in stubs:
+            stub.terminate()
+            stub.wait()
+
+
+def bench_pipeline(days, ticks, rate, seed_data, output=None):
+    """
+    Toplama hattını kaydedilmiş yanıtlarla ağ erişimi olmadan uçtan uca çalıştırır
+
+    Yerel yeniden oynatma sunucusu seed_data altındaki kayıtları borsaların
+    yanıt biçiminde sunar. Her simüle edilen gün için ticks tur boyunca
+    collect_all_exchange_data ve save_data_to_file, gün başında
+    cleanup_old_data, gün sonunda create_daily_summary çalıştırılır. Günler
+    bugünden geriye doğru sayılır; böylece temizlik gerçek tarihlerle çalışır.
+    """
+    import crypto_price_tracker
+    import replay_stub
+
+    store = replay_stub.FixtureStore(_seed_records(seed_data))
+    server = replay_stub.start_server(store)
+    replay_stub.use_server(server)
+
+    work_dir = tempfile.mkdtemp(prefix='btc-bench-')
+    previous_dir = os.getcwd()
+    stages = {'collect': [], 'save': [], 'summary': [], 'cleanup': []}
+    tick_latencies = []
+    record_count = 0
+    today = datetime.now()
+    interval = 1.0 / rate if rate > 0 else 0
+    try:
+        os.chdir(work_dir)
+        os.makedirs('data')
+        started = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for day in range(days):
+                date = (today - timedelta(days=days - 1 - day)).strftime('%Y-%m-%d')
+
+                stage_start = time.perf_counter()
+                crypto_price_tracker.cleanup_old_data(max_days=7, max_files=30)
+                stages['cleanup'].append(time.perf_counter() - stage_start)
+
+                for tick in range(ticks):
+                    tick_start = time.perf_counter()
+                    data = crypto_price_tracker.collect_all_exchange_data()
+                    collected = time.perf_counter()
+                    if data:
+                        crypto_price_tracker.save_data_to_file(data, date)
+                        record_count += len(data)
+                    finished = time.perf_counter()
+                    stages['collect'].append(collected - tick_start)
+                    stages['save'].append(finished - collected)
+                    tick_latencies.append(finished - tick_start)
+                    store.advance()
+
+                    if interval:
+                        next_tick = started + (day * ticks + tick + 1) * interval
+                        time.sleep(max(0.0, next_tick - time.perf_counter()))
+
+                stage_start = time.perf_counter()
+                crypto_price_tracker.create_daily_summary(date)
+                stages['summary'].append(time.perf_counter() - stage_start)
+        elapsed = time.perf_counter() - started
+        data_bytes = sum(os.path.getsize(path) for path in glob.glob('data/*') if os.path.isfile(path))
+    finally:
+        os.chdir(previous_dir)
+        shutil.rmtree(work_dir)
+        server.shutdown()
+        crypto_price_tracker.http_session.close_session()
+
+    total_ticks = days * ticks
+    report = {
+        'days': days,
+        'ticks_per_day': ticks,
+        'target_rate': rate,
+        'elapsed_seconds': elapsed,
+        'ticks_per_second': total_ticks / elapsed,
+        'records_per_second': record_count / elapsed,
+        'records': record_count,
+        'tick_p50_ms': percentile(tick_latencies, 0.5) * 1000,
+        'tick_p99_ms': percentile(tick_latencies, 0.99) * 1000,
+        'stages': {name: {'p50_ms': percentile(values, 0.5) * 1000, 'p99_ms': percentile(values, 0.99) * 1000}
+                   for name, values in stages.items() if values},
+        'data_bytes': data_bytes,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+    print(f"{days} gün x {ticks} tur, {record_count} kayıt, {elapsed:.1f} sn")
+    print(f"Verim: {report['ticks_per_second']:.1f} tur/sn, {report['records_per_second']:.0f} kayıt/sn")
+    print(f"Tur gecikmesi: p50 {report['tick_p50_ms']:.2f} ms, p99 {report['tick_p99_ms']:.2f} ms")
+    print(f"{'adım':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, stage in report['stages'].items():
+        print(f"{name:>10} {stage['p50_ms']:>10.2f} {stage['p99_ms']:>10.2f}")
+    print(f"Son veri klasörü boyutu: {data_bytes / 1e6:.2f} MB")
+    if report['peak_rss_mb'] is not None:
+        print(f"En yüksek bellek kullanımı (RSS): {report['peak_rss_mb']:.1f} MB")
+    if output:
+        tick_storage.atomic_write_json(output, report)
+        print(f"Rapor {output} dosyasına yazıldı")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Veri toplama hattı performans ölçümleri')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    summary_parser = subparsers.add_parser('summary', help='Artımlı günlük özet ölçümü')
+    summary_parser.add_argument('--ticks', type=int, default=1440, help='Simüle edilen tur sayısı (varsayılan: 1440, 24 saat)')
+    summary_parser.add_argument('--exchanges', type=int, default=len(EXCHANGES), help='Borsa sayısı')
+    summary_parser.add_argument('--verify-data', default='data', help='Doğrulanacak mevcut veri klasörü')
+
+    archive_parser = subparsers.add_parser('archive', help='Sütunlu arşiv aralık taraması ölçümü')
+    archive_parser.add_argument('--days', type=int, default=7, help='Simüle edilen gün sayısı')
+    archive_parser.add_argument('--ticks', type=int, default=1440, help='Gün başına tur sayısı')
+
+    arbitrage_parser = subparsers.add_parser('arbitrage', help='Arbitraj tarayıcı ölçümü')
+    arbitrage_parser.add_argument('--days', type=int, default=30, help='Simüle edilen gün sayısı')
+    arbitrage_parser.add_argument('--ticks', type=int, default=1440, help='Gün başına tur sayısı')
+
+    pipeline_parser = subparsers.add_parser('pipeline', help='Kaydedilmiş yanıtlarla uçtan uca toplama hattı ölçümü')
+    pipeline_parser.add_argument('--days', type=int, default=2, help='Simüle edilen gün sayısı')
+    pipeline_parser.add_argument('--ticks', type=int, default=1440, help='Gün başına tur sayısı (gün uzunluğu)')
+    pipeline_parser.add_argument('--rate', type=float, default=0,
+                                 help='Saniyedeki tur sayısı (varsayılan: 0, olabildiğince hızlı)')
+    pipeline_parser.add_argument('--seed-data', default='data', help='Yanıtların üretileceği kayıt klasörü')
+    pipeline_parser.add_argument('--output', metavar='DOSYA', help='Raporun yazılacağı JSON dosyası')
+
+    parse_parser = subparsers.add_parser('parse', help='JSON çözümleme ve kayıt oluşturma mikro ölçümleri')
+    parse_parser.add_argument('--records', type=int, default=20000, help='Ölçülen kayıt sayısı')
+
+    startup_parser = subparsers.add_parser('startup', help='Soğuk başlangıç süresi ve bellek ölçümü')
+    startup_parser.add_argument('--runs', type=int, default=10, help='Ölçüm başına süreç sayısı')
+    startup_parser.add_argument('--seed-data', default='data', help='Yanıtların üretileceği kayıt klasörü')
+
+    sharded_parser = subparsers.add_parser('sharded', help='Çok süreçli toplayıcı ölçeklenme ölçümü')
+    sharded_parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Denenecek çalışan sayıları')
+    sharded_parser.add_argument('--copies', type=int, default=20,
+                                help='Borsa planının kaç kez çoğaltılacağı (çok sayıda çift taklidi)')
+    sharded_parser.add_argument('--ticks', type=int, default=50, help='Çalışan başına tur sayısı')
+    sharded_parser.add_argument('--seed-data', default='data', help='Yanıtların üretileceği kayıt klasörü')
+
+    depth_parser = subparsers.add_parser('depth', help='Derinlik kaydı kodlama, VWAP ve disk ölçümü')
+    depth_parser.add_argument('--levels', type=int, default=50, help='Taraf başına seviye sayısı')
+    depth_parser.add_argument('--snapshots', type=int, default=600, help='Ölçülen defter sayısı')
+
+    args = parser.parse_args(argv)
+    if args.command == 'depth':
+        bench_depth(args.levels, args.snapshots)
+    elif args.command == 'sharded':
+        bench_sharded(args.workers, args.copies, args.ticks, args.seed_data)
+    elif args.command == 'startup':
+        bench_startup(args.runs, args.seed_data)
+    elif args.command == 'parse':
+        bench_parse(args.records)
+    elif args.command == 'pipeline':
+        bench_pipeline(args.days, args.ticks, args.rate, args.seed_data, args.output)
+    elif args.command == 'arbitrage':
+        bench_arbitrage(args.days, args.ticks)
+    elif args.command == 'archive':
+        bench_archive(args.days, args.ticks)
+    elif args.command == 'summary':
+        if args.verify_data and os.path.isdir(args.verify_data):
+            verify_existing_days(args.verify_data)
+        bench_summary(args.ticks, args.exchanges)
+
+
+if __name__ == '__main__':
+    main()
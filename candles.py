@@ -0,0 +1,362 @@
+"""
+Çok çözünürlüklü mum (OHLC) özetleri
+
+Her borsa için 1m, 5m, 1h ve 1d çözünürlüklerinde orta fiyatın (bid+ask)/2
+açılış/en yüksek/en düşük/kapanış değerleri, spread (ask-bid) en düşük/en
+yüksek/ortalama değerleri ve ortalama bid_qty/ask_qty derinliği tutulur.
+
+Mumlar günlük özet gibi artımlı güncellenir: her tur yalnızca yeni kayıtları
+işler. Kapanan mumlar data/candles_<çözünürlük>_YYYY-MM-DD.ndjson dosyalarına
+eklenir; henüz kapanmamış mumlar ve işlenen son bayt konumu
+data/candles_state_YYYY-MM-DD.json kontrol noktasında saklanır. Bir haftalık
+saatlik grafik için ham tick'ler yerine birkaç yüz satır okunur.
+
+Mum zamanları UTC'dir ve kayıtlardaki zaman damgası biçimini kullanır.
+"""
+import calendar
+import json
+import os
+import time
+from datetime import date as date_cls, datetime, timedelta
+
+import pytz
+
+import tick_storage
+
+# Çözünürlük -> saniye
+RESOLUTIONS = {
+    '1m': 60,
+    '5m': 300,
+    '1h': 3600,
+    '1d': 86400,
+}
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_engines = {}
+
+
+def candles_path(date, resolution, data_dir=tick_storage.DATA_DIR):
+    """Günün kapanmış mum dosyasının yolunu döndürür"""
+    return os.path.join(data_dir, f'candles_{resolution}_{date}.ndjson')
+
+
+def checkpoint_path(date, data_dir=tick_storage.DATA_DIR):
+    """Mum motorunun kontrol noktası dosya yolunu döndürür"""
+    return os.path.join(data_dir, f'candles_state_{date}.json')
+
+
+def _valid_price(value):
+    # Eksik, NaN veya boş defter nedeniyle 0 olan fiyatlar mumlara katılmaz
+    return value is not None and value == value and value > 0
+
+
+def _new_candle(start, mid, spread, bid_qty, ask_qty):
+    return {
+        'start': start,
+        'open': mid, 'high': mid, 'low': mid, 'close': mid,
+        'spread_min': spread, 'spread_max': spread, 'spread_sum': spread,
+        'bid_qty_sum': bid_qty or 0.0, 'bid_qty_count': 0 if bid_qty is None else 1,
+        'ask_qty_sum': ask_qty or 0.0, 'ask_qty_count': 0 if ask_qty is None else 1,
+        'count': 1,
+    }
+
+
+def _add_to_candle(candle, mid, spread, bid_qty, ask_qty):
+    if mid > candle['high']:
+        candle['high'] = mid
+    if mid < candle['low']:
+        candle['low'] = mid
+    candle['close'] = mid
+    if spread < candle['spread_min']:
+        candle['spread_min'] = spread
+    if spread > candle['spread_max']:
+        candle['spread_max'] = spread
+    candle['spread_sum'] += spread
+    if bid_qty is not None:
+        candle['bid_qty_sum'] += bid_qty
+        candle['bid_qty_count'] += 1
+    if ask_qty is not None:
+        candle['ask_qty_sum'] += ask_qty
+        candle['ask_qty_count'] += 1
+    candle['count'] += 1
+
+
+def _row(exchange, candle):
+    """Mum birikimini dosyaya yazılan satır biçimine çevirir"""
+    return {
+        'time': datetime.fromtimestamp(candle['start'], pytz.UTC).strftime(TIMESTAMP_FORMAT),
+        'exchange': exchange,
+        'open': candle['open'],
+        'high': candle['high'],
+        'low': candle['low'],
+        'close': candle['close'],
+        'spread_min': candle['spread_min'],
+        'spread_max': candle['spread_max'],
+        'spread_avg': candle['spread_sum'] / candle['count'],
+        'bid_qty_avg': candle['bid_qty_sum'] / candle['bid_qty_count'] if candle['bid_qty_count'] else None,
+        'ask_qty_avg': candle['ask_qty_sum'] / candle['ask_qty_count'] if candle['ask_qty_count'] else None,
+        'count': candle['count'],
+    }
+
+
+class CandleRollup:
+    """Bir günün kayıtlarından tüm çözünürlüklerde mum üreten motor"""
+
+    def __init__(self, date):
+        self.date = date
+        self.open = {resolution: {} for resolution in RESOLUTIONS}    # çözünürlük -> borsa -> mum
+        self.closed = {resolution: [] for resolution in RESOLUTIONS}  # henüz dosyaya yazılmamış satırlar
+        self.sizes = {resolution: 0 for resolution in RESOLUTIONS}    # mum dosyalarının yazılmış boyutu
+        self.offset = 0  # NDJSON dosyasında işlenmiş son bayt
+        self._last_timestamp = None
+        self._last_epoch = None
+
+    def _epoch(self, timestamp):
+        # Aynı turdaki kayıtlar genellikle aynı zaman damgasını taşır
+        if timestamp != self._last_timestamp:
+            self._last_epoch = calendar.timegm(time.strptime(timestamp, TIMESTAMP_FORMAT))
+            self._last_timestamp = timestamp
+        return self._last_epoch
+
+    def update(self, records):
+        """Yeni kayıtları mumlara işler; zamanı geçen mumlar kapatılır"""
+        for record in records:
+            bid = record.get('bid')
+            ask = record.get('ask')
+            if not _valid_price(bid) or not _valid_price(ask) or not record.get('timestamp'):
+                continue
+
+            exchange = record.get('exchange')
+            epoch = self._epoch(record['timestamp'])
+            mid = (bid + ask) / 2
+            spread = ask - bid
+            bid_qty = record.get('bid_qty')
+            ask_qty = record.get('ask_qty')
+
+            for resolution, seconds in RESOLUTIONS.items():
+                start = epoch - epoch % seconds
+                candles = self.open[resolution]
+                candle = candles.get(exchange)
+                if candle is not None and start > candle['start']:
+                    self.closed[resolution].append(_row(exchange, candle))
+                    candle = None
+                if candle is None:
+                    candles[exchange] = _new_candle(start, mid, spread, bid_qty, ask_qty)
+                else:
+                    # Geç gelen (önceki aralığa ait) kayıtlar açık muma eklenir
+                    _add_to_candle(candle, mid, spread, bid_qty, ask_qty)
+
+    def close_all(self):
+        """Tüm açık mumları kapatır (gün bittiğinde)"""
+        for resolution, candles in self.open.items():
+            for exchange in sorted(candles, key=lambda name: candles[name]['start']):
+                self.closed[resolution].append(_row(exchange, candles[exchange]))
+            candles.clear()
+
+    def open_rows(self, resolution):
+        """Henüz kapanmamış mumları satır biçiminde döndürür"""
+        candles = self.open[resolution]
+        return [_row(exchange, candles[exchange]) for exchange in sorted(candles)]
+
+    def to_checkpoint(self):
+        """Motor durumunu JSON'a yazılabilir sözlük olarak döndürür"""
+        return {
+            'date': self.date,
+            'open': self.open,
+            'sizes': self.sizes,
+            'offset': self.offset
+        }
+
+    @classmethod
+    def from_checkpoint(cls, state):
+        """Kontrol noktası sözlüğünden motoru yeniden oluşturur"""
+        engine = cls(state['date'])
+        for resolution in RESOLUTIONS:
+            engine.open[resolution] = state['open'].get(resolution, {})
+            engine.sizes[resolution] = state['sizes'].get(resolution, 0)
+        engine.offset = state['offset']
+        return engine
+
+
+def flush(engine, data_dir=tick_storage.DATA_DIR):
+    """Kapanan mumları dosyalarına ekler ve kontrol noktasını yazar"""
+    os.makedirs(data_dir, exist_ok=True)
+    for resolution, rows in engine.closed.items():
+        if rows:
+            engine.sizes[resolution] = tick_storage.append_lines(candles_path(engine.date, resolution, data_dir), rows)
+            rows.clear()
+    tick_storage.atomic_write_json(checkpoint_path(engine.date, data_dir), engine.to_checkpoint(), indent=None)
+
+
+def _remove_day_files(date, data_dir):
+    for path in [checkpoint_path(date, data_dir)] + [candles_path(date, resolution, data_dir)
+                                                      for resolution in RESOLUTIONS]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def rebuild(date, data_dir=tick_storage.DATA_DIR):
+    """Günün mumlarını tüm kayıtlardan baştan üretir ve yazar"""
+    _remove_day_files(date, data_dir)
+    engine = CandleRollup(date)
+    engine.update(tick_storage.iter_records(date, data_dir))
+    path = tick_storage.ndjson_path(date, data_dir)
+    engine.offset = os.path.getsize(path) if os.path.exists(path) else 0
+    flush(engine, data_dir)
+    invalidate(date, data_dir)
+    return engine
+
+
+def invalidate(date, data_dir=tick_storage.DATA_DIR):
+    """Günün bellekteki motorunu yazmadan bırakır; sonraki erişim kontrol noktasından yükler"""
+    _engines.pop((data_dir, date), None)
+
+
+def _read_checkpoint(date, data_dir):
+    path = checkpoint_path(date, data_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as file:
+            return CandleRollup.from_checkpoint(json.load(file))
+    except (json.JSONDecodeError, KeyError) as e:
+        print(f"Mum kontrol noktası okunamadı ({path}): {e}")
+        return None
+
+
+def load(date, data_dir=tick_storage.DATA_DIR):
+    """
+    Günün mum motorunu kontrol noktasından yükler
+
+    Kontrol noktasından sonra mum dosyalarına eklenmiş satırlar (ör. yazma
+    sırasında kesilen süreç) atılır ve kayıtların işlenmemiş kuyruğu yeniden
+    işlenir. Kontrol noktası yoksa veya dosyalarla uyuşmuyorsa gün baştan üretilir.
+    """
+    engine = _read_checkpoint(date, data_dir)
+    ndjson = tick_storage.ndjson_path(date, data_dir)
+    size = os.path.getsize(ndjson) if os.path.exists(ndjson) else 0
+    if engine is None or engine.offset > size:
+        return rebuild(date, data_dir)
+
+    for resolution, expected in engine.sizes.items():
+        path = candles_path(date, resolution, data_dir)
+        actual = os.path.getsize(path) if os.path.exists(path) else 0
+        if actual < expected:
+            return rebuild(date, data_dir)
+        if actual > expected:
+            with open(path, 'rb+') as file:
+                file.truncate(expected)
+
+    if engine.offset < size:
+        records, engine.offset = tick_storage.read_from(date, engine.offset, data_dir)
+        engine.update(records)
+    return engine
+
+
+def get_engine(date, data_dir=tick_storage.DATA_DIR):
+    """
+    Gün için bellekteki motoru döndürür
+
+    Yeni bir güne geçildiğinde klasörün önceki gününün açık mumları kapatılıp
+    yazılır. Diğer (sembol) klasörlerinin motorlarına dokunulmaz.
+    """
+    key = (data_dir, date)
+    engine = _engines.get(key)
+    if engine is None:
+        for previous_key, previous in list(_engines.items()):
+            if previous_key[0] == data_dir:
+                previous.close_all()
+                flush(previous, data_dir)
+                del _engines[previous_key]
+        engine = _engines[key] = load(date, data_dir)
+    return engine
+
+
+def update_candles(date, records, end_offset=None, data_dir=tick_storage.DATA_DIR):
+    """
+    Yeni kayıtları günün mumlarına işler ve kapanan mumları yazar
+
+    Parameters:
+    date (str): YYYY-MM-DD formatında gün
+    records (list): Bu turda dosyaya eklenen kayıtlar
+    end_offset (int): append_records'un döndürdüğü dosya sonu
+    data_dir (str): Veri klasörü
+    """
+    engine = get_engine(date, data_dir)
+    if end_offset is None or engine.offset < end_offset:
+        engine.update(records)
+        if end_offset is not None:
+            engine.offset = end_offset
+    flush(engine, data_dir)
+    return engine
+
+
+def _merge(rows):
+    """
+    Aynı zaman ve borsaya ait satırları birleştirir
+
+    Yerel gün sınırı UTC'den farklıysa bir saatlik veya günlük mum iki günün
+    dosyasına bölünebilir.
+    """
+    merged = {}
+    for row in rows:
+        key = (row['time'], row['exchange'])
+        current = merged.get(key)
+        if current is None:
+            merged[key] = dict(row)
+            continue
+        total = current['count'] + row['count']
+        current['high'] = max(current['high'], row['high'])
+        current['low'] = min(current['low'], row['low'])
+        current['close'] = row['close']
+        current['spread_min'] = min(current['spread_min'], row['spread_min'])
+        current['spread_max'] = max(current['spread_max'], row['spread_max'])
+        current['spread_avg'] = (current['spread_avg'] * current['count'] + row['spread_avg'] * row['count']) / total
+        for column in ('bid_qty_avg', 'ask_qty_avg'):
+            if current[column] is None or row[column] is None:
+                current[column] = current[column] if row[column] is None else row[column]
+            else:
+                current[column] = (current[column] * current['count'] + row[column] * row['count']) / total
+        current['count'] = total
+    return sorted(merged.values(), key=lambda row: (row['time'], row['exchange']))
+
+
+def read_day(date, resolution, data_dir=tick_storage.DATA_DIR):
+    """Günün kapanmış ve açık mumlarını döndürür"""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Geçersiz çözünürlük: {resolution} ({', '.join(RESOLUTIONS)})")
+
+    engine = _engines.get((data_dir, date)) or _read_checkpoint(date, data_dir)
+    if engine is None and tick_storage.day_exists(date, data_dir):
+        # Mumları henüz üretilmemiş (ör. bu özellikten önceki) günler ilk okumada üretilir
+        engine = rebuild(date, data_dir)
+    path = candles_path(date, resolution, data_dir)
+    rows = []
+    if os.path.exists(path):
+        # Kontrol noktasından sonra eklenmiş (henüz onaylanmamış) satırlar okunmaz
+        rows.extend(tick_storage.iter_lines(path, engine.sizes[resolution] if engine else None))
+    if engine is not None:
+        rows.extend(engine.open_rows(resolution))
+    return rows
+
+
+def read_range(start_date, end_date, resolution, exchange=None, data_dir=tick_storage.DATA_DIR):
+    """
+    Tarih aralığındaki (her iki uç dahil) mumları zaman sırasıyla döndürür
+
+    Parameters:
+    start_date (str): YYYY-MM-DD
+    end_date (str): YYYY-MM-DD
+    resolution (str): '1m', '5m', '1h' veya '1d'
+    exchange (str): Verilirse yalnızca bu borsanın mumları
+    """
+    day = date_cls.fromisoformat(start_date)
+    last = date_cls.fromisoformat(end_date)
+    rows = []
+    while day <= last:
+        rows.extend(read_day(day.isoformat(), resolution, data_dir))
+        day += timedelta(days=1)
+    if exchange is not None:
+        rows = [row for row in rows if row['exchange'] == exchange]
+    return _merge(rows)
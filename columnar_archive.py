@@ -0,0 +1,339 @@
+"""
+Sütunlu, bellek eşlemeli (memory-mapped) tick arşivi
+
+Her gün data/columnar/YYYY-MM-DD/ klasöründe sütun başına bir ham dizi dosyası
+olarak saklanır:
+
+    timestamp.i8   int64, UTC epoch milisaniye
+    exchange.u2    uint16, borsa kimliği (data/columnar/exchanges.json sözlüğünde)
+    bid.f8, ask.f8, bid_qty.f8, ask_qty.f8
+                   float64, eksik değerler NaN
+
+Dosyalar numpy.memmap ile kopyalanmadan açılır; çok günlük taramalar JSON
+ayrıştırması yerine doğrudan sayfa önbelleği üzerinden yapılır. Borsa sözlüğü
+tüm günler için ortaktır, böylece kimlikler günler arasında karşılaştırılabilir.
+Kayıtların 'symbol' alanı saklanmaz: her sembolün arşivi kendi veri klasöründe
+(tick_storage.symbol_dir) tutulur.
+
+Saklama süresi dolan günler tek dosyalık sıkıştırılmış parçalara
+(data/columnar/YYYY-MM-DD.chunk.gz, zstandard kuruluysa .chunk.zst) dönüştürülür.
+Parçada aynı sütunlar bayt karıştırma (byte shuffle) uygulanarak saklanır;
+open_day memmap klasörü olmayan günler için parçayı açar.
+"""
+import glob
+import gzip
+import json
+import os
+import shutil
+from datetime import date as date_cls, datetime, timedelta
+
+import numpy as np
+import pytz
+
+import tick_storage
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - isteğe bağlı bağımlılık
+    zstandard = None
+
+ARCHIVE_DIR = os.path.join(tick_storage.DATA_DIR, 'columnar')
+DICTIONARY_FILE = 'exchanges.json'
+
+COLUMNS = {
+    'timestamp': np.dtype('<i8'),
+    'exchange': np.dtype('<u2'),
+    'bid': np.dtype('<f8'),
+    'ask': np.dtype('<f8'),
+    'bid_qty': np.dtype('<f8'),
+    'ask_qty': np.dtype('<f8'),
+}
+FLOAT_COLUMNS = ('bid', 'ask', 'bid_qty', 'ask_qty')
+
+
+def column_path(day_dir, column):
+    """Sütun dosyasının yolunu döndürür (ör. bid.f8)"""
+    dtype = COLUMNS[column]
+    return os.path.join(day_dir, f'{column}.{dtype.kind}{dtype.itemsize}')
+
+
+def day_path(date, archive_dir=ARCHIVE_DIR):
+    """Günün arşiv klasörünü döndürür"""
+    return os.path.join(archive_dir, date)
+
+
+def load_dictionary(archive_dir=ARCHIVE_DIR):
+    """Borsa adı listesini döndürür; listedeki sıra borsa kimliğidir"""
+    path = os.path.join(archive_dir, DICTIONARY_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def save_dictionary(names, archive_dir=ARCHIVE_DIR):
+    """Borsa sözlüğünü atomik olarak yazar"""
+    os.makedirs(archive_dir, exist_ok=True)
+    tick_storage.atomic_write_json(os.path.join(archive_dir, DICTIONARY_FILE), names)
+
+
+def exchange_id(name, archive_dir=ARCHIVE_DIR):
+    """Borsa adının kimliğini döndürür (sözlükte yoksa None)"""
+    names = load_dictionary(archive_dir)
+    return names.index(name) if name in names else None
+
+
+def records_to_columns(records, names):
+    """
+    Kayıt listesini sütun dizilerine çevirir
+
+    Parameters:
+    records (list): btc_prices kayıtları
+    names (list): Borsa sözlüğü; yeni görülen borsalar sona eklenir
+    """
+    ids = {name: index for index, name in enumerate(names)}
+    count = len(records)
+
+    exchanges = np.empty(count, dtype=COLUMNS['exchange'])
+    for index, record in enumerate(records):
+        name = record['exchange']
+        if name not in ids:
+            ids[name] = len(names)
+            names.append(name)
+        exchanges[index] = ids[name]
+
+    columns = {
+        'timestamp': np.array([record['timestamp'] for record in records],
+                              dtype='datetime64[ms]').astype(COLUMNS['timestamp']),
+        'exchange': exchanges,
+    }
+    for column in FLOAT_COLUMNS:
+        values = [record.get(column) for record in records]
+        columns[column] = np.array([np.nan if value is None else value for value in values],
+                                   dtype=COLUMNS[column])
+    return columns
+
+
+def write_day(date, records, archive_dir=ARCHIVE_DIR):
+    """
+    Günün kayıtlarını sütunlu arşive yazar
+
+    Yazma geçici bir klasöre yapılır ve sonunda yerine taşınır; yarım kalan
+    dönüşüm mevcut arşivi bozmaz.
+    """
+    names = load_dictionary(archive_dir)
+    known = len(names)
+    columns = records_to_columns(records, names)
+    if len(names) != known:
+        save_dictionary(names, archive_dir)
+
+    target = day_path(date, archive_dir)
+    tmp_dir = f'{target}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for column, values in columns.items():
+        values.tofile(column_path(tmp_dir, column))
+    with open(os.path.join(tmp_dir, 'meta.json'), 'w') as file:
+        json.dump({'date': date, 'rows': len(records)}, file)
+
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    os.replace(tmp_dir, target)
+    return target
+
+
+def chunk_path(date, archive_dir=ARCHIVE_DIR, codec='gz'):
+    """Günün sıkıştırılmış parça dosyasının yolunu döndürür"""
+    return os.path.join(archive_dir, f'{date}.chunk.{codec}')
+
+
+def find_chunk(date, archive_dir=ARCHIVE_DIR):
+    """Günün mevcut parça dosyasını döndürür (yoksa None)"""
+    for codec in ('zst', 'gz'):
+        path = chunk_path(date, archive_dir, codec)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _shuffle(values):
+    # Aynı anlamlı baytlar yan yana gelir; fiyat ve zaman sütunları çok daha iyi sıkışır
+    return values.view(np.uint8).reshape(-1, values.dtype.itemsize).T.tobytes()
+
+
+def _unshuffle(data, dtype, rows):
+    return np.frombuffer(data, dtype=np.uint8).reshape(dtype.itemsize, rows).T.copy().view(dtype).reshape(rows)
+
+
+def write_chunk(date, columns, archive_dir=ARCHIVE_DIR):
+    """
+    Günün sütunlarını tek bir sıkıştırılmış parça dosyasına yazar
+
+    Parameters:
+    date (str): YYYY-MM-DD
+    columns (dict): records_to_columns veya DayColumns ile aynı sütunlar (ortak borsa sözlüğü kimlikleriyle)
+    """
+    rows = len(columns['timestamp'])
+    header = {
+        'date': date,
+        'rows': rows,
+        'exchanges': load_dictionary(archive_dir),
+        'columns': [[column, COLUMNS[column].str] for column in COLUMNS],
+    }
+    payload = [json.dumps(header).encode('utf-8') + b'\n']
+    for column, dtype in COLUMNS.items():
+        payload.append(_shuffle(np.ascontiguousarray(columns[column], dtype=dtype)))
+    data = b''.join(payload)
+
+    codec = 'zst' if zstandard is not None else 'gz'
+    if codec == 'zst':
+        data = zstandard.ZstdCompressor(level=10).compress(data)
+    else:
+        data = gzip.compress(data, compresslevel=9)
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = chunk_path(date, archive_dir, codec)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+class ChunkColumns:
+    """Sıkıştırılmış parçadaki günü DayColumns ile aynı arayüzle sunar"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            data = file.read()
+        if path.endswith('.zst'):
+            if zstandard is None:
+                raise RuntimeError(f"{path} okumak için 'zstandard' paketi gerekli")
+            data = zstandard.ZstdDecompressor().decompress(data)
+        else:
+            data = gzip.decompress(data)
+
+        header_end = data.index(b'\n')
+        header = json.loads(data[:header_end])
+        self.date = header['date']
+        self.path = path
+        self.rows = header['rows']
+        self._columns = {}
+        position = header_end + 1
+        for column, dtype in header['columns']:
+            dtype = np.dtype(dtype)
+            size = self.rows * dtype.itemsize
+            self._columns[column] = _unshuffle(data[position:position + size], dtype, self.rows)
+            position += size
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, column):
+        return self._columns[column]
+
+
+def columns_to_records(columns, names):
+    """Sütunları btc_prices kayıt listesine çevirir (records_to_columns'un tersi)"""
+    records = []
+    for index in range(len(columns['timestamp'])):
+        timestamp = datetime.fromtimestamp(int(columns['timestamp'][index]) / 1000, pytz.UTC)
+        record = {
+            'exchange': names[columns['exchange'][index]],
+            'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        for column in FLOAT_COLUMNS:
+            value = float(columns[column][index])
+            record[column] = None if np.isnan(value) else value
+        records.append(record)
+    return records
+
+
+def convert_day(date, data_dir=tick_storage.DATA_DIR, archive_dir=ARCHIVE_DIR):
+    """Bir günün btc_prices dosyasını (JSON veya NDJSON) sütunlu arşive dönüştürür"""
+    records = tick_storage.read_day(date, data_dir)
+    target = write_day(date, records, archive_dir)
+    print(f"{date}: {len(records)} kayıt {target} arşivine dönüştürüldü")
+    return target
+
+
+def convert_all(data_dir=tick_storage.DATA_DIR, archive_dir=ARCHIVE_DIR):
+    """data/btc_prices_* dosyalarının tümünü sütunlu arşive dönüştürür"""
+    dates = sorted({os.path.basename(path).split('_')[-1].split('.')[0]
+                    for path in glob.glob(os.path.join(data_dir, 'btc_prices_*.json'))
+                    + glob.glob(os.path.join(data_dir, 'btc_prices_*.ndjson'))})
+    return [convert_day(date, data_dir, archive_dir) for date in dates]
+
+
+class DayColumns:
+    """Bir günün sütunlarını kopyalamadan (np.memmap) sunar"""
+
+    def __init__(self, date, archive_dir=ARCHIVE_DIR):
+        self.date = date
+        self.path = day_path(date, archive_dir)
+        with open(os.path.join(self.path, 'meta.json'), 'r') as file:
+            self.rows = json.load(file)['rows']
+        self._columns = {}
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, column):
+        if column not in self._columns:
+            dtype = COLUMNS[column]
+            if self.rows == 0:
+                # Boş dosya eşlenemez
+                self._columns[column] = np.empty(0, dtype=dtype)
+            else:
+                self._columns[column] = np.memmap(column_path(self.path, column), dtype=dtype,
+                                                  mode='r', shape=(self.rows,))
+        return self._columns[column]
+
+
+def open_day(date, archive_dir=ARCHIVE_DIR):
+    """Günün arşivini açar; memmap klasörü yoksa sıkıştırılmış parçayı okur (ikisi de yoksa None)"""
+    if not os.path.exists(os.path.join(day_path(date, archive_dir), 'meta.json')):
+        path = find_chunk(date, archive_dir)
+        return ChunkColumns(path) if path else None
+    return DayColumns(date, archive_dir)
+
+
+def iter_range(start_date, end_date, archive_dir=ARCHIVE_DIR):
+    """start_date ile end_date (dahil) arasındaki arşivlenmiş günleri sırayla döndürür"""
+    day = date_cls.fromisoformat(start_date)
+    last = date_cls.fromisoformat(end_date)
+    while day <= last:
+        columns = open_day(day.isoformat(), archive_dir)
+        if columns is not None:
+            yield columns
+        day += timedelta(days=1)
+
+
+def load_range(start_date, end_date, columns=tuple(COLUMNS), exchange=None, archive_dir=ARCHIVE_DIR):
+    """
+    Tarih aralığındaki sütunları birleştirerek döndürür
+
+    Parameters:
+    start_date, end_date (str): YYYY-MM-DD, her ikisi de dahil
+    columns (tuple): İstenen sütunlar
+    exchange (str): Verilirse yalnızca bu borsanın satırları
+    """
+    exchange_filter = None
+    if exchange is not None:
+        exchange_filter = exchange_id(exchange, archive_dir)
+        if exchange_filter is None:
+            return {column: np.empty(0, dtype=COLUMNS[column]) for column in columns}
+
+    parts = {column: [] for column in columns}
+    for day in iter_range(start_date, end_date, archive_dir):
+        mask = None
+        if exchange_filter is not None:
+            mask = day['exchange'] == exchange_filter
+        for column in columns:
+            values = day[column]
+            parts[column].append(values[mask] if mask is not None else values)
+
+    return {column: np.concatenate(values) if values else np.empty(0, dtype=COLUMNS[column])
+            for column, values in parts.items()}
@@ -1,537 +1,538 @@
-import requests
-import pandas as pd
 import time
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 import pytz
-import glob
-import shutil
+import argparse
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import candles
+import daily_summary
+import exchanges
+import http_session
+import metrics
+import quote_validator
+import request_policy
+import retention
+import tick_storage
+
+# Bir veri toplama turunun (tick) tamamlanması için tanınan azami süre (saniye).
+# Bu süreyi aşan borsalar o turda atlanır.
+TICK_DEADLINE = 12
 
 def get_binance_data():
     """Binance'den BTC verilerini çeker"""
-    try:
-        print("Binance API'sine istek gönderiliyor...")
-        response = requests.get('https://api.binance.com/api/v3/ticker/bookTicker?symbol=BTCUSDT', 
-                               headers={'User-Agent': 'Mozilla/5.0'}, 
-                               timeout=10)  # Timeout ekledik
-        
-        print(f"Binance API yanıt kodu: {response.status_code}")
-        if response.status_code != 200:
-            print(f"Binance API yanıt içeriği: {response.text[:200]}...")  # İlk 200 karakteri yazdır
-            return None
-            
-        data = response.json()
-        print(f"Binance veri alındı: {data}")
-        
-        return {
-            'exchange': 'Binance',
-            'timestamp': datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S'),
-            'bid': float(data['bidPrice']),
-            'ask': float(data['askPrice']),
-            'bid_qty': float(data['bidQty']),
-            'ask_qty': float(data['askQty'])
-        }
-    except requests.exceptions.Timeout:
-        print("Binance API zaman aşımı hatası")
-        return None
-    except requests.exceptions.ConnectionError:
-        print("Binance API bağlantı hatası")
-        return None
-    except Exception as e:
-        print(f"Binance veri çekme hatası: {e}")
-        import traceback
-        traceback.print_exc()  # Tam hata izlemeyi yazdır
-        return None
+    return exchanges.fetch_quote('Binance')
 
 def get_okx_data():
     """OKX'den BTC verilerini çeker"""
-    try:
-        print("OKX API'sine istek gönderiliyor...")
-        response = requests.get('https://www.okx.com/api/v5/market/ticker?instId=BTC-USDT',
-                               headers={'User-Agent': 'Mozilla/5.0'},
-                               timeout=10)  # Timeout ekledik
-        
-        print(f"OKX API yanıt kodu: {response.status_code}")
-        if response.status_code != 200:
-            print(f"OKX API yanıt içeriği: {response.text[:200]}...")
-            return None
-            
-        data = response.json()
-        print(f"OKX veri alındı: {data}")
-        
-        if data.get('code') == '0' and len(data.get('data', [])) > 0:
-            ticker = data['data'][0]
-            return {
-                'exchange': 'OKX',
-                'timestamp': datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S'),
-                'bid': float(ticker['bidPx']),  # En iyi alış fiyatı
-                'ask': float(ticker['askPx']),  # En iyi satış fiyatı
-                'bid_qty': float(ticker['bidSz']),  # Alış miktarı
-                'ask_qty': float(ticker['askSz'])   # Satış miktarı
-            }
-        else:
-            print(f"OKX API veri hatası: {data}")
-            return None
-    except requests.exceptions.Timeout:
-        print("OKX API zaman aşımı hatası")
-        return None
-    except requests.exceptions.ConnectionError:
-        print("OKX API bağlantı hatası")
-        return None
-    except Exception as e:
-        print(f"OKX veri çekme hatası: {e}")
-        import traceback
-        traceback.print_exc()  # Tam hata izlemeyi yazdır
-        return None
+    return exchanges.fetch_quote('OKX')
 
 def get_coinbase_data():
     """Coinbase'den BTC verilerini çeker"""
-    try:
-        print("Coinbase API'sine istek gönderiliyor...")
-        # Coinbase Pro API kullanıyoruz (eski GDAX)
-        response = requests.get('https://api.exchange.coinbase.com/products/BTC-USD/ticker',
-                               headers={'User-Agent': 'Mozilla/5.0'},
-                               timeout=10)  # Timeout ekledik
-        
-        print(f"Coinbase API yanıt kodu: {response.status_code}")
-        if response.status_code != 200:
-            print(f"Coinbase API yanıt içeriği: {response.text[:200]}...")
-            # Alternatif endpoint deneyelim
-            print("Alternatif Coinbase API'si deneniyor...")
-            try:
-                alt_response = requests.get('https://api.coinbase.com/v2/prices/BTC-USD/spot',
-                                          headers={'User-Agent': 'Mozilla/5.0'},
-                                          timeout=10)
-                
-                print(f"Alternatif Coinbase API yanıt kodu: {alt_response.status_code}")
-                if alt_response.status_code == 200:
-                    alt_data = alt_response.json()
-                    print(f"Alternatif Coinbase veri alındı: {alt_data}")
-                    
-                    price = float(alt_data['data']['amount'])
-                    return {
-                        'exchange': 'Coinbase',
-                        'timestamp': datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S'),
-                        'bid': price * 0.995,  # Yaklaşık bir değer
-                        'ask': price * 1.005,  # Yaklaşık bir değer
-                        'bid_qty': None,
-                        'ask_qty': None
-                    }
-            except Exception as alt_e:
-                print(f"Alternatif Coinbase API hatası: {alt_e}")
-                
-            return None
-            
-        ticker_data = response.json()
-        print(f"Coinbase ticker verisi alındı: {ticker_data}")
-        
-        # Derinlik bilgisi alalım
-        print("Coinbase order book API'sine istek gönderiliyor...")
-        order_book = requests.get('https://api.exchange.coinbase.com/products/BTC-USD/book?level=1',
-                                 headers={'User-Agent': 'Mozilla/5.0'},
-                                 timeout=10)
-        
-        print(f"Coinbase order book API yanıt kodu: {order_book.status_code}")
-        if order_book.status_code != 200:
-            print(f"Coinbase order book API yanıt içeriği: {order_book.text[:200]}...")
-            book_data = {'bids': [[0, 0]], 'asks': [[0, 0]]}
-        else:
-            book_data = order_book.json()
-            print(f"Coinbase order book verisi alındı: {book_data}")
-        
-        return {
-            'exchange': 'Coinbase',
-            'timestamp': datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S'),
-            'bid': float(book_data['bids'][0][0]) if len(book_data['bids']) > 0 else float(ticker_data['price']),
-            'ask': float(book_data['asks'][0][0]) if len(book_data['asks']) > 0 else float(ticker_data['price']),
-            'bid_qty': float(book_data['bids'][0][1]) if len(book_data['bids']) > 0 else None,
-            'ask_qty': float(book_data['asks'][0][1]) if len(book_data['asks']) > 0 else None
-        }
-    except requests.exceptions.Timeout:
-        print("Coinbase API zaman aşımı hatası")
-        return None
-    except requests.exceptions.ConnectionError:
-        print("Coinbase API bağlantı hatası")
-        return None
-    except Exception as e:
-        print(f"Coinbase veri çekme hatası: {e}")
-        import traceback
-        traceback.print_exc()  # Tam hata izlemeyi yazdır
-        return None
+    return exchanges.fetch_quote('Coinbase')
         
 def get_kraken_data():
     """Kraken'den BTC verilerini çeker"""
-    try:
-        print("Kraken API'sine istek gönderiliyor...")
-        response = requests.get('https://api.kraken.com/0/public/Ticker?pair=XBTUSD',
-                               headers={'User-Agent': 'Mozilla/5.0'},
-                               timeout=10)  # Timeout ekledik
-        
-        print(f"Kraken API yanıt kodu: {response.status_code}")
-        if response.status_code != 200:
-            print(f"Kraken API yanıt içeriği: {response.text[:200]}...")
-            return None
-            
-        data = response.json()
-        print(f"Kraken veri alındı: {data}")
-        
-        if 'error' in data and len(data['error']) > 0:
-            print(f"Kraken API hata döndürdü: {data['error']}")
-            return None
-            
-        if 'result' in data and 'XXBTZUSD' in data['result']:
-            result = data['result']['XXBTZUSD']
-            
-            return {
-                'exchange': 'Kraken',
-                'timestamp': datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S'),
-                'bid': float(result['b'][0]),
-                'ask': float(result['a'][0]),
-                'bid_qty': float(result['b'][2]),
-                'ask_qty': float(result['a'][2])
-            }
-        else:
-            print(f"Kraken API beklenmeyen yanıt formatı: {data}")
-            return None
-    except requests.exceptions.Timeout:
-        print("Kraken API zaman aşımı hatası")
-        return None
-    except requests.exceptions.ConnectionError:
-        print("Kraken API bağlantı hatası")
-        return None
-    except Exception as e:
-        print(f"Kraken veri çekme hatası: {e}")
-        import traceback
-        traceback.print_exc()  # Tam hata izlemeyi yazdır
-        return None
+    return exchanges.fetch_quote('Kraken')
 
 def get_bybit_data():
     """Bybit'den BTC verilerini çeker"""
-    try:
-        print("Bybit API'sine istek gönderiliyor...")
-        response = requests.get('https://api.bybit.com/v5/market/orderbook?category=spot&symbol=BTCUSDT&limit=1',
-                               headers={'User-Agent': 'Mozilla/5.0'},
-                               timeout=10)  # Timeout ekledik
-        
-        print(f"Bybit API yanıt kodu: {response.status_code}")
-        if response.status_code != 200:
-            print(f"Bybit API yanıt içeriği: {response.text[:200]}...")
-            return None
-            
-        data = response.json()
-        print(f"Bybit veri alındı: {data}")
-        
-        if data.get('retCode') == 0 and 'result' in data:
-            result = data['result']
-            bid = float(result['b'][0][0]) if 'b' in result and len(result['b']) > 0 else 0
-            ask = float(result['a'][0][0]) if 'a' in result and len(result['a']) > 0 else 0
-            bid_qty = float(result['b'][0][1]) if 'b' in result and len(result['b']) > 0 else 0
-            ask_qty = float(result['a'][0][1]) if 'a' in result and len(result['a']) > 0 else 0
-            
-            return {
-                'exchange': 'Bybit',
-                'timestamp': datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S'),
-                'bid': bid,
-                'ask': ask,
-                'bid_qty': bid_qty,
-                'ask_qty': ask_qty
-            }
-        else:
-            print(f"Bybit API hata döndürdü: {data}")
-            return None
-    except requests.exceptions.Timeout:
-        print("Bybit API zaman aşımı hatası")
-        return None
-    except requests.exceptions.ConnectionError:
-        print("Bybit API bağlantı hatası")
-        return None
-    except Exception as e:
-        print(f"Bybit veri çekme hatası: {e}")
-        import traceback
-        traceback.print_exc()  # Tam hata izlemeyi yazdır
-        return None
+    return exchanges.fetch_quote('Bybit')
 
 def get_kucoin_data():
     """KuCoin'den BTC verilerini çeker"""
-    try:
-        print("KuCoin API'sine istek gönderiliyor...")
-        response = requests.get('https://api.kucoin.com/api/v1/market/orderbook/level1?symbol=BTC-USDT',
-                               headers={'User-Agent': 'Mozilla/5.0'},
-                               timeout=10)  # Timeout ekledik
-        
-        print(f"KuCoin API yanıt kodu: {response.status_code}")
-        if response.status_code != 200:
-            print(f"KuCoin API yanıt içeriği: {response.text[:200]}...")
-            return None
-            
-        data = response.json()
-        print(f"KuCoin veri alındı: {data}")
-        
-        if data.get('code') == '200000' and 'data' in data:
-            result = data['data']
-            
-            # Eğer bid veya ask null ise, price değerini kullan
-            bid = float(result.get('bestBid', result.get('price', 0)))
-            ask = float(result.get('bestAsk', result.get('price', 0)))
-            
-            # Eğer hacim bilgisi yoksa None olarak ayarla
-            bid_qty = float(result.get('bidSize', 0)) if 'bidSize' in result else None
-            ask_qty = float(result.get('askSize', 0)) if 'askSize' in result else None
-            
-            return {
-                'exchange': 'KuCoin',
-                'timestamp': datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S'),
-                'bid': bid,
-                'ask': ask,
-                'bid_qty': bid_qty,
-                'ask_qty': ask_qty
-            }
-        else:
-            print(f"KuCoin API hata döndürdü: {data}")
-            return None
-    except requests.exceptions.Timeout:
-        print("KuCoin API zaman aşımı hatası")
-        return None
-    except requests.exceptions.ConnectionError:
-        print("KuCoin API bağlantı hatası")
-        return None
-    except Exception as e:
-        print(f"KuCoin veri çekme hatası: {e}")
-        import traceback
-        traceback.print_exc()  # Tam hata izlemeyi yazdır
-        return None
+    return exchanges.fetch_quote('KuCoin')
 
-def collect_all_exchange_data():
-    """Tüm borsalardan veri toplar"""
-    exchange_data = []
-    
-    # Her borsadan veri çekmeyi deneyin
-    binance_data = get_binance_data()
-    if binance_data:
-        exchange_data.append(binance_data)
-        print(f"✅ Binance verileri başarıyla alındı")
-    else:
-        print(f"❌ Binance verilerini alamadık")
+_executor = None
+
+def _get_executor():
+    """Borsa istekleri için paylaşılan iş parçacığı havuzunu döndürür"""
+    global _executor
+    if _executor is None:
+        # Bir önceki turda takılı kalan istekler havuzu tıkamasın diye borsa sayısının iki katı
+        _executor = ThreadPoolExecutor(max_workers=len(exchanges.REGISTRY) * 2,
+                                       thread_name_prefix='exchange-fetch')
+    return _executor
+
+def collect_quotes(symbols=(exchanges.DEFAULT_SYMBOL,), venues=None, concurrent=True, tick_deadline=TICK_DEADLINE):
+    """
+    Seçilen borsalardan seçilen sembollerin kotasyonlarını tek turda toplar
     
-    okx_data = get_okx_data()
-    if okx_data:
-        exchange_data.append(okx_data)
-        print(f"✅ OKX verileri başarıyla alındı")
-    else:
-        print(f"❌ OKX verilerini alamadık")
+    Toplu ticker uç noktası olan borsalarda tüm semboller tek istekle çekilir.
     
-    coinbase_data = get_coinbase_data()
-    if coinbase_data:
-        exchange_data.append(coinbase_data)
-        print(f"✅ Coinbase verileri başarıyla alındı")
-    else:
-        print(f"❌ Coinbase verilerini alamadık")
+    Parameters:
+    symbols (tuple): Ortak semboller (ör. 'BTC/USDT', 'ETH/USDT')
+    venues (list): Borsa adları (varsayılan: kayıtlı tüm borsalar)
+    concurrent (bool): True ise istekler eşzamanlı gönderilir, False ise sırayla
+    tick_deadline (float): Eşzamanlı modda tur için azami süre (saniye); bu sürede
+        yanıt vermeyen borsalar bu turda atlanır
     
-    kraken_data = get_kraken_data()
-    if kraken_data:
-        exchange_data.append(kraken_data)
-        print(f"✅ Kraken verileri başarıyla alındı")
-    else:
-        print(f"❌ Kraken verilerini alamadık")
+    Returns:
+    dict: Sembol -> kayıt listesi (borsa kayıt sırasına göre)
+    """
+    units = exchanges.plan_requests(symbols, venues)
+    results = [None] * len(units)
+    # Eşzamanlı isteklerin hepsi açık bağlantı bulsun; havuz küçükse fazladan bağlantılar her turda yeniden kurulur
+    http_session.configure_pools(exchanges.pool_sizes(units))
     
-    bybit_data = get_bybit_data()
-    if bybit_data:
-        exchange_data.append(bybit_data)
-        print(f"✅ Bybit verileri başarıyla alındı")
+    if concurrent:
+        # Tüm borsalara aynı anda istek gönderin; kotasyonlar birbirine bir istek süresi kadar yakın olur
+        futures = [_get_executor().submit(exchanges.fetch_unit, adapter, unit) for adapter, unit in units]
+        wait(futures, timeout=tick_deadline)
+        
+        for index, future in enumerate(futures):
+            if not future.done():
+                # Yavaş borsa tüm turu bekletmesin; iş parçacığı arka planda kendi timeout'una kadar çalışır
+                future.cancel()
+                metrics.inc('tracker_deadline_missed_total', exchange=units[index][0].name)
+                print(f"❌ {units[index][0].name} {tick_deadline} sn içinde yanıt vermedi, bu turda atlandı")
+                continue
+            results[index] = future.result()
     else:
-        print(f"❌ Bybit verilerini alamadık")
+        # Her borsadan sırayla veri çekmeyi deneyin
+        results = [exchanges.fetch_unit(adapter, unit) for adapter, unit in units]
     
-    kucoin_data = get_kucoin_data()
-    if kucoin_data:
-        exchange_data.append(kucoin_data)
-        print(f"✅ KuCoin verileri başarıyla alındı")
-    else:
-        print(f"❌ KuCoin verilerini alamadık")
+    quotes = {symbol: [] for symbol in symbols}
+    for (adapter, unit), result in zip(units, results):
+        if result is None:
+            continue
+        for symbol in unit:
+            if symbol in result:
+                quotes[symbol].append(result[symbol])
+                print(f"✅ {adapter.name} {symbol} verileri başarıyla alındı")
+            else:
+                print(f"❌ {adapter.name} {symbol} verilerini alamadık")
+    
+    # Geçersiz kotasyonlar veri setine, özete ve arbitraj hesabına girmeden karantinaya alınır
+    return {symbol: quote_validator.screen(records, symbol) for symbol, records in quotes.items()}
+
+def collect_all_exchange_data(concurrent=True, tick_deadline=TICK_DEADLINE):
+    """
+    Tüm borsalardan BTC verilerini toplar
+    
+    Parameters:
+    concurrent (bool): True ise borsalar eşzamanlı sorgulanır, False ise sırayla
+    tick_deadline (float): Eşzamanlı modda tur için azami süre (saniye)
+    """
+    exchange_data = collect_quotes(concurrent=concurrent, tick_deadline=tick_deadline)[exchanges.DEFAULT_SYMBOL]
     
     print(f"\n✅ Toplam {len(exchange_data)} borsadan veri alındı")
+    print(http_session.format_stats())
+    circuit_status = request_policy.format_status()
+    if circuit_status:
+        print(circuit_status)
     
     return exchange_data
 
-def save_data_to_file(data):
-    """Verileri dosyaya kaydeder"""
-    current_date = datetime.now().strftime('%Y-%m-%d')
-    filename = f'data/btc_prices_{current_date}.json'
-    
-    # data dizininin var olduğundan emin olun
-    os.makedirs('data', exist_ok=True)
-    
-    # Dosya varsa, mevcut verileri yükleyin
-    if os.path.exists(filename):
-        with open(filename, 'r') as file:
-            try:
-                existing_data = json.load(file)
-            except json.JSONDecodeError:
-                existing_data = []
-    else:
-        existing_data = []
-    
-    # Yeni verileri ekleyin
-    existing_data.extend(data)
+def save_data_to_file(data, current_date=None):
+    """Verileri günün (verilmezse bugünün) dosyasına ekler"""
+    if current_date is None:
+        current_date = datetime.now().strftime('%Y-%m-%d')
     
-    # Dosyaya yazın
-    with open(filename, 'w') as file:
-        json.dump(existing_data, file, indent=2)
+    # Yalnızca yeni kayıtları dosyanın sonuna ekleyin; mevcut veriler yeniden okunmaz
+    with metrics.timer('tracker_stage_duration_seconds', stage='persist'):
+        end_offset = tick_storage.append_records(current_date, data)
+    metrics.inc('tracker_records_total', len(data))
     
-    print(f"Veriler {filename} dosyasına kaydedildi")
+    print(f"Veriler {tick_storage.ndjson_path(current_date)} dosyasına kaydedildi")
     
-    # Günlük özet dosyası oluşturun
-    create_daily_summary(current_date)
+    # Günlük özeti yalnızca yeni kayıtlarla güncelleyin
+    with metrics.timer('tracker_stage_duration_seconds', stage='summarize'):
+        output_filename = daily_summary.update_daily_summary(current_date, data, end_offset)
+    with metrics.timer('tracker_stage_duration_seconds', stage='rollup'):
+        candles.update_candles(current_date, data, end_offset)
+    if output_filename:
+        print(f"Günlük özet {output_filename} dosyasına kaydedildi")
 
 def create_daily_summary(date):
-    """Günlük özet dosyası oluşturur"""
-    input_filename = f'data/btc_prices_{date}.json'
-    output_filename = f'data/summary_{date}.json'
-    
-    if not os.path.exists(input_filename):
-        print(f"Özet oluşturulamadı: {input_filename} dosyası bulunamadı")
+    """Günlük özet dosyasını günün tüm kayıtlarından baştan oluşturur"""
+    if not tick_storage.day_exists(date):
+        print(f"Özet oluşturulamadı: {date} için veri dosyası bulunamadı")
         return
     
-    with open(input_filename, 'r') as file:
-        try:
-            data = json.load(file)
-        except json.JSONDecodeError:
-            print(f"Özet oluşturulamadı: {input_filename} dosyası geçersiz JSON formatı")
-            return
-    
-    # Verileri DataFrame'e dönüştürün
-    df = pd.DataFrame(data)
-    
-    # Hangi borsanın alışta, hangi borsanın satışta olduğunu belirleyin
-    if not df.empty and len(df) > 0:
-        # En düşük satış fiyatı (alış için en iyi)
-        min_ask = df.loc[df['ask'] == df['ask'].min()]
-        best_to_buy = min_ask['exchange'].values[0] if not min_ask.empty else None
-        
-        # En yüksek alış fiyatı (satış için en iyi)
-        max_bid = df.loc[df['bid'] == df['bid'].max()]
-        best_to_sell = max_bid['exchange'].values[0] if not max_bid.empty else None
-        
-        # Her borsa için son durumu alın
-        latest_data = df.groupby('exchange').last().reset_index()
-        
-        summary = {
-            'date': date,
-            'latest_update': datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S'),
-            'best_exchange_to_buy': best_to_buy,
-            'best_exchange_to_sell': best_to_sell,
-            'arbitrage_opportunity': float(max_bid['bid'].values[0] - min_ask['ask'].values[0]) if not min_ask.empty and not max_bid.empty else 0,
-            'exchange_data': latest_data.to_dict('records')
-        }
-        
-        with open(output_filename, 'w') as file:
-            json.dump(summary, file, indent=2)
-        
+    output_filename = daily_summary.write_summary(daily_summary.rebuild(date))
+    if output_filename:
         print(f"Günlük özet {output_filename} dosyasına kaydedildi")
+    candles.rebuild(date)
 
-def cleanup_old_data(max_days=7, max_files=30):
+def cleanup_old_data(max_days=7, max_files=30, warm_days=retention.WARM_DAYS):
     """
-    Belirli bir günden daha eski verileri temizler
+    Eski verileri katmanlı saklama düzenine taşır
+    
+    Ham veriler max_days gün saklanır; daha eski günler sıkıştırılmış sütunlu
+    arşive, warm_days günden eski günler yalnızca özet ve saatlik/günlük mumlara
+    indirilir. Bakım günde bir kez çalışır; diğer çağrılar manifestten döner.
     
     Parameters:
-    max_days (int): Saklanacak maksimum gün sayısı
-    max_files (int): Saklanacak maksimum dosya sayısı
+    max_days (int): Ham verinin saklanacağı maksimum gün sayısı
+    max_files (int): Ham haliyle saklanacak maksimum gün dosyası sayısı
+    warm_days (int): Sıkıştırılmış ham verinin saklanacağı gün sayısı
     """
-    print(f"Eski veri temizleme başlatıldı: Maksimum {max_days} gün / {max_files} dosya saklanacak")
-    
     # data klasörünün var olduğundan emin olun
     if not os.path.exists('data'):
         print("data klasörü bulunamadı, temizleme atlanıyor")
         return
     
-    # Bugünden max_days gün öncesini hesaplayın
-    cutoff_date = datetime.now() - timedelta(days=max_days)
-    cutoff_date_str = cutoff_date.strftime('%Y-%m-%d')
-    
-    # Tüm btc_prices ve summary dosyalarını bulun
-    all_price_files = glob.glob('data/btc_prices_*.json')
-    all_summary_files = glob.glob('data/summary_*.json')
-    
-    # Dosyaları tarihlerine göre sıralayın (en eskiler başta)
-    all_price_files.sort()
-    all_summary_files.sort()
-    
-    # Maksimum dosya sayısını kontrol edin
-    if len(all_price_files) > max_files:
-        files_to_delete = all_price_files[:-max_files]  # En eski dosyaları silin
-        for file in files_to_delete:
-            try:
-                os.remove(file)
-                print(f"Dosya silindi (kota aşımı): {file}")
-            except Exception as e:
-                print(f"Dosya silinirken hata oluştu: {file} - {e}")
-    
-    # Tarih kontrolüyle dosyaları silin
-    for file in all_price_files:
-        # Dosya adından tarihi çıkarın
+    # Her sembol klasörünün kendi manifesti vardır (--workers ile toplanan diğer semboller)
+    for data_dir in tick_storage.symbol_dirs():
+        manifest = retention.load_manifest(data_dir)
+        if manifest.get('checked') == datetime.now().strftime('%Y-%m-%d'):
+            continue
+        
+        print(f"Veri bakımı başlatıldı ({data_dir}): {max_days} gün ham, {warm_days} gün sıkıştırılmış veri saklanacak")
         try:
-            # Dosya adı formatı: data/btc_prices_YYYY-MM-DD.json
-            file_date_str = file.split('_')[-1].split('.')[0]
-            
-            # Eğer dosya tarihi cutoff_date'den eskiyse, silin
-            if file_date_str < cutoff_date_str:
-                os.remove(file)
-                print(f"Dosya silindi (tarih eskimesi): {file}")
+            manifest = retention.maintain(hot_days=max_days, warm_days=warm_days, max_hot_files=max_files,
+                                          data_dir=data_dir)
         except Exception as e:
-            print(f"Dosya işlenirken hata oluştu: {file} - {e}")
+            print(f"Veri bakımı sırasında hata oluştu ({data_dir}): {e}")
+            continue
+        
+        for tier, (days, size) in sorted(retention.tier_sizes(manifest).items()):
+            print(f"{retention.TIER_NAMES[tier]} katman: {days} gün, {size / (1024*1024):.2f} MB")
+
+def print_arbitrage_opportunity(exchange_data):
+    """Tek bir turun verilerinden en iyi alış/satış borsalarını ve arbitraj fırsatını yazdırır"""
+    # Eşitlikte ilk borsa seçilir
+    best_ask = min(exchange_data, key=lambda record: record['ask'])
+    min_ask, min_ask_exchange = best_ask['ask'], best_ask['exchange']
     
-    # Summary dosyaları için de aynı işlemi yapın
-    for file in all_summary_files:
-        try:
-            # Dosya adı formatı: data/summary_YYYY-MM-DD.json
-            file_date_str = file.split('_')[-1].split('.')[0]
-            
-            # Eğer dosya tarihi cutoff_date'den eskiyse, silin
-            if file_date_str < cutoff_date_str:
-                os.remove(file)
-                print(f"Özet dosyası silindi (tarih eskimesi): {file}")
-        except Exception as e:
-            print(f"Özet dosyası işlenirken hata oluştu: {file} - {e}")
+    best_bid = max(exchange_data, key=lambda record: record['bid'])
+    max_bid, max_bid_exchange = best_bid['bid'], best_bid['exchange']
+    
+    # En iyi alış/satış fırsatlarını yazdırın
+    print(f"En iyi alış borsası: {min_ask_exchange} ({min_ask} USDT)")
+    print(f"En iyi satış borsası: {max_bid_exchange} ({max_bid} USDT)")
+    
+    # Arbitraj fırsatı varsa yazdırın
+    if max_bid > min_ask and min_ask_exchange != max_bid_exchange:
+        profit = max_bid - min_ask
+        print(f"Arbitraj fırsatı: {min_ask_exchange}'dan alıp {max_bid_exchange}'a satarak {profit:.2f} USDT/BTC kar potansiyeli")
+
+def print_arbitrage_scan(start_date, end_date, symbol=exchanges.DEFAULT_SYMBOL):
+    """Tarih aralığındaki gerçek (aynı anda var olan) arbitraj fırsatlarını yazdırır"""
+    import arbitrage_scanner
+    
+    archive_dir = os.path.join(tick_storage.symbol_dir(symbol), 'columnar')
+    opportunities = arbitrage_scanner.scan_range(start_date, end_date, archive_dir=archive_dir)
+    print(f"{start_date} - {end_date} arasında komisyon sonrası {len(opportunities)} arbitraj fırsatı bulundu")
+    for opportunity in opportunities:
+        start = datetime.fromtimestamp(opportunity['start'] / 1000, pytz.UTC).strftime('%Y-%m-%d %H:%M:%S')
+        size = f"{opportunity['max_size']:.4f} BTC" if opportunity['max_size'] is not None else "miktar bilinmiyor"
+        print(f"{start} ({opportunity['duration_ms'] / 1000:.0f} sn, {opportunity['snapshots']} tur): "
+              f"{opportunity['buy_exchange']}'dan alıp {opportunity['sell_exchange']}'a sat, "
+              f"{opportunity['max_net_spread']:.2f} USDT/BTC net, {size}")
+
+def print_query(time_range=None, count=None, exchange_names=None, symbol=exchanges.DEFAULT_SYMBOL):
+    """Sorgu sonucunu satır başına bir JSON kayıt olarak yazdırır; özet bilgisi stderr'e gider"""
+    import sys
+    import tick_query
+    
+    data_dir = tick_storage.symbol_dir(symbol)
+    started = time.perf_counter()
+    if time_range:
+        records = tick_query.query_range(*time_range, exchanges=exchange_names, data_dir=data_dir)
+        if count is not None:
+            records = records[-count:] if count > 0 else []
+    else:
+        records = tick_query.latest(count, exchanges=exchange_names, data_dir=data_dir)
+    elapsed = time.perf_counter() - started
+    
+    for record in records:
+        print(json.dumps(record))
+    print(f"{len(records)} kayıt bulundu ({elapsed * 1000:.1f} ms)", file=sys.stderr)
+
+class DailyDataset:
+    """
+    Günün verilerini bellekte tutar ve belirli aralıklarla diske yazar
+    
+    Daemon modunda her turda dosyayı yeniden okumak yerine günün kayıtları
+    bellekte biriktirilir; flush() çağrıldığında yalnızca bekleyen kayıtlar
+    günün dosyasına eklenir ve özet bu kayıtlarla artımlı olarak güncellenir.
+    """
+    def __init__(self):
+        self.date = None
+        self.records = []
+        self.pending = []
+    
+    def _load(self, date):
+        """Günün mevcut kayıtlarını (varsa) belleğe yükler"""
+        self.date = date
+        self.records = tick_storage.read_day(date)
+        self.pending = []
+    
+    def add(self, data):
+        """Yeni kayıtları ekler; gün değiştiyse önceki günü diske yazar"""
+        current_date = datetime.now().strftime('%Y-%m-%d')
+        if current_date != self.date:
+            self.flush()
+            self._load(current_date)
+        self.records.extend(data)
+        self.pending.extend(data)
+    
+    def flush(self):
+        """Bekleyen kayıtları günün dosyasına ekler ve günlük özeti yazar"""
+        if self.date is None or not self.pending:
+            return
+        
+        with metrics.timer('tracker_stage_duration_seconds', stage='persist'):
+            end_offset = tick_storage.append_records(self.date, self.pending)
+        metrics.inc('tracker_records_total', len(self.pending))
+        print(f"{len(self.pending)} yeni kayıt {tick_storage.ndjson_path(self.date)} dosyasına kaydedildi")
+        
+        with metrics.timer('tracker_stage_duration_seconds', stage='summarize'):
+            daily_summary.update_daily_summary(self.date, self.pending, end_offset)
+        with metrics.timer('tracker_stage_duration_seconds', stage='rollup'):
+            candles.update_candles(self.date, self.pending, end_offset)
+        self.pending = []
+
+def run_daemon(interval=60, flush_interval=60, cleanup_interval=3600, tick_deadline=None):
+    """
+    Sürekli çalışan zamanlayıcı modu
+    
+    Parameters:
+    interval (float): İki tur arasındaki süre (saniye, 1'den küçük olabilir)
+    flush_interval (float): Bekleyen verilerin diske yazılma aralığı (saniye)
+    cleanup_interval (float): Eski veri temizliğinin çalışma aralığı (saniye)
+    tick_deadline (float): Tur başına azami süre; verilmezse interval ile TICK_DEADLINE'ın küçüğü
+    """
+    if tick_deadline is None:
+        tick_deadline = min(interval, TICK_DEADLINE)
+    
+    print(f"Daemon modu başlatıldı: her {interval} sn'de bir veri toplanacak, "
+          f"her {flush_interval} sn'de bir diske yazılacak")
+    
+    stop_event = threading.Event()
+    
+    def request_stop(signum, frame):
+        print(f"Sinyal alındı ({signum}), bekleyen veriler yazılıp çıkılıyor...")
+        # Sinyal ana iş parçacığı stop_event'in kilidini tutarken gelebilir; set() ayrı iş parçacığından çağrılır
+        threading.Thread(target=stop_event.set, daemon=True).start()
+    
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    
+    request_policy.load_state()
+    dataset = DailyDataset()
+    start = time.monotonic()
+    tick_index = 0
+    last_flush = start
+    last_cleanup = None
     
-    # data klasörünün boyutunu kontrol edin
     try:
-        total_size = sum(os.path.getsize(f) for f in glob.glob('data/*') if os.path.isfile(f))
-        print(f"Temizleme sonrası data klasörü boyutu: {total_size / (1024*1024):.2f} MB")
-    except Exception as e:
-        print(f"Klasör boyutu hesaplanırken hata oluştu: {e}")
+        while not stop_event.is_set():
+            tick_start = now = time.monotonic()
+            if last_cleanup is None or now - last_cleanup >= cleanup_interval:
+                cleanup_old_data(max_days=7, max_files=30)
+                last_cleanup = now
+            
+            exchange_data = collect_all_exchange_data(tick_deadline=tick_deadline)
+            if exchange_data:
+                dataset.add(exchange_data)
+                print_arbitrage_opportunity(exchange_data)
+            else:
+                print("Hiçbir borsadan veri toplanamadı")
+            
+            now = time.monotonic()
+            if now - last_flush >= flush_interval:
+                dataset.flush()
+                last_flush = now
+            request_policy.save_state(force=False)
+            metrics.observe('tracker_tick_duration_seconds', time.monotonic() - tick_start)
+            
+            # Kaymayı önlemek için bir sonraki turu başlangıç zamanına göre hesaplayın;
+            # tur aralıktan uzun sürdüyse kaçırılan turlar atlanır
+            tick_index += 1
+            next_tick = start + tick_index * interval
+            if next_tick < now:
+                missed = int((now - next_tick) // interval) + 1
+                print(f"Tur {now - tick_start:.2f} sn sürdü, {missed} tur atlandı")
+                tick_index += missed
+                next_tick = start + tick_index * interval
+            stop_event.wait(next_tick - time.monotonic())
+    finally:
+        dataset.flush()
+        quote_validator.save_state()
+        request_policy.save_state()
+        http_session.close_session()
+        print("Daemon modu durduruldu")
 
-def main():
+def serve_until_signal():
+    """Arka plandaki yayın sunucusu çalışırken sinyal gelene kadar bekler"""
+    stop_event = threading.Event()
+    
+    def request_stop(signum, frame):
+        print(f"Sinyal alındı ({signum}), yayın durduruluyor...")
+        # Sinyal ana iş parçacığı stop_event'in kilidini tutarken gelebilir; set() ayrı iş parçacığından çağrılır
+        threading.Thread(target=stop_event.set, daemon=True).start()
+    
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    stop_event.wait()
+
+def main(argv=None):
     """Ana fonksiyon"""
+    parser = argparse.ArgumentParser(description='Borsalardan BTC fiyat verilerini toplar')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Tek seferlik çalışmak yerine sürekli çalışan zamanlayıcı modunu başlatır')
+    parser.add_argument('--interval', type=float, default=60,
+                        help='Daemon modunda turlar arası süre (saniye, varsayılan: 60)')
+    parser.add_argument('--flush-interval', type=float, default=60,
+                        help='Daemon ve akış modunda verilerin diske yazılma aralığı (saniye, varsayılan: 60)')
+    parser.add_argument('--tick-deadline', type=float, default=None,
+                        help='Tur başına azami süre (saniye)')
+    parser.add_argument('--workers', type=int, metavar='N',
+                        help='İstek birimlerini N çalışan sürece bölerek sürekli toplar (çok sayıda sembol ve borsa için)')
+    parser.add_argument('--symbols', nargs='+', metavar='SEMBOL', default=[exchanges.DEFAULT_SYMBOL],
+                        help=f'--workers ve --depth modunda toplanacak semboller; --query, --latest ve --scan-arbitrage '
+                             f'ilk sembolün verilerini okur (varsayılan: {exchanges.DEFAULT_SYMBOL})')
+    parser.add_argument('--depth', action='store_true',
+                        help='En iyi fiyatlar yerine emir defteri derinliğini toplar ve tutar başına VWAP hesaplar')
+    parser.add_argument('--depth-levels', type=int, default=50,
+                        help='Derinlik modunda taraf başına seviye sayısı (varsayılan: 50)')
+    parser.add_argument('--notionals', type=float, nargs='+', metavar='TUTAR', default=[1000, 10000, 100000],
+                        help='Derinlik modunda VWAP hesaplanacak tutarlar (USDT, varsayılan: 1000 10000 100000)')
+    parser.add_argument('--export-json', metavar='YYYY-MM-DD',
+                        help='Günün verilerini eski btc_prices_YYYY-MM-DD.json biçiminde dışa aktarır')
+    parser.add_argument('--convert-columnar', metavar='YYYY-MM-DD', nargs='?', const='all',
+                        help='Ham veri dosyalarını sütunlu arşive (data/columnar) dönüştürür; tarih verilmezse tüm günler')
+    parser.add_argument('--scan-arbitrage', metavar=('BAŞLANGIÇ', 'BİTİŞ'), nargs=2,
+                        help='Sütunlu arşivdeki tarih aralığında eşzamanlı arbitraj fırsatlarını listeler')
+    parser.add_argument('--no-validation', action='store_true',
+                        help='Sıfır, ters (crossed), sentetik, eski ve aykırı kotasyonların karantinaya alınmasını kapatır')
+    parser.add_argument('--hedge', action='store_true',
+                        help="Borsanın p95 süresini aşan isteklerin bir kopyasını gönderir")
+    parser.add_argument('--query', metavar=('BAŞLANGIÇ', 'BİTİŞ'), nargs=2,
+                        help="Zaman aralığındaki kayıtları NDJSON olarak yazdırır (ör. '2025-04-04 14:00' '2025-04-04 14:05', UTC)")
+    parser.add_argument('--latest', type=int, metavar='N',
+                        help='Son N kaydı NDJSON olarak yazdırır')
+    parser.add_argument('--debug', action='store_true',
+                        help='Ham API yanıtlarını ve istek ayrıntılarını yazdırır')
+    parser.add_argument('--metrics-port', type=int,
+                        help='Prometheus biçimindeki metrikleri bu porttan /metrics adresinde yayınlar')
+    parser.add_argument('--metrics-json', metavar='DOSYA',
+                        help='Metrikleri belirli aralıklarla (ve çıkışta) bu JSON dosyasına yazar')
+    parser.add_argument('--metrics-interval', type=float, default=60,
+                        help='Metrik JSON dosyasının yazılma aralığı (saniye, varsayılan: 60)')
+    parser.add_argument('--serve', type=int, metavar='PORT',
+                        help='Güncel özeti ve son kayıtları bu porttan ETag, gzip ve SSE desteğiyle yayınlar; '
+                             'başka bir mod seçilmezse yalnızca dosyaları izleyip yayınlar')
+    parser.add_argument('--serve-host', default='127.0.0.1',
+                        help='Yayın sunucusunun dinleyeceği adres (varsayılan: 127.0.0.1)')
+    parser.add_argument('--stream', action='store_true',
+                        help='REST sorgulaması yerine WebSocket BBO akışlarını dinler (websockets paketi gerekir)')
+    parser.add_argument('--exchanges', nargs='+', metavar='BORSA',
+                        help='Akış, --workers ve --depth modunda kullanılacak borsalar veya --query/--latest için borsa filtresi (varsayılan: tümü)')
+    parser.add_argument('--min-interval', type=float, default=0,
+                        help='Akış modunda borsa başına iki kayıt arasındaki asgari süre (saniye)')
+    parser.add_argument('--record', metavar='DOSYA',
+                        help='Akış modunda ham mesajları yeniden oynatma için bu dosyaya kaydeder')
+    parser.add_argument('--replay', metavar='DOSYA',
+                        help='Kaydedilmiş akış mesajlarını yerel WebSocket sunucusundan yeniden oynatır')
+    parser.add_argument('--replay-port', type=int, default=8766,
+                        help='Yeniden oynatma sunucusunun portu (varsayılan: 8766)')
+    args = parser.parse_args(argv)
+    
+    if args.debug:
+        exchanges.DEBUG = True
+    if args.hedge:
+        request_policy.HEDGE_ENABLED = True
+    if args.no_validation:
+        quote_validator.ENABLED = False
+    if args.metrics_port:
+        metrics.start_http_server(args.metrics_port)
+    if args.metrics_json:
+        metrics.start_json_dump(args.metrics_json, args.metrics_interval)
+    if args.serve:
+        import publish_server
+        publish_server.start_server(args.serve, args.serve_host)
+    
+    try:
+        run(args)
+    finally:
+        if args.metrics_json:
+            metrics.dump_json(args.metrics_json)
+
+def run(args):
+    """Komut satırı argümanlarına göre seçilen modu çalıştırır"""
+    if args.stream or args.replay:
+        import asyncio
+        import ws_stream
+        if args.replay:
+            asyncio.run(ws_stream.replay_server(args.replay, port=args.replay_port))
+        else:
+            asyncio.run(ws_stream.run_stream(exchanges=args.exchanges, flush_interval=args.flush_interval,
+                                             min_interval=args.min_interval, record_path=args.record))
+        return
+    
+    if args.query or args.latest is not None:
+        print_query(args.query, args.latest, args.exchanges, args.symbols[0])
+        return
+    
+    if args.scan_arbitrage:
+        print_arbitrage_scan(*args.scan_arbitrage, symbol=args.symbols[0])
+        return
+    
+    if args.convert_columnar:
+        # numpy yalnızca arşiv işlemlerinde gerekir
+        import columnar_archive
+        if args.convert_columnar == 'all':
+            columnar_archive.convert_all()
+        else:
+            columnar_archive.convert_day(args.convert_columnar)
+        return
+    
+    if args.export_json:
+        output_path = tick_storage.export_json(args.export_json)
+        print(f"{args.export_json} verileri {output_path} dosyasına aktarıldı")
+        return
+    
+    if args.depth:
+        import depth
+        depth.run_depth(levels=args.depth_levels, interval=args.interval, notionals=tuple(args.notionals),
+                        symbols=tuple(args.symbols), venues=args.exchanges, tick_deadline=args.tick_deadline)
+        return
+    
+    if args.workers:
+        import sharded_runner
+        sharded_runner.run_sharded(workers=args.workers, symbols=tuple(args.symbols), venues=args.exchanges,
+                                   interval=args.interval, flush_interval=args.flush_interval,
+                                   tick_deadline=args.tick_deadline,
+                                   cleanup=lambda: cleanup_old_data(max_days=7, max_files=30))
+        return
+    
+    if args.daemon:
+        run_daemon(interval=args.interval, flush_interval=args.flush_interval,
+                   tick_deadline=args.tick_deadline)
+        return
+    
+    if args.serve:
+        # Veriler başka bir süreç (cron, daemon) tarafından yazılır; yalnızca yayın yapılır
+        serve_until_signal()
+        return
+    
     print(f"Veri toplama başlatıldı: {datetime.now()}")
     
-    # Eski verileri temizleyin (7 günden eski veriler ve maksimum 30 dosya)
+    # Eski verileri katmanlarına taşıyın (7 günden eski ham veriler sıkıştırılır, günde bir kez çalışır)
     cleanup_old_data(max_days=7, max_files=30)
     
-    # Tüm borsalardan verileri toplayın
-    exchange_data = collect_all_exchange_data()
+    # Tüm borsalardan verileri toplayın; zaman aşımları ve devreler önceki çalıştırmaların ölçümlerinden başlar
+    request_policy.load_state()
+    tick_start = time.monotonic()
+    exchange_data = collect_all_exchange_data(tick_deadline=args.tick_deadline or TICK_DEADLINE)
+    request_policy.save_state()
     
     if exchange_data:
         # Verileri kaydedin
         save_data_to_file(exchange_data)
         
         # Arbitraj fırsatlarını kontrol edin
-        df = pd.DataFrame(exchange_data)
-        min_ask = df['ask'].min()
-        min_ask_exchange = df.loc[df['ask'] == min_ask, 'exchange'].values[0]
-        
-        max_bid = df['bid'].max()
-        max_bid_exchange = df.loc[df['bid'] == max_bid, 'exchange'].values[0]
-        
-        # En iyi alış/satış fırsatlarını yazdırın
-        print(f"En iyi alış borsası: {min_ask_exchange} ({min_ask} USDT)")
-        print(f"En iyi satış borsası: {max_bid_exchange} ({max_bid} USDT)")
-        
-        # Arbitraj fırsatı varsa yazdırın
-        if max_bid > min_ask and min_ask_exchange != max_bid_exchange:
-            profit = max_bid - min_ask
-            print(f"Arbitraj fırsatı: {min_ask_exchange}'dan alıp {max_bid_exchange}'a satarak {profit:.2f} USDT/BTC kar potansiyeli")
+        print_arbitrage_opportunity(exchange_data)
     else:
         print("Hiçbir borsadan veri toplanamadı")
+    metrics.observe('tracker_tick_duration_seconds', time.monotonic() - tick_start)
 
 if __name__ == "__main__":
     main()
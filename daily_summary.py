@@ -0,0 +1,215 @@
+"""
+Artımlı günlük özet motoru
+
+Günün en iyi alış/satış fiyatları ve her borsanın son durumu bellekte tutulur;
+her tur yalnızca o turun kayıtlarıyla güncellenir (O(borsa sayısı)). Durum küçük
+bir kontrol noktası dosyasına (data/summary_state_YYYY-MM-DD.json) yazılır ve
+süreç yeniden başladığında NDJSON dosyasının yalnızca işlenmemiş kuyruğu okunur.
+
+Üretilen summary_YYYY-MM-DD.json, pandas ile tüm günün yeniden hesaplandığı
+eski create_daily_summary çıktısıyla birebir aynıdır.
+"""
+import json
+import math
+import os
+from datetime import datetime
+
+import pytz
+
+import tick_storage
+
+# pandas'ta float64 sütunlara dönüşen alanlar; çıktının aynı kalması için float'a çevrilir
+NUMERIC_FIELDS = ('bid', 'ask', 'bid_qty', 'ask_qty')
+
+_engines = {}
+
+
+def summary_path(date, data_dir=tick_storage.DATA_DIR):
+    """Günlük özet dosya yolunu döndürür"""
+    return os.path.join(data_dir, f'summary_{date}.json')
+
+
+def checkpoint_path(date, data_dir=tick_storage.DATA_DIR):
+    """Özet motorunun kontrol noktası dosya yolunu döndürür"""
+    return os.path.join(data_dir, f'summary_state_{date}.json')
+
+
+def _is_missing(value):
+    """pandas'ın eksik değer saydığı değerler (None ve NaN)"""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class DailySummary:
+    """Bir günün özetini kayıt kayıt güncelleyen motor"""
+
+    def __init__(self, date):
+        self.date = date
+        self.columns = []
+        self.min_ask = None
+        self.min_ask_exchange = None
+        self.max_bid = None
+        self.max_bid_exchange = None
+        self.latest = {}
+        self.record_count = 0
+        self.offset = 0  # NDJSON dosyasında işlenmiş son bayt
+
+    def update(self, records):
+        """Yeni kayıtları özete işler"""
+        for record in records:
+            for column in record:
+                if column not in self.columns:
+                    self.columns.append(column)
+
+            exchange = record.get('exchange')
+            ask = record.get('ask')
+            bid = record.get('bid')
+
+            # Eşitlikte ilk görülen kayıt kalır (df.loc[...].values[0] davranışı)
+            if not _is_missing(ask) and (self.min_ask is None or ask < self.min_ask):
+                self.min_ask = float(ask)
+                self.min_ask_exchange = exchange
+            if not _is_missing(bid) and (self.max_bid is None or bid > self.max_bid):
+                self.max_bid = float(bid)
+                self.max_bid_exchange = exchange
+
+            # groupby('exchange').last(): her sütunun eksik olmayan son değeri
+            latest = self.latest.setdefault(exchange, {})
+            for column, value in record.items():
+                if column != 'exchange' and not _is_missing(value):
+                    latest[column] = float(value) if column in NUMERIC_FIELDS else value
+
+            self.record_count += 1
+
+    def to_dict(self):
+        """Özeti summary_YYYY-MM-DD.json biçiminde döndürür (kayıt yoksa None)"""
+        if self.record_count == 0:
+            return None
+
+        exchange_data = []
+        for exchange in sorted(self.latest):
+            row = {'exchange': exchange}
+            for column in self.columns:
+                if column == 'exchange':
+                    continue
+                row[column] = self.latest[exchange].get(column, float('nan'))
+            exchange_data.append(row)
+
+        has_both = self.min_ask is not None and self.max_bid is not None
+        return {
+            'date': self.date,
+            'latest_update': datetime.now(pytz.UTC).strftime('%Y-%m-%d %H:%M:%S'),
+            'best_exchange_to_buy': self.min_ask_exchange,
+            'best_exchange_to_sell': self.max_bid_exchange,
+            'arbitrage_opportunity': float(self.max_bid - self.min_ask) if has_both else 0,
+            'exchange_data': exchange_data
+        }
+
+    def to_checkpoint(self):
+        """Motor durumunu JSON'a yazılabilir sözlük olarak döndürür"""
+        return {
+            'date': self.date,
+            'columns': self.columns,
+            'min_ask': self.min_ask,
+            'min_ask_exchange': self.min_ask_exchange,
+            'max_bid': self.max_bid,
+            'max_bid_exchange': self.max_bid_exchange,
+            'latest': self.latest,
+            'record_count': self.record_count,
+            'offset': self.offset
+        }
+
+    @classmethod
+    def from_checkpoint(cls, state):
+        """Kontrol noktası sözlüğünden motoru yeniden oluşturur"""
+        engine = cls(state['date'])
+        engine.columns = state['columns']
+        engine.min_ask = state['min_ask']
+        engine.min_ask_exchange = state['min_ask_exchange']
+        engine.max_bid = state['max_bid']
+        engine.max_bid_exchange = state['max_bid_exchange']
+        engine.latest = state['latest']
+        engine.record_count = state['record_count']
+        engine.offset = state['offset']
+        return engine
+
+
+def rebuild(date, data_dir=tick_storage.DATA_DIR):
+    """Günün tüm kayıtlarını baştan işleyerek motoru oluşturur"""
+    engine = DailySummary(date)
+    engine.update(tick_storage.iter_records(date, data_dir))
+    path = tick_storage.ndjson_path(date, data_dir)
+    engine.offset = os.path.getsize(path) if os.path.exists(path) else 0
+    return engine
+
+
+def load(date, data_dir=tick_storage.DATA_DIR):
+    """
+    Günün özet motorunu kontrol noktasından yükler
+
+    Kontrol noktasından sonra dosyaya eklenmiş kayıtlar varsa yalnızca bu kuyruk
+    okunur; kontrol noktası yoksa veya dosyayla uyuşmuyorsa gün baştan işlenir.
+    """
+    path = checkpoint_path(date, data_dir)
+    ndjson = tick_storage.ndjson_path(date, data_dir)
+    engine = None
+
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as file:
+                engine = DailySummary.from_checkpoint(json.load(file))
+        except (json.JSONDecodeError, KeyError) as e:
+            print(f"Özet kontrol noktası okunamadı ({path}): {e}")
+
+    size = os.path.getsize(ndjson) if os.path.exists(ndjson) else 0
+    if engine is None or engine.offset > size:
+        return rebuild(date, data_dir)
+
+    if engine.offset < size:
+        records, engine.offset = tick_storage.read_from(date, engine.offset, data_dir)
+        engine.update(records)
+    return engine
+
+
+def get_engine(date, data_dir=tick_storage.DATA_DIR):
+    """Gün için bellekteki motoru döndürür; klasörün önceki günlerinin motorlarını bırakır"""
+    key = (data_dir, date)
+    engine = _engines.get(key)
+    if engine is None:
+        # Sembol klasörleri sırayla güncellendiğinden diğer klasörlerin motorları tutulur
+        for previous in [previous for previous in _engines if previous[0] == data_dir]:
+            del _engines[previous]
+        engine = _engines[key] = load(date, data_dir)
+    return engine
+
+
+def write_summary(engine, data_dir=tick_storage.DATA_DIR):
+    """Özet ve kontrol noktası dosyalarını atomik olarak yazar"""
+    summary = engine.to_dict()
+    if summary is None:
+        return None
+
+    output_filename = summary_path(engine.date, data_dir)
+    tick_storage.atomic_write_json(output_filename, summary)
+    tick_storage.atomic_write_json(checkpoint_path(engine.date, data_dir), engine.to_checkpoint(), indent=None)
+    return output_filename
+
+
+def update_daily_summary(date, records, end_offset=None, data_dir=tick_storage.DATA_DIR):
+    """
+    Yeni kayıtları günün özetine işler ve özet dosyasını yazar
+
+    Parameters:
+    date (str): YYYY-MM-DD formatında gün
+    records (list): Bu turda dosyaya eklenen kayıtlar
+    end_offset (int): append_records'un döndürdüğü dosya sonu; kayıtların dosyadaki bitiş konumu
+    data_dir (str): Veri klasörü
+    """
+    engine = get_engine(date, data_dir)
+    if end_offset is not None and engine.offset >= end_offset:
+        # Motor bu kayıtları yüklenirken dosyadan zaten okudu
+        return write_summary(engine, data_dir)
+
+    engine.update(records)
+    if end_offset is not None:
+        engine.offset = end_offset
+    return write_summary(engine, data_dir)
@@ -0,0 +1,416 @@
+"""
+Emir defteri derinliği anlık görüntüleri
+
+--depth modunda her turda borsaların emir defterinin ilk N seviyesi çekilir
+(ExchangeAdapter.depth_path) ve data/depth_YYYY-MM-DD.bin dosyasına ikili
+kayıtlar olarak eklenir. Her kayıt 4 baytlık (little-endian) uzunluk ve
+gövdeden oluşur. Gövde varint'lerden oluşur:
+
+    zaman damgası (epoch ms) | borsa adı | sembol |
+    her taraf için: seviye sayısı, fiyat basamağı, miktar basamağı, seviyeler
+
+Fiyat ve miktar metinleri float'a çevrilmeden, tarafın en uzun ondalık
+kısmına göre sabit noktalı tamsayıya (değer x 10^basamak) dönüştürülür;
+değerler kayıpsız saklanır. İlk seviyenin fiyatı tam değer, sonrakiler bir
+önceki seviyeye göre fark (zigzag varint) olarak yazılır. Bitişik seviyeler
+birkaç fiyat adımı uzakta olduğundan fark çoğunlukla 1-2 bayta sığar.
+
+Aynı turda her borsa ve yapılandırılan her tutar (quote para birimi, ör.
+USDT) için etkin ortalama alış/satış fiyatı (VWAP) hesaplanır ve
+data/depth_vwap_YYYY-MM-DD.ndjson dosyasına yazılır. Hesap seviyeler üzerinde
+tüm tutarlar için tek geçişte yapılır ve en büyük tutar dolduğunda durur.
+"""
+import gzip
+import os
+import signal
+import struct
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from decimal import Decimal
+
+import exchanges
+import http_session
+import metrics
+import request_policy
+import tick_storage
+
+DEFAULT_LEVELS = 50
+DEFAULT_NOTIONALS = (1000, 10000, 100000)
+
+_LENGTH = struct.Struct('<I')
+
+# Bu süreçte kurtarma kontrolünden geçmiş dosyalar
+_recovered_paths = set()
+
+
+def depth_path(date, data_dir=tick_storage.DATA_DIR):
+    """Günün derinlik dosyasının yolunu döndürür"""
+    return os.path.join(data_dir, f'depth_{date}.bin')
+
+
+def vwap_path(date, data_dir=tick_storage.DATA_DIR):
+    """Günün VWAP kayıtları dosyasının yolunu döndürür"""
+    return os.path.join(data_dir, f'depth_vwap_{date}.ndjson')
+
+
+def _to_fixed(values):
+    """
+    Metin sayıları ortak ondalık basamak sayısıyla tamsayıya çevirir
+
+    Returns:
+    tuple: (basamak sayısı, tamsayılar)
+    """
+    decimals = 0
+    parts = []
+    for text in values:
+        if 'e' in text or 'E' in text:
+            text = format(Decimal(text), 'f')
+        whole, _, fraction = text.partition('.')
+        fraction = fraction.rstrip('0')
+        if len(fraction) > decimals:
+            decimals = len(fraction)
+        parts.append((whole, fraction))
+    return decimals, [int(whole + fraction.ljust(decimals, '0')) for whole, fraction in parts]
+
+
+class BookSide(namedtuple('BookSide', ['price_exp', 'prices', 'qty_exp', 'qtys'])):
+    """Emir defterinin bir tarafı: en iyi fiyattan başlayan sabit noktalı seviyeler"""
+    __slots__ = ()
+
+    @classmethod
+    def from_text(cls, levels):
+        """(fiyat, miktar) metin çiftlerinden oluşturur"""
+        price_exp, prices = _to_fixed([price for price, _ in levels])
+        qty_exp, qtys = _to_fixed([qty for _, qty in levels])
+        return cls(price_exp, prices, qty_exp, qtys)
+
+    def levels(self):
+        """Seviyeleri (fiyat, miktar) float çiftleri olarak döndürür"""
+        price_scale = 10 ** self.price_exp
+        qty_scale = 10 ** self.qty_exp
+        return [(price / price_scale, qty / qty_scale) for price, qty in zip(self.prices, self.qtys)]
+
+
+def vwap(side, notionals):
+    """
+    Tutarları (quote) doldurmak için gereken etkin ortalama fiyatları hesaplar
+
+    Alış için satış tarafı (asks), satış için alış tarafı (bids) verilir.
+    Seviyeler bir kez dolaşılır; tutarlar küçükten büyüğe doldurulur.
+
+    Returns:
+    list: notionals sırasıyla VWAP değerleri; derinlik yetmezse None
+    """
+    results = [None] * len(notionals)
+    targets = sorted(range(len(notionals)), key=notionals.__getitem__)
+    price_scale = 10 ** side.price_exp
+    qty_scale = 10 ** side.qty_exp
+    next_target = 0
+    cost = 0.0
+    filled = 0.0
+    for price_fixed, qty_fixed in zip(side.prices, side.qtys):
+        if price_fixed <= 0:
+            continue
+        price = price_fixed / price_scale
+        qty = qty_fixed / qty_scale
+        level_cost = price * qty
+        while next_target < len(targets) and cost + level_cost >= notionals[targets[next_target]]:
+            target = notionals[targets[next_target]]
+            results[targets[next_target]] = target / (filled + (target - cost) / price)
+            next_target += 1
+        if next_target == len(targets):
+            break
+        cost += level_cost
+        filled += qty
+    return results
+
+
+def _put_varint(out, value):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _get_varint(data, position):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+
+def _put_text(out, text):
+    encoded = text.encode('utf-8')
+    _put_varint(out, len(encoded))
+    out += encoded
+
+
+def _get_text(data, position):
+    length, position = _get_varint(data, position)
+    return data[position:position + length].decode('utf-8'), position + length
+
+
+def encode_snapshot(timestamp_ms, exchange, symbol, bids, asks):
+    """Anlık görüntüyü uzunluk önekli ikili kayda çevirir"""
+    body = bytearray()
+    _put_varint(body, timestamp_ms)
+    _put_text(body, exchange)
+    _put_text(body, symbol)
+    for side in (bids, asks):
+        _put_varint(body, len(side.prices))
+        _put_varint(body, side.price_exp)
+        _put_varint(body, side.qty_exp)
+        previous = 0
+        for price, qty in zip(side.prices, side.qtys):
+            delta = price - previous
+            _put_varint(body, delta << 1 if delta >= 0 else (-delta << 1) - 1)
+            _put_varint(body, qty)
+            previous = price
+    return _LENGTH.pack(len(body)) + bytes(body)
+
+
+def decode_snapshot(body):
+    """
+    encode_snapshot gövdesini çözer
+
+    Returns:
+    tuple: (epoch ms, borsa, sembol, alış BookSide, satış BookSide)
+    """
+    timestamp_ms, position = _get_varint(body, 0)
+    exchange, position = _get_text(body, position)
+    symbol, position = _get_text(body, position)
+    sides = []
+    for _ in range(2):
+        count, position = _get_varint(body, position)
+        price_exp, position = _get_varint(body, position)
+        qty_exp, position = _get_varint(body, position)
+        prices = []
+        qtys = []
+        price = 0
+        for _ in range(count):
+            delta, position = _get_varint(body, position)
+            price += delta >> 1 if not delta & 1 else -((delta + 1) >> 1)
+            qty, position = _get_varint(body, position)
+            prices.append(price)
+            qtys.append(qty)
+        sides.append(BookSide(price_exp, prices, qty_exp, qtys))
+    return timestamp_ms, exchange, symbol, sides[0], sides[1]
+
+
+def recover(path):
+    """
+    Yarım kalmış son kaydı keserek dosyayı tutarlı hale getirir
+
+    Returns:
+    int: Atılan bayt sayısı
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb+') as file:
+        size = file.seek(0, os.SEEK_END)
+        position = 0
+        while position + _LENGTH.size <= size:
+            file.seek(position)
+            (length,) = _LENGTH.unpack(file.read(_LENGTH.size))
+            if position + _LENGTH.size + length > size:
+                break
+            position += _LENGTH.size + length
+        if position < size:
+            file.truncate(position)
+    return size - position
+
+
+def append_snapshots(date, encoded, data_dir=tick_storage.DATA_DIR):
+    """Kodlanmış kayıtları günün derinlik dosyasına tek write çağrısıyla ekler"""
+    if not encoded:
+        return None
+    os.makedirs(data_dir, exist_ok=True)
+    path = depth_path(date, data_dir)
+    if path not in _recovered_paths:
+        dropped = recover(path)
+        if dropped:
+            print(f"{path} dosyasındaki yarım kalmış son kayıt atıldı ({dropped} bayt)")
+        _recovered_paths.add(path)
+    return tick_storage.append_raw(path, b''.join(encoded))
+
+
+def iter_snapshots(date, exchange=None, data_dir=tick_storage.DATA_DIR):
+    """
+    Günün derinlik kayıtlarını sırayla döndürür (ılık katmanda .bin.gz okunur)
+
+    Yields:
+    dict: {'exchange', 'symbol', 'timestamp', 'timestamp_ms', 'bids', 'asks'};
+        taraflar (fiyat, miktar) float çiftleri listesidir
+    """
+    path = depth_path(date, data_dir)
+    if os.path.exists(path):
+        file = open(path, 'rb')
+    elif os.path.exists(f'{path}.gz'):
+        file = gzip.open(f'{path}.gz', 'rb')
+    else:
+        return
+    with file:
+        while True:
+            header = file.read(_LENGTH.size)
+            if len(header) < _LENGTH.size:
+                return
+            (length,) = _LENGTH.unpack(header)
+            body = file.read(length)
+            if len(body) < length:
+                # Yazılmakta olan ya da yarım kalmış son kayıt
+                return
+            timestamp_ms, name, symbol, bids, asks = decode_snapshot(body)
+            if exchange is not None and name != exchange:
+                continue
+            yield {'exchange': name, 'symbol': symbol, 'timestamp': tick_storage.format_timestamp(timestamp_ms),
+                   'timestamp_ms': timestamp_ms, 'bids': bids.levels(), 'asks': asks.levels()}
+
+
+def _notional_key(notional):
+    return str(int(notional)) if float(notional).is_integer() else f'{notional:g}'
+
+
+def vwap_record(exchange, symbol, timestamp, bids, asks, notionals):
+    """Bir anlık görüntünün tutar başına VWAP kaydını oluşturur"""
+    record = {'exchange': exchange, 'symbol': symbol, 'timestamp': timestamp, 'mid': None}
+    if bids.prices and asks.prices:
+        record['mid'] = (bids.prices[0] / 10 ** bids.price_exp + asks.prices[0] / 10 ** asks.price_exp) / 2
+    keys = [_notional_key(notional) for notional in notionals]
+    record['buy'] = dict(zip(keys, vwap(asks, notionals)))
+    record['sell'] = dict(zip(keys, vwap(bids, notionals)))
+    return record
+
+
+def plan(symbols=(exchanges.DEFAULT_SYMBOL,), venues=None):
+    """Derinlik uç noktası olan borsalar için (adaptör, sembol) çiftleri"""
+    units = []
+    for name in (venues or exchanges.REGISTRY):
+        adapter = exchanges.REGISTRY[name]
+        if adapter.depth_path is None:
+            continue
+        units.extend((adapter, symbol) for symbol in symbols if symbol in adapter.symbols)
+    return units
+
+
+def capture(executor, units, levels, notionals, tick_deadline):
+    """
+    Tüm birimlerin emir defterlerini eşzamanlı çeker
+
+    Returns:
+    tuple: (kodlanmış kayıtlar, VWAP kayıtları)
+    """
+    futures = [executor.submit(exchanges.call_with_policy, adapter, adapter.fetch_depth, symbol, levels)
+               for adapter, symbol in units]
+    wait(futures, timeout=tick_deadline)
+
+    timestamp_ms = tick_storage.now_ms()
+    timestamp = tick_storage.format_timestamp(timestamp_ms)
+    encoded = []
+    vwaps = []
+    with metrics.timer('tracker_stage_duration_seconds', stage='depth'):
+        for (adapter, symbol), future in zip(units, futures):
+            if not future.done():
+                future.cancel()
+                metrics.inc('tracker_deadline_missed_total', exchange=adapter.name)
+                print(f"❌ {adapter.name} {tick_deadline} sn içinde yanıt vermedi, bu turda atlandı")
+                continue
+            book = future.result()
+            if book is None:
+                continue
+            bids, asks = BookSide.from_text(book[0]), BookSide.from_text(book[1])
+            encoded.append(encode_snapshot(timestamp_ms, adapter.name, symbol, bids, asks))
+            vwaps.append(vwap_record(adapter.name, symbol, timestamp, bids, asks, notionals))
+    return encoded, vwaps
+
+
+def format_best(vwaps, notionals):
+    """Her tutar için en ucuza alınan ve en pahalıya satılan borsayı özetler"""
+    lines = []
+    for notional in notionals:
+        key = _notional_key(notional)
+        buys = [(record['buy'][key], record['exchange']) for record in vwaps if record['buy'][key] is not None]
+        sells = [(record['sell'][key], record['exchange']) for record in vwaps if record['sell'][key] is not None]
+        if not buys or not sells:
+            continue
+        buy_price, buy_exchange = min(buys)
+        sell_price, sell_exchange = max(sells)
+        lines.append(f"{key} USDT: en iyi alış {buy_exchange} ({buy_price:.2f}), "
+                     f"en iyi satış {sell_exchange} ({sell_price:.2f})")
+    return '\n'.join(lines)
+
+
+def run_depth(levels=DEFAULT_LEVELS, interval=1, notionals=DEFAULT_NOTIONALS, symbols=(exchanges.DEFAULT_SYMBOL,),
+              venues=None, tick_deadline=None, data_dir=tick_storage.DATA_DIR):
+    """
+    Derinlik anlık görüntülerini sürekli toplar
+
+    İstek politikası durumu run_daemon'daki gibi başta yüklenir, turlarda
+    SAVE_INTERVAL aralıklarla ve çıkışta kaydedilir.
+
+    Parameters:
+    levels (int): Taraf başına seviye sayısı
+    interval (float): Turlar arası süre (saniye)
+    notionals (tuple): VWAP hesaplanacak tutarlar (quote para birimi)
+    symbols (tuple): Ortak semboller
+    venues (list): Borsa adları (varsayılan: derinlik uç noktası olan tüm borsalar)
+    tick_deadline (float): Tur başına azami süre; verilmezse interval ile 12 sn'nin küçüğü
+    data_dir (str): Kayıtların ve istek politikası durumunun yazılacağı klasör
+    """
+    units = plan(symbols, venues)
+    if tick_deadline is None:
+        tick_deadline = min(interval, 12)
+    print(f"Derinlik modu başlatıldı: {len(units)} defter, {levels} seviye, her {interval} sn'de bir")
+
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"Sinyal alındı ({signum}), derinlik modu durduruluyor...")
+        # Sinyal ana iş parçacığı stop_event'in kilidini tutarken gelebilir; set() ayrı iş parçacığından çağrılır
+        threading.Thread(target=stop_event.set, daemon=True).start()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    # Defter yanıtları ticker'lardan yavaştır; süreler ve devre durumları ayrı dosyada tutulur
+    request_policy.STATE_NAME = 'request_policy_state_depth'
+    request_policy.load_state(data_dir)
+    http_session.configure_pools(exchanges.pool_sizes(units, depth=True))
+    executor = ThreadPoolExecutor(max_workers=len(units) * 2 or 1, thread_name_prefix='depth-fetch')
+    start = time.monotonic()
+    tick_index = 0
+    try:
+        while not stop_event.is_set():
+            tick_start = time.monotonic()
+            current_date = datetime.now().strftime('%Y-%m-%d')
+            encoded, vwaps = capture(executor, units, levels, notionals, tick_deadline)
+            if encoded:
+                with metrics.timer('tracker_stage_duration_seconds', stage='persist'):
+                    append_snapshots(current_date, encoded, data_dir)
+                    tick_storage.append_lines(vwap_path(current_date, data_dir), vwaps)
+                best = format_best(vwaps, notionals)
+                if best:
+                    print(best)
+            else:
+                print("Hiçbir borsadan derinlik verisi alınamadı")
+            metrics.observe('tracker_tick_duration_seconds', time.monotonic() - tick_start)
+            request_policy.save_state(data_dir, force=False)
+
+            tick_index += 1
+            next_tick = start + tick_index * interval
+            now = time.monotonic()
+            if next_tick < now:
+                tick_index += int((now - next_tick) // interval) + 1
+                next_tick = start + tick_index * interval
+            stop_event.wait(next_tick - time.monotonic())
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        request_policy.save_state(data_dir)
+        print("Derinlik modu durduruldu")
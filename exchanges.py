@@ -0,0 +1,538 @@
+"""
+Borsa adaptör kaydı
+
+Her borsa bir ExchangeAdapter olarak tanımlanır: API adresi, sembol eşlemesi,
+tek sembollük uç nokta ve (varsa) çok sembollü toplu ticker uç noktası ile
+bunların yanıtlarını (bid, ask, bid_qty, ask_qty) demetine çeviren
+ayrıştırıcılar. Yeni bir borsa veya işlem çifti eklemek için fetch kodu
+kopyalamak yerine register() ile yeni bir tanım eklemek yeterlidir.
+
+Toplayıcı her borsa için bir istek planı çıkarır: istenen sembol sayısı
+batch_threshold'a ulaşıyorsa ve borsanın toplu uç noktası varsa tek istek,
+aksi halde sembol başına bir istek.
+"""
+import json
+import os
+import traceback
+from collections import namedtuple
+from urllib.parse import quote
+
+import requests
+
+import fast_json
+import metrics
+import request_policy
+import tick_storage
+
+DEFAULT_SYMBOL = tick_storage.DEFAULT_SYMBOL
+
+# Borsa API adresleri. BTC_TRACKER_API_BASE tanımlıysa tüm istekler bu adrese
+# gider; böylece toplayıcı yerel bir stub HTTP sunucusuna karşı test edilebilir.
+API_BASE_URLS = {
+    'Binance': 'https://api.binance.com',
+    'OKX': 'https://www.okx.com',
+    'Coinbase': 'https://api.exchange.coinbase.com',
+    'CoinbaseSpot': 'https://api.coinbase.com',
+    'Kraken': 'https://api.kraken.com',
+    'Bybit': 'https://api.bybit.com',
+    'KuCoin': 'https://api.kucoin.com',
+}
+if os.environ.get('BTC_TRACKER_API_BASE'):
+    API_BASE_URLS = {name: os.environ['BTC_TRACKER_API_BASE'].rstrip('/') for name in API_BASE_URLS}
+
+# Ham API yanıtlarının yazdırılması yalnızca hata ayıklama modunda (BTC_TRACKER_DEBUG=1 veya --debug)
+DEBUG = os.environ.get('BTC_TRACKER_DEBUG') == '1'
+
+
+class QuoteError(Exception):
+    """Borsa yanıtı beklenen kotasyonu içermediğinde fırlatılır"""
+
+
+class HTTPStatusError(QuoteError):
+    """Borsa 200 dışında bir HTTP durum kodu döndürdüğünde fırlatılır"""
+
+
+# Ayrıştırıcıların döndürdüğü kotasyon; demet olduğundan örnek başına __dict__ tutmaz
+# ve (bid, ask, bid_qty, ask_qty) olarak açılabilir
+Quote = namedtuple('Quote', ['bid', 'ask', 'bid_qty', 'ask_qty'])
+
+
+class SyntheticQuote(Quote):
+    """Emir defterinden değil yaklaşık bir fiyattan üretilmiş kotasyon; kaydı 'synthetic' olarak işaretlenir"""
+    __slots__ = ()
+
+
+class ExchangeAdapter:
+    """
+    Bir borsanın REST ticker tanımı
+
+    Parameters:
+    name (str): Kayıtlarda görünen borsa adı
+    symbols (dict): Ortak sembol (ör. 'BTC/USDT') -> borsadaki sembol
+    quote_path (str): Tek sembollük uç nokta; {symbol} borsadaki sembolle doldurulur
+    parse_quote (callable): (json, borsa sembolü) -> Quote
+    batch_path (callable): Borsa sembolleri listesi -> toplu uç nokta yolu
+    parse_batch (callable): (json, borsa sembolleri) -> {borsa sembolü: Quote}
+    batch_threshold (int): Toplu uç noktanın kullanılacağı asgari sembol sayısı
+    fetch (callable): Birden fazla istek gerektiren borsalar için özel çekme fonksiyonu
+    fetch_bases (tuple): fetch'in istek attığı API_BASE_URLS anahtarları (varsayılan: yalnızca borsanın adresi)
+    depth_path (str): Emir defteri derinliği uç noktası; {symbol} ve {limit} doldurulur
+    depth_base (str): Derinlik uç noktası başka bir adresteyse API_BASE_URLS anahtarı
+    parse_depth (callable): (json, borsa sembolü) -> (alış seviyeleri, satış seviyeleri);
+        seviyeler en iyi fiyattan başlayan (fiyat, miktar) metin çiftleridir
+    """
+
+    def __init__(self, name, symbols, quote_path=None, parse_quote=None, batch_path=None,
+                 parse_batch=None, batch_threshold=2, fetch=None, depth_path=None, parse_depth=None,
+                 depth_base=None, fetch_bases=None):
+        self.name = name
+        self.symbols = symbols
+        self.quote_path = quote_path
+        self.parse_quote = parse_quote
+        self.batch_path = batch_path
+        self.parse_batch = parse_batch
+        self.batch_threshold = batch_threshold
+        self.fetch = fetch
+        self.fetch_bases = fetch_bases or (name,)
+        self.depth_path = depth_path
+        self.parse_depth = parse_depth
+        self.depth_base = depth_base or name
+
+    @property
+    def base_url(self):
+        return API_BASE_URLS[self.name]
+
+    def plan(self, symbols):
+        """
+        İstenen semboller için istek birimlerini döndürür
+
+        Returns:
+        list: Her biri aynı istekle çekilecek ortak semboller listesi
+        """
+        supported = [symbol for symbol in symbols if symbol in self.symbols]
+        if not supported:
+            return []
+        if self.batch_path is not None and len(supported) >= self.batch_threshold:
+            return [supported]
+        return [[symbol] for symbol in supported]
+
+    def fetch_quotes(self, symbols):
+        """
+        Bir istek birimindeki sembollerin kotasyonlarını çeker
+
+        Returns:
+        dict: Ortak sembol -> Quote
+        """
+        venue_symbols = [self.symbols[symbol] for symbol in symbols]
+        if len(symbols) > 1:
+            data = _get_json(self.name, f'{self.base_url}{self.batch_path(venue_symbols)}')
+            quotes = self.parse_batch(data, venue_symbols)
+            return {symbol: quotes[venue_symbol] for symbol, venue_symbol in zip(symbols, venue_symbols)
+                    if venue_symbol in quotes}
+
+        if self.fetch is not None:
+            return {symbols[0]: self.fetch(venue_symbols[0])}
+
+        url = f'{self.base_url}{self.quote_path.format(symbol=venue_symbols[0])}'
+        return {symbols[0]: self.parse_quote(_get_json(self.name, url), venue_symbols[0])}
+
+    def fetch_depth(self, symbol, levels):
+        """
+        Sembolün emir defterinin ilk levels seviyesini çeker
+
+        Returns:
+        tuple: (alış seviyeleri, satış seviyeleri); her biri (fiyat, miktar) metin çiftleri
+        """
+        venue_symbol = self.symbols[symbol]
+        url = f'{API_BASE_URLS[self.depth_base]}{self.depth_path.format(symbol=venue_symbol, limit=levels)}'
+        bids, asks = self.parse_depth(_get_json(self.name, url), venue_symbol)
+        return ([(str(price), str(qty)) for price, qty, *_ in bids[:levels]],
+                [(str(price), str(qty)) for price, qty, *_ in asks[:levels]])
+
+
+REGISTRY = {}
+
+
+def register(adapter):
+    """Adaptörü kayda ekler"""
+    REGISTRY[adapter.name] = adapter
+    return adapter
+
+
+def make_record(exchange, quote, timestamp=None, symbol=DEFAULT_SYMBOL):
+    """Quote (veya aynı sıradaki demet) kotasyonundan standart kayıt oluşturur"""
+    bid, ask, bid_qty, ask_qty = quote
+    record = {
+        'exchange': exchange,
+        'symbol': symbol,
+        'timestamp': timestamp or tick_storage.format_timestamp(tick_storage.now_ms()),
+        'bid': bid,
+        'ask': ask,
+        'bid_qty': bid_qty,
+        'ask_qty': ask_qty
+    }
+    if isinstance(quote, SyntheticQuote):
+        # Doğrulama katmanı bu kayıtları veri setine almaz (quote_validator)
+        record['synthetic'] = True
+    return record
+
+
+def _get_json(name, url, exchange=None):
+    """
+    GET isteği gönderir ve JSON yanıtı döndürür; 200 dışındaki yanıtlarda HTTPStatusError fırlatır
+
+    Parameters:
+    name (str): Günlükte görünen uç nokta adı
+    url (str): İstek adresi
+    exchange (str): Metriklerde kullanılacak borsa adı (varsayılan: name)
+    """
+    exchange = exchange or name
+    if DEBUG:
+        print(f"{name} API'sine istek gönderiliyor...")
+    with metrics.timer('tracker_request_duration_seconds', exchange=exchange):
+        response = request_policy.send(exchange, url)
+    metrics.inc('tracker_response_bytes_total', len(response.content), exchange=exchange)
+    if DEBUG:
+        print(f"{name} API yanıt kodu: {response.status_code}")
+    if response.status_code != 200:
+        raise HTTPStatusError(f"yanıt kodu {response.status_code}, içerik: {response.text[:200]}...")
+
+    with metrics.timer('tracker_stage_duration_seconds', stage='parse'):
+        data = fast_json.loads(response.content)
+    if DEBUG:
+        print(f"{name} veri alındı: {data}")
+    return data
+
+
+def _has_data(result):
+    """Çağrı sonucunda en az bir kotasyon veya defter olup olmadığını döndürür"""
+    if isinstance(result, dict):
+        return any(value is not None for value in result.values())
+    return result is not None
+
+
+def call_with_policy(adapter, fetch, *args):
+    """
+    Borsa çağrısını devre kesici, süre bütçesi, hata sayaçları ve metriklerle çalıştırır
+
+    Kotasyon döndürmeyen çağrılar (ör. Coinbase'in yedek uç noktası da başarısız
+    olduğunda None) başarı sayılmaz; devre kesiciye hata olarak işlenir.
+
+    Returns:
+    fetch'in sonucu; devre açıksa, hata olursa veya veri alınamazsa None
+    """
+    policy = request_policy.get_policy(adapter.name)
+    if not policy.allow():
+        print(f"{adapter.name} devresi açık, bu turda atlandı")
+        metrics.inc('tracker_request_errors_total', exchange=adapter.name, kind='circuit_open')
+        return None
+
+    error_kind = None
+    try:
+        with metrics.timer('tracker_stage_duration_seconds', stage='fetch'), request_policy.unit_budget(adapter.name):
+            result = fetch(*args)
+    except requests.exceptions.Timeout:
+        print(f"{adapter.name} API zaman aşımı hatası")
+        error_kind = 'timeout'
+    except requests.exceptions.ConnectionError:
+        print(f"{adapter.name} API bağlantı hatası")
+        error_kind = 'connection'
+    except QuoteError as e:
+        print(f"{adapter.name} API veri hatası: {e}")
+        error_kind = 'http' if isinstance(e, HTTPStatusError) else 'data'
+    except Exception as e:
+        print(f"{adapter.name} veri çekme hatası: {e}")
+        traceback.print_exc()  # Tam hata izlemeyi yazdır
+        error_kind = 'other'
+    else:
+        if not _has_data(result):
+            print(f"{adapter.name} API'sinden veri alınamadı")
+            error_kind = 'data'
+
+    if error_kind is not None:
+        metrics.inc('tracker_request_errors_total', exchange=adapter.name, kind=error_kind)
+        policy.record_failure()
+        return None
+    policy.record_success()
+    return result
+
+
+def fetch_unit(adapter, symbols):
+    """
+    Bir istek birimini çeker ve kayıtlara dönüştürür; hatalarda boş sözlük döndürür
+
+    Returns:
+    dict: Ortak sembol -> kayıt
+    """
+    quotes = call_with_policy(adapter, adapter.fetch_quotes, symbols)
+    if quotes is None:
+        return {}
+
+    # Birimdeki tüm kayıtlar için saat bir kez okunur
+    timestamp = tick_storage.format_timestamp(tick_storage.now_ms())
+    return {symbol: make_record(adapter.name, quote, timestamp, symbol)
+            for symbol, quote in quotes.items() if quote is not None}
+
+
+def fetch_quote(name, symbol=DEFAULT_SYMBOL):
+    """Tek bir borsadan tek sembolün kaydını çeker (alınamazsa None)"""
+    return fetch_unit(REGISTRY[name], [symbol]).get(symbol)
+
+
+def plan_requests(symbols=(DEFAULT_SYMBOL,), venues=None):
+    """
+    N borsa x M sembol için istek planını çıkarır
+
+    Returns:
+    list: (adaptör, semboller) demetleri
+    """
+    units = []
+    for name in (venues or REGISTRY):
+        adapter = REGISTRY[name]
+        units.extend((adapter, unit) for unit in adapter.plan(symbols))
+    return units
+
+
+def pool_sizes(units, depth=False):
+    """
+    İstek planından API adresi başına gereken bağlantı havuzu boyutunu çıkarır
+
+    Bir birimin istekleri sırayla gönderildiğinden her birim bir adreste en fazla
+    bir bağlantı kullanır; --hedge açıksa isteklerin kopyası için bir bağlantı daha
+    gerekir. Stub sunucusunda olduğu gibi birden fazla borsa aynı adresi
+    paylaşıyorsa birimleri toplanır.
+
+    Parameters:
+    units (list): (adaptör, semboller) demetleri
+    depth (bool): True ise derinlik uç noktalarının adresleri kullanılır
+
+    Returns:
+    dict: API adresi -> eşzamanlı bağlantı sayısı
+    """
+    copies = 2 if request_policy.HEDGE_ENABLED else 1
+    sizes = {}
+    for adapter, _ in units:
+        keys = (adapter.depth_base,) if depth else adapter.fetch_bases
+        for url in {API_BASE_URLS[key] for key in keys}:
+            sizes[url] = sizes.get(url, 0) + copies
+    return sizes
+
+
+# --- Binance ---
+
+def _binance_quote(data):
+    return Quote(float(data['bidPrice']), float(data['askPrice']), float(data['bidQty']), float(data['askQty']))
+
+
+register(ExchangeAdapter(
+    'Binance',
+    symbols={'BTC/USDT': 'BTCUSDT', 'ETH/USDT': 'ETHUSDT'},
+    quote_path='/api/v3/ticker/bookTicker?symbol={symbol}',
+    parse_quote=lambda data, symbol: _binance_quote(data),
+    batch_path=lambda symbols: '/api/v3/ticker/bookTicker?symbols=' + quote(json.dumps(symbols, separators=(',', ':'))),
+    parse_batch=lambda data, symbols: {item['symbol']: _binance_quote(item) for item in data},
+    depth_path='/api/v3/depth?symbol={symbol}&limit={limit}',
+    parse_depth=lambda data, symbol: (data['bids'], data['asks']),
+))
+
+
+# --- OKX ---
+
+def _okx_quote(ticker):
+    return Quote(float(ticker['bidPx']),  # En iyi alış fiyatı
+                 float(ticker['askPx']),  # En iyi satış fiyatı
+                 float(ticker['bidSz']),  # Alış miktarı
+                 float(ticker['askSz']))  # Satış miktarı
+
+
+def _okx_data(data):
+    if data.get('code') == '0' and len(data.get('data', [])) > 0:
+        return data['data']
+    raise QuoteError(f"{data}")
+
+
+register(ExchangeAdapter(
+    'OKX',
+    symbols={'BTC/USDT': 'BTC-USDT', 'ETH/USDT': 'ETH-USDT'},
+    quote_path='/api/v5/market/ticker?instId={symbol}',
+    parse_quote=lambda data, symbol: _okx_quote(_okx_data(data)[0]),
+    batch_path=lambda symbols: '/api/v5/market/tickers?instType=SPOT',
+    parse_batch=lambda data, symbols: {item['instId']: _okx_quote(item) for item in _okx_data(data)
+                                       if item['instId'] in symbols},
+    # Seviyeler [fiyat, miktar, '0', emir sayısı] biçimindedir
+    depth_path='/api/v5/market/books?instId={symbol}&sz={limit}',
+    parse_depth=lambda data, symbol: (_okx_data(data)[0]['bids'], _okx_data(data)[0]['asks']),
+))
+
+
+# --- Coinbase ---
+
+def _fetch_coinbase(symbol):
+    """Coinbase ticker + level 1 order book; ticker alınamazsa spot fiyat uç noktası"""
+    try:
+        # Coinbase Pro API kullanıyoruz (eski GDAX)
+        ticker_data = _get_json('Coinbase', f"{API_BASE_URLS['Coinbase']}/products/{symbol}/ticker")
+    except QuoteError as e:
+        print(f"Coinbase API {e}")
+        # Alternatif endpoint deneyelim
+        print("Alternatif Coinbase API'si deneniyor...")
+        try:
+            alt_data = _get_json('Alternatif Coinbase', f"{API_BASE_URLS['CoinbaseSpot']}/v2/prices/{symbol}/spot",
+                                 exchange='Coinbase')
+        except Exception as alt_e:
+            print(f"Alternatif Coinbase API hatası: {alt_e}")
+            return None
+        price = float(alt_data['data']['amount'])
+        return SyntheticQuote(price * 0.995,  # Yaklaşık bir değer
+                              price * 1.005,  # Yaklaşık bir değer
+                              None, None)
+
+    # Derinlik bilgisi alalım
+    try:
+        book_data = _get_json('Coinbase order book', f"{API_BASE_URLS['Coinbase']}/products/{symbol}/book?level=1",
+                              exchange='Coinbase')
+    except QuoteError as e:
+        print(f"Coinbase order book API {e}")
+        book_data = {'bids': [[0, 0]], 'asks': [[0, 0]]}
+
+    bids, asks = book_data['bids'], book_data['asks']
+    best_bid = bids[0] if bids else None
+    best_ask = asks[0] if asks else None
+    price = float(ticker_data['price']) if best_bid is None or best_ask is None else None
+    return Quote(float(best_bid[0]) if best_bid is not None else price,
+                 float(best_ask[0]) if best_ask is not None else price,
+                 float(best_bid[1]) if best_bid is not None else None,
+                 float(best_ask[1]) if best_ask is not None else None)
+
+
+def _coinbase_pricebook(book):
+    return ([(level['price'], level['size']) for level in book['bids']],
+            [(level['price'], level['size']) for level in book['asks']])
+
+
+register(ExchangeAdapter(
+    'Coinbase',
+    symbols={'BTC/USDT': 'BTC-USD', 'ETH/USDT': 'ETH-USD'},
+    fetch=_fetch_coinbase,
+    fetch_bases=('Coinbase', 'CoinbaseSpot'),
+    # Exchange API'deki book?level=2 sınırsız toplu defterin tamamını döndürür; bunun yerine seviye
+    # sayısı sınırlanabilen Advanced Trade kamu uç noktası kullanılır
+    depth_base='CoinbaseSpot',
+    depth_path='/api/v3/brokerage/market/product_book?product_id={symbol}&limit={limit}',
+    parse_depth=lambda data, symbol: _coinbase_pricebook(data['pricebook']),
+))
+
+
+# --- Kraken ---
+
+# Kraken istekte XBTUSD, yanıtta XXBTZUSD gibi farklı anahtarlar kullanır
+KRAKEN_RESULT_KEYS = {'XBTUSD': 'XXBTZUSD', 'ETHUSD': 'XETHZUSD'}
+
+
+def _kraken_quotes(data, symbols):
+    if 'error' in data and len(data['error']) > 0:
+        raise QuoteError(f"Kraken API hata döndürdü: {data['error']}")
+    result = data.get('result', {})
+    quotes = {}
+    for symbol in symbols:
+        ticker = result.get(KRAKEN_RESULT_KEYS.get(symbol, symbol))
+        if ticker is not None:
+            bid, ask = ticker['b'], ticker['a']
+            quotes[symbol] = Quote(float(bid[0]), float(ask[0]), float(bid[2]), float(ask[2]))
+    if not quotes:
+        raise QuoteError(f"Kraken API beklenmeyen yanıt formatı: {data}")
+    return quotes
+
+
+def _kraken_depth(data, symbol):
+    if 'error' in data and len(data['error']) > 0:
+        raise QuoteError(f"Kraken API hata döndürdü: {data['error']}")
+    book = data.get('result', {}).get(KRAKEN_RESULT_KEYS.get(symbol, symbol))
+    if book is None:
+        raise QuoteError(f"Kraken API beklenmeyen yanıt formatı: {data}")
+    return book['bids'], book['asks']
+
+
+register(ExchangeAdapter(
+    'Kraken',
+    symbols={'BTC/USDT': 'XBTUSD', 'ETH/USDT': 'ETHUSD'},
+    quote_path='/0/public/Ticker?pair={symbol}',
+    parse_quote=lambda data, symbol: _kraken_quotes(data, [symbol])[symbol],
+    batch_path=lambda symbols: '/0/public/Ticker?pair=' + ','.join(symbols),
+    parse_batch=_kraken_quotes,
+    depth_path='/0/public/Depth?pair={symbol}&count={limit}',
+    parse_depth=_kraken_depth,
+))
+
+
+# --- Bybit ---
+
+def _bybit_result(data):
+    if data.get('retCode') == 0 and 'result' in data:
+        return data['result']
+    raise QuoteError(f"Bybit API hata döndürdü: {data}")
+
+
+def _bybit_book_quote(result):
+    # Boş taraf 0 olarak kaydedilir
+    bids = result.get('b') or []
+    asks = result.get('a') or []
+    best_bid = bids[0] if bids else (0, 0)
+    best_ask = asks[0] if asks else (0, 0)
+    return Quote(float(best_bid[0]), float(best_ask[0]), float(best_bid[1]), float(best_ask[1]))
+
+
+register(ExchangeAdapter(
+    'Bybit',
+    symbols={'BTC/USDT': 'BTCUSDT', 'ETH/USDT': 'ETHUSDT'},
+    quote_path='/v5/market/orderbook?category=spot&symbol={symbol}&limit=1',
+    parse_quote=lambda data, symbol: _bybit_book_quote(_bybit_result(data)),
+    batch_path=lambda symbols: '/v5/market/tickers?category=spot',
+    parse_batch=lambda data, symbols: {
+        item['symbol']: Quote(float(item['bid1Price'] or 0), float(item['ask1Price'] or 0),
+                              float(item['bid1Size'] or 0), float(item['ask1Size'] or 0))
+        for item in _bybit_result(data)['list'] if item['symbol'] in symbols
+    },
+    depth_path='/v5/market/orderbook?category=spot&symbol={symbol}&limit={limit}',
+    parse_depth=lambda data, symbol: (_bybit_result(data)['b'], _bybit_result(data)['a']),
+))
+
+
+# --- KuCoin ---
+
+def _kucoin_data(data):
+    if data.get('code') == '200000' and 'data' in data:
+        return data['data']
+    raise QuoteError(f"KuCoin API hata döndürdü: {data}")
+
+
+def _kucoin_quote(result):
+    # Eğer bid veya ask yoksa price değerini kullan; hacim bilgisi yoksa None
+    bid_size = result.get('bidSize')
+    ask_size = result.get('askSize')
+    return Quote(float(result.get('bestBid', result.get('price', 0))),
+                 float(result.get('bestAsk', result.get('price', 0))),
+                 float(bid_size) if 'bidSize' in result else None,
+                 float(ask_size) if 'askSize' in result else None)
+
+
+def _kucoin_batch_quote(item):
+    bid_size = item.get('bestBidSize')
+    ask_size = item.get('bestAskSize')
+    return Quote(float(item['buy']), float(item['sell']),
+                 float(bid_size) if bid_size is not None else None,
+                 float(ask_size) if ask_size is not None else None)
+
+
+register(ExchangeAdapter(
+    'KuCoin',
+    symbols={'BTC/USDT': 'BTC-USDT', 'ETH/USDT': 'ETH-USDT'},
+    quote_path='/api/v1/market/orderbook/level1?symbol={symbol}',
+    parse_quote=lambda data, symbol: _kucoin_quote(_kucoin_data(data)),
+    batch_path=lambda symbols: '/api/v1/market/allTickers',
+    parse_batch=lambda data, symbols: {item['symbol']: _kucoin_batch_quote(item)
+                                       for item in _kucoin_data(data)['ticker'] if item['symbol'] in symbols},
+    # Herkese açık uç nokta yalnızca 20 ve 100 seviyelik defter sunar
+    depth_path='/api/v1/market/orderbook/level2_100?symbol={symbol}',
+    parse_depth=lambda data, symbol: (_kucoin_data(data)['bids'], _kucoin_data(data)['asks']),
+))
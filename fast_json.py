@@ -0,0 +1,37 @@
+"""
+Hızlı JSON çözümleme katmanı
+
+Borsa yanıtları, WebSocket mesajları ve NDJSON satırları bu modülün loads
+fonksiyonuyla çözülür. İsteğe bağlı 'orjson' paketi kuruluysa (pip install
+orjson) o kullanılır; yoksa standart json modülüne düşülür. Her iki arka uç da
+bytes kabul ettiğinden yanıt gövdesinin ve dosya satırlarının önce str'ye
+çevrilmesi gerekmez.
+
+orjson.JSONDecodeError, json.JSONDecodeError'ın alt sınıfıdır; çağıranlar
+yalnızca json.JSONDecodeError yakalamaya devam edebilir.
+"""
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - isteğe bağlı bağımlılık
+    orjson = None
+
+# BTC_TRACKER_JSON=json ile hızlı arka uç kurulu olsa bile standart modül kullanılır
+if os.environ.get('BTC_TRACKER_JSON') == 'json':
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def loads(data):
+    """JSON metnini (str veya bytes) çözer"""
+    if orjson is None:
+        return json.loads(data)
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # orjson NaN/Infinity ve 64 bitten büyük tamsayıları kabul etmez; json.dumps
+        # bunları yazabildiğinden bu satırlar standart modülle yeniden denenir
+        return json.loads(data)
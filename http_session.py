@@ -0,0 +1,150 @@
+"""
+Borsa istekleri için paylaşılan, keep-alive destekli HTTP oturum katmanı
+
+Tüm get_*_data fonksiyonları aynı requests.Session üzerinden istek atar. Böylece
+her çağrıda yeni bir TCP+TLS el sıkışması yapılmaz; host bazında bağlantı
+havuzları, yeniden deneme/geri çekilme politikası ve bağlantı yeniden kullanım
+istatistikleri tek yerden yönetilir.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+# İstek planında olmayan adresler için açık tutulacak azami bağlantı sayısı; plandaki
+# adreslerin havuzları configure_pools ile eşzamanlı istek sayısına göre boyutlanır
+DEFAULT_POOL_SIZE = 2
+
+# Geçici hatalarda yeniden deneme politikası (429 ve 5xx yanıtları, bağlantı kurulamaması)
+RETRY_TOTAL = 2
+RETRY_BACKOFF = 0.2
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_session = None
+_session_lock = threading.Lock()
+# API adresi -> havuz boyutu (configure_pools)
+_pool_sizes = {}
+
+
+def _build_retry():
+    """Yeniden deneme/geri çekilme politikasını oluşturur"""
+    return Retry(total=RETRY_TOTAL,
+                 read=0,  # Okuma zaman aşımı tekrarlanmaz, aksi halde 10 sn'lik timeout katlanır
+                 backoff_factor=RETRY_BACKOFF,
+                 status_forcelist=RETRY_STATUSES,
+                 allowed_methods=frozenset(['GET']),
+                 raise_on_status=False,  # Son yanıt çağırana döner, durum kodunu fetcher kontrol eder
+                 respect_retry_after_header=True)
+
+
+def _build_adapter(pool_size):
+    """Belirtilen havuz boyutuyla keep-alive HTTP adaptörü oluşturur"""
+    return HTTPAdapter(pool_connections=1,
+                       pool_maxsize=pool_size,
+                       max_retries=_build_retry())
+
+
+def create_session(pool_sizes=None, default_pool_size=DEFAULT_POOL_SIZE):
+    """
+    Adres bazında havuzlanmış yeni bir requests.Session oluşturur
+
+    Parameters:
+    pool_sizes (dict): API adresi (ör. 'https://api.binance.com') -> azami bağlantı sayısı
+    default_pool_size (int): Listede olmayan adresler için havuz boyutu
+    """
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+
+    default_adapter = _build_adapter(default_pool_size)
+    session.mount('http://', default_adapter)
+    session.mount('https://', default_adapter)
+
+    for base_url, pool_size in (pool_sizes or {}).items():
+        session.mount(f'{base_url}/', _build_adapter(pool_size))
+
+    return session
+
+
+def configure_pools(pool_sizes):
+    """
+    Havuz boyutlarını istek planına göre ayarlar (bkz. exchanges.pool_sizes)
+
+    Havuz eşzamanlı istek sayısından küçükse fazladan açılan bağlantılar istekten
+    sonra kapatılır ve bir sonraki tur yeniden el sıkışır. Boyutlar değiştiyse açık
+    oturum kapatılır; sonraki istek yeni boyutlarla bir oturum açar.
+    """
+    global _session, _pool_sizes
+    with _session_lock:
+        if pool_sizes == _pool_sizes:
+            return
+        _pool_sizes = dict(pool_sizes)
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_session():
+    """Tüm fetcher'ların paylaştığı oturumu döndürür (ilk çağrıda oluşturulur)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session(_pool_sizes)
+    return _session
+
+
+def get(url, timeout=10, **kwargs):
+    """Paylaşılan oturum üzerinden GET isteği gönderir"""
+    return get_session().get(url, timeout=timeout, **kwargs)
+
+
+def close_session():
+    """Paylaşılan oturumu ve açık bağlantıları kapatır"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_stats():
+    """
+    Host bazında bağlantı istatistiklerini döndürür
+
+    Her yeni bağlantı bir TCP (+TLS) el sıkışması demektir; reuse_ratio,
+    isteklerin ne kadarının açık bir bağlantıyı yeniden kullandığını gösterir.
+    """
+    stats = {}
+    if _session is None:
+        return stats
+
+    # Aynı adaptör birden fazla öneke bağlanmış olabilir, her adaptörü bir kez sayın
+    adapters = {id(adapter): adapter for adapter in _session.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host_stats = stats.setdefault(pool.host, {'connections': 0, 'requests': 0})
+            host_stats['connections'] += pool.num_connections
+            host_stats['requests'] += pool.num_requests
+
+    for host_stats in stats.values():
+        requests_made = host_stats['requests']
+        host_stats['reuse_ratio'] = (requests_made - host_stats['connections']) / requests_made if requests_made else 0.0
+
+    return stats
+
+
+def format_stats():
+    """Bağlantı istatistiklerini tek satırlık bir özet olarak döndürür"""
+    stats = get_stats()
+    total_connections = sum(s['connections'] for s in stats.values())
+    total_requests = sum(s['requests'] for s in stats.values())
+    reuse_ratio = (total_requests - total_connections) / total_requests if total_requests else 0.0
+    return (f"HTTP: {total_requests} istek, {total_connections} el sıkışma, "
+            f"yeniden kullanım oranı %{reuse_ratio * 100:.0f}")
@@ -0,0 +1,205 @@
+"""
+Sıcak yol (hot path) ölçümleri ve metrik yayını
+
+Veri hattının çekme, ayrıştırma, kaydetme ve özetleme adımları için süre
+histogramları ile hata/zaman aşımı ve alınan bayt sayaçları tutulur. Metrikler
+Prometheus metin biçiminde yerel bir HTTP uç noktasından (start_http_server)
+veya belirli aralıklarla yazılan bir JSON dosyasından (start_json_dump)
+okunabilir.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import tick_storage
+
+# Saniye cinsinden histogram sınırları (10 ms - 30 sn)
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_HELP = {
+    'tracker_request_duration_seconds': ('histogram', 'Borsa HTTP isteği süresi'),
+    'tracker_stage_duration_seconds': ('histogram', 'Veri hattı adımlarının süresi (fetch, parse, merge, persist, summarize, rollup, depth)'),
+    'tracker_tick_duration_seconds': ('histogram', 'Bir veri toplama turunun toplam süresi'),
+    'tracker_request_errors_total': ('counter', 'Borsa isteği hataları (timeout, connection, http, data, other, circuit_open)'),
+    'tracker_circuit_open_total': ('counter', 'Borsa devre kesicisinin açılma sayısı'),
+    'tracker_hedged_requests_total': ('counter', 'p95 aşıldığı için gönderilen kopya istekler'),
+    'tracker_hedge_wins_total': ('counter', 'Kopya isteğin ilk istekten önce yanıtlandığı durumlar'),
+    'tracker_deadline_missed_total': ('counter', 'Tur süre sınırını aşan borsa istekleri'),
+    'tracker_worker_restarts_total': ('counter', 'Beklenmedik şekilde sonlanıp yeniden başlatılan çalışan süreçler'),
+    'tracker_response_bytes_total': ('counter', 'Borsalardan alınan yanıt gövdesi baytları'),
+    'tracker_records_total': ('counter', 'Kaydedilen kotasyon sayısı'),
+    'tracker_quotes_rejected_total': ('counter', 'Karantinaya alınan kotasyonlar (zero_price, crossed, synthetic, stale, outlier)'),
+    'tracker_publish_responses_total': ('counter', 'Yayın sunucusu yanıtları (uç nokta ve durum koduna göre)'),
+}
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+
+
+class Histogram:
+    """Sabit sınırlı, kümülatif kovalara sahip histogram"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Kova sınırlarına göre yaklaşık yüzdelik değeri döndürür"""
+        if self.count == 0:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return self.buckets[index] if index < len(self.buckets) else float('inf')
+        return float('inf')
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def observe(name, value, **labels):
+    """Histograma bir değer ekler"""
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(value)
+
+
+def inc(name, amount=1, **labels):
+    """Sayacı artırır"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+@contextmanager
+def timer(name, **labels):
+    """Blok süresini histograma yazan bağlam yöneticisi"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started, **labels)
+
+
+def reset():
+    """Tüm metrikleri sıfırlar"""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (list(extra.items()) if extra else [])
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in items) + '}'
+
+
+def render_prometheus():
+    """Metrikleri Prometheus metin biçiminde döndürür"""
+    with _lock:
+        histograms = {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = []
+    names = sorted({name for name, _ in histograms} | {name for name, _ in counters})
+    for name in names:
+        metric_type, help_text = METRIC_HELP.get(name, ('untyped', ''))
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for (metric_name, labels), (counts, total, count, buckets) in sorted(histograms.items()):
+            if metric_name != name:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{_format_labels(labels, {"le": bound})} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        for (metric_name, labels), value in sorted(counters.items()):
+            if metric_name == name:
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def snapshot():
+    """Metrikleri JSON'a yazılabilir sözlük olarak döndürür"""
+    with _lock:
+        histograms = [
+            {
+                'name': name,
+                'labels': dict(labels),
+                'count': h.count,
+                'sum': h.sum,
+                'p50': h.quantile(0.5),
+                'p99': h.quantile(0.99),
+                'buckets': dict(zip([str(b) for b in h.buckets] + ['+Inf'], h.counts)),
+            }
+            for (name, labels), h in sorted(_histograms.items())
+        ]
+        counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(_counters.items())]
+    return {'generated_at': time.time(), 'histograms': histograms, 'counters': counters}
+
+
+def dump_json(path):
+    """Metrikleri JSON dosyasına atomik olarak yazar"""
+    tick_storage.atomic_write_json(path, snapshot())
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Her kazıma isteğini yazdırmayın
+        pass
+
+
+def start_http_server(port, host='127.0.0.1'):
+    """/metrics uç noktasını arka planda sunan HTTP sunucusunu başlatır"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+    thread.start()
+    print(f"Metrikler http://{host}:{port}/metrics adresinde yayınlanıyor")
+    return server
+
+
+def start_json_dump(path, interval=60):
+    """Metrikleri belirli aralıklarla JSON dosyasına yazan arka plan iş parçacığını başlatır"""
+    stop_event = threading.Event()
+
+    def run():
+        while not stop_event.wait(interval):
+            try:
+                dump_json(path)
+            except Exception as e:
+                print(f"Metrik dosyası yazılamadı ({path}): {e}")
+
+    thread = threading.Thread(target=run, name='metrics-json', daemon=True)
+    thread.start()
+    return stop_event
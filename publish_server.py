@@ -0,0 +1,378 @@
+"""
+Günlük özetin ve son kayıtların HTTP üzerinden yayını
+
+Web istemcilerinin her dakika değişmemiş olabilecek özet dosyasını yeniden
+indirmesi yerine bu modül, güncel özeti ve son kayıtları bellekten sunan
+hafif bir HTTP sunucusu başlatır:
+
+    /summary   günün (yoksa en son günün) özeti
+    /ticks     son kayıtlar (JSON dizi, ?limit=N ile son N kayıt)
+    /events    değişiklikleri ileten server-sent events akışı
+
+Yanıtlar ETag taşır; If-None-Match eşleşirse gövde gönderilmeden 304 döner.
+Accept-Encoding gzip içeriyorsa sıkıştırılmış gövde gönderilir; sıkıştırma her
+sürüm için bir kez yapılır. ?wait=SANİYE ile gelen koşullu istekler (long-poll)
+içerik değişene veya süre dolana kadar bekletilir.
+
+Sunucu veriyi dosyalardan okur: Publisher özet dosyasının değişme zamanını ve
+günün NDJSON dosyasına eklenen baytları belirli aralıklarla kontrol eder.
+Böylece aynı süreçteki daemon/akış modlarıyla birlikte veya cron ile yazılan
+dosyalar için ayrı bir süreç olarak çalışabilir.
+"""
+import glob
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import daily_summary
+import metrics
+import tick_storage
+
+# Bellekte tutulan son kayıt sayısı
+RECENT_TICKS = 1000
+# Long-poll isteklerinin azami bekleme süresi (saniye)
+MAX_WAIT = 60
+# Bu boyuttan küçük gövdeler sıkıştırılmaz
+GZIP_MIN_BYTES = 512
+# SSE bağlantılarını canlı tutmak için gönderilen yorum satırlarının aralığı (saniye)
+KEEPALIVE_INTERVAL = 15
+# Aynı anda açık tutulabilecek SSE bağlantısı
+MAX_STREAMS = 100
+# İlk yüklemede son kayıtlar için dosyanın sonundan okunacak azami bayt
+_TAIL_BYTES_PER_TICK = 512
+
+Resource = namedtuple('Resource', ['body', 'gzipped', 'etag'])
+
+
+def _resource(body, etag):
+    gzipped = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_BYTES else None
+    return Resource(body, gzipped, etag)
+
+
+def _content_etag(body):
+    return 'W/"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def _tail_offset(path, max_bytes):
+    """Dosyanın son max_bytes baytı içindeki ilk satır başının konumunu döndürür"""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return 0
+    if size <= max_bytes:
+        return 0
+    with open(path, 'rb') as file:
+        file.seek(size - max_bytes - 1)
+        file.readline()
+        return file.tell()
+
+
+class Publisher:
+    """
+    Yayınlanan kaynakları dosyalardan güncel tutar
+
+    refresh() her çağrıldığında özet dosyası değiştiyse yeniden okunur ve
+    günün dosyasına eklenen satırlar son kayıtlara eklenir. Gün değiştiğinde
+    önceki günün özeti, son kayıtları ve SSE satırları bırakılır. Bir kaynak
+    değiştiğinde sürüm artar ve bekleyen long-poll/SSE istekleri uyandırılır.
+    """
+
+    def __init__(self, data_dir=tick_storage.DATA_DIR, recent=RECENT_TICKS):
+        self.data_dir = data_dir
+        self.recent = recent
+        self.version = 0
+        self.changed = threading.Condition()
+        self.summary = None
+        self.summary_event = None
+        self.ticks = None
+        self.tick_lines = deque(maxlen=recent)
+        # SSE istemcilerine iletilmek üzere (sürüm, yeni satırlar) çiftleri
+        self.tick_batches = deque(maxlen=64)
+        self._summary_stat = None
+        self._date = None
+        self._tick_offset = 0
+
+    def _current_date(self):
+        today = datetime.now().strftime('%Y-%m-%d')
+        if tick_storage.day_exists(today, self.data_dir):
+            return today
+        days = sorted(glob.glob(os.path.join(self.data_dir, 'summary_????-??-??.json')))
+        return os.path.basename(days[-1])[len('summary_'):-len('.json')] if days else today
+
+    def _refresh_summary(self, date):
+        path = daily_summary.summary_path(date, self.data_dir)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        if key == self._summary_stat:
+            return False
+        self._summary_stat = key
+        with open(path, 'rb') as file:
+            body = file.read()
+        try:
+            compact = json.dumps(json.loads(body), separators=(',', ':'))
+        except json.JSONDecodeError:
+            # Dosyalar atomik yazıldığından beklenmez; bir sonraki kontrolde yeniden denenir
+            self._summary_stat = None
+            return False
+        etag = _content_etag(body)
+        if self.summary is not None and self.summary.etag == etag:
+            return False
+        self.summary = _resource(body, etag)
+        self.summary_event = compact
+        return True
+
+    def _reset_day(self, date):
+        """Gün değişince önceki günün kaynakları bırakılır; /ticks ve SSE iki günü karıştırmaz"""
+        self._date = date
+        self.summary = None
+        self.summary_event = None
+        self._summary_stat = None
+        self.ticks = None
+        self.tick_lines.clear()
+        self.tick_batches.clear()
+        self._tick_offset = _tail_offset(tick_storage.ndjson_path(date, self.data_dir),
+                                         self.recent * _TAIL_BYTES_PER_TICK)
+
+    def _refresh_ticks(self, date):
+        path = tick_storage.ndjson_path(date, self.data_dir)
+        if os.path.exists(path) and os.path.getsize(path) < self._tick_offset:
+            # Dosya kısaltıldı (kurtarma); son kayıtlar baştan okunur
+            self.tick_lines.clear()
+            self._tick_offset = _tail_offset(path, self.recent * _TAIL_BYTES_PER_TICK)
+        lines, _, offset = tick_storage.read_lines_from(path, self._tick_offset)
+        if not lines and self.ticks is not None:
+            return None
+        self._tick_offset = offset
+        lines = [line.rstrip(b'\n') for line in lines]
+        self.tick_lines.extend(lines)
+        self.ticks = self._render_ticks(len(self.tick_lines))
+        return lines
+
+    def _render_ticks(self, limit):
+        lines = list(self.tick_lines)[-limit:] if limit > 0 else []
+        # Etiket gün ve dosya konumundan üretilir; süreç yeniden başlasa da aynı içerik aynı etiketi alır
+        etag = f'W/"{self._date}-{self._tick_offset}-{limit}"'
+        return _resource(b'[' + b','.join(lines) + b']', etag)
+
+    def refresh(self):
+        """Dosyalardaki değişiklikleri okur; bir kaynak değiştiyse True döndürür"""
+        date = self._current_date()
+        with self.changed:
+            day_changed = date != self._date
+            if day_changed:
+                self._reset_day(date)
+            summary_changed = self._refresh_summary(date)
+            new_lines = self._refresh_ticks(date)
+            if not day_changed and not summary_changed and not new_lines:
+                return False
+            self.version += 1
+            if new_lines:
+                self.tick_batches.append((self.version, new_lines))
+            self.changed.notify_all()
+        return True
+
+    def ticks_resource(self, limit=None):
+        """Son limit kaydı içeren kaynağı döndürür"""
+        with self.changed:
+            if limit is None or limit >= len(self.tick_lines):
+                return self.ticks
+            return self._render_ticks(limit)
+
+    def wait_for_change(self, version, timeout):
+        """Sürüm version'dan farklı olana veya süre dolana kadar bekler; güncel sürümü döndürür"""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+def _matches(header, etag):
+    if not header or etag is None:
+        return False
+    if header.strip() == '*':
+        return True
+    # Zayıf karşılaştırma: W/ öneki yok sayılır
+    return etag.replace('W/', '') in [tag.strip().replace('W/', '') for tag in header.split(',')]
+
+
+class _PublishHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def _handle(self, send_body):
+        path, _, query = self.path.partition('?')
+        params = parse_qs(query)
+        if path == '/events':
+            self._stream_events()
+            return
+        if path not in ('/summary', '/ticks'):
+            self.send_error(404)
+            return
+        try:
+            limit = int(params['limit'][0]) if 'limit' in params else None
+            wait = min(float(params['wait'][0]), MAX_WAIT) if 'wait' in params else 0
+        except ValueError:
+            self.send_error(400, 'limit ve wait sayı olmalıdır')
+            return
+
+        publisher = self.server.publisher
+        get = (lambda: publisher.summary) if path == '/summary' else (lambda: publisher.ticks_resource(limit))
+        if_none_match = self.headers.get('If-None-Match')
+        version = publisher.version
+        resource = get()
+        if wait > 0 and _matches(if_none_match, resource and resource.etag):
+            # Long-poll: içerik değişene veya süre dolana kadar yanıt bekletilir
+            deadline = wait
+            while deadline > 0 and _matches(if_none_match, resource and resource.etag):
+                started = time.monotonic()
+                version = publisher.wait_for_change(version, deadline)
+                deadline -= time.monotonic() - started
+                resource = get()
+
+        if resource is None:
+            self._count(path, 404)
+            self.send_error(404, 'Henüz yayınlanacak veri yok')
+            return
+        if _matches(if_none_match, resource.etag):
+            self._count(path, 304)
+            self.send_response(304)
+            self._common_headers(resource.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        body = resource.body
+        use_gzip = resource.gzipped is not None and 'gzip' in (self.headers.get('Accept-Encoding') or '')
+        if use_gzip:
+            body = resource.gzipped
+        self._count(path, 200)
+        self.send_response(200)
+        self._common_headers(resource.etag)
+        self.send_header('Content-Type', 'application/json')
+        if use_gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _common_headers(self, etag):
+        self.send_header('ETag', etag)
+        # İstemciler önbellekteki kopyayı her kullanımda koşullu istekle doğrular
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Expose-Headers', 'ETag')
+
+    def _count(self, path, status):
+        metrics.inc('tracker_publish_responses_total', path=path, status=str(status))
+
+    def _stream_events(self):
+        server = self.server
+        with server.streams_lock:
+            if server.streams >= MAX_STREAMS:
+                self.send_error(503, 'Çok fazla açık akış')
+                return
+            server.streams += 1
+        try:
+            self._count('/events', 200)
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            self.close_connection = True
+            self._send_events()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with server.streams_lock:
+                server.streams -= 1
+
+    def _send_events(self):
+        publisher = self.server.publisher
+        with publisher.changed:
+            version = publisher.version
+            summary = publisher.summary
+            summary_event = publisher.summary_event
+        self.wfile.write(b'retry: 3000\n\n')
+        if summary is not None:
+            self._write_event('summary', version, summary_event)
+        sent_summary = summary and summary.etag
+        while not self.server.stopping.is_set():
+            new_version = publisher.wait_for_change(version, KEEPALIVE_INTERVAL)
+            if new_version == version:
+                self.wfile.write(b': ping\n\n')
+                self.wfile.flush()
+                continue
+            with publisher.changed:
+                summary = publisher.summary
+                summary_event = publisher.summary_event
+                batches = [lines for batch_version, lines in publisher.tick_batches if batch_version > version]
+            version = new_version
+            if summary is not None and summary.etag != sent_summary:
+                self._write_event('summary', version, summary_event)
+                sent_summary = summary.etag
+            lines = [line for batch in batches for line in batch]
+            if lines:
+                self._write_event('ticks', version, (b'[' + b','.join(lines) + b']').decode('utf-8'))
+
+    def _write_event(self, name, version, data):
+        self.wfile.write(f'id: {version}\nevent: {name}\ndata: {data}\n\n'.encode('utf-8'))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(port, host='127.0.0.1', data_dir=tick_storage.DATA_DIR, poll_interval=1):
+    """
+    Yayın sunucusunu ve dosyaları izleyen iş parçacığını arka planda başlatır
+
+    Returns:
+    ThreadingHTTPServer: server.publisher ile yayınlanan kaynaklara erişilir;
+        shutdown() sunucuyu ve izlemeyi durdurur
+    """
+    publisher = Publisher(data_dir)
+    publisher.refresh()
+    server = ThreadingHTTPServer((host, port), _PublishHandler)
+    server.daemon_threads = True
+    server.publisher = publisher
+    server.streams = 0
+    server.streams_lock = threading.Lock()
+    server.stopping = threading.Event()
+
+    def watch():
+        while not server.stopping.wait(poll_interval):
+            try:
+                publisher.refresh()
+            except OSError as e:
+                print(f"Yayın verileri okunamadı: {e}")
+
+    stop = server.shutdown
+
+    def shutdown():
+        server.stopping.set()
+        stop()
+
+    server.shutdown = shutdown
+    threading.Thread(target=watch, name='publish-watch', daemon=True).start()
+    threading.Thread(target=server.serve_forever, name='publish-http', daemon=True).start()
+    host, port = server.server_address[:2]
+    print(f"Özet ve son kayıtlar http://{host}:{port}/summary, /ticks ve /events adreslerinde yayınlanıyor")
+    return server
@@ -0,0 +1,274 @@
+"""
+Kotasyonların veri setine girmeden önce akış halinde doğrulanması
+
+Toplanan her kayıt günün dosyasına, özete ve arbitraj hesabına girmeden önce
+kontrol edilir. Geçmeyen kayıtlar veri setine eklenmez; nedenleriyle birlikte
+data/quarantine_YYYY-MM-DD.ndjson dosyasına yazılır. Böylece özetler ve
+arbitraj taramaları geçmişi yeniden filtrelemek zorunda kalmaz.
+
+Nedenler:
+
+    zero_price   alış veya satış fiyatı eksik, sıfır veya sonlu değil
+    crossed      alış fiyatı satış fiyatından yüksek
+    synthetic    fiyat emir defterinden değil tahminden üretilmiş
+                 (ör. Coinbase spot fiyat yedeği)
+    stale        kayıt aynı borsa/sembolün önceki kaydından eski veya kotasyon
+                 STALE_AFTER saniyedir hiç değişmemiş
+    outlier      orta fiyat borsanın kendi üstel hareketli ortalamasından
+                 Z_LIMIT standart sapmadan fazla uzak
+
+İstatistikler her (borsa, sembol) için sabit boyutlu bir durumda tutulur:
+log orta fiyatın üstel ağırlıklı ortalaması ve varyansı, son kotasyon ve
+zamanları. Yalnızca kabul edilen kayıtlar istatistikleri günceller; art arda
+RESEED_AFTER kez aykırı görülen fiyat kalıcı bir seviye değişimi kabul edilip
+istatistikler bu fiyattan yeniden başlatılır.
+
+Durum, günlük özetin kontrol noktası gibi data/validator_state.json dosyasına
+atomik olarak yazılır (en fazla SAVE_INTERVAL saniyede bir ve çıkışta) ve bir
+sonraki çalıştırmada yüklenir; böylece cron ile yapılan tek seferlik
+çalıştırmalar da önceki turların istatistikleriyle doğrulanır. Çok süreçli
+modda her çalışan kendi borsa/sembol çiftlerinin durumunu ayrı bir dosyada
+tutar (STATE_NAME).
+"""
+import calendar
+import json
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+import exchanges
+import metrics
+import tick_storage
+
+# Aykırı değer sınırı (standart sapma)
+Z_LIMIT = 6.0
+# Üstel ortalamanın yaklaşık pencere uzunluğu (kayıt)
+WINDOW = 60
+# z-skoru kontrolünden önce gereken kayıt sayısı
+WARMUP = 20
+# Sakin piyasada küçük sapmaların aykırı sayılmaması için log fiyat standart sapmasının alt sınırı (%0,2)
+MIN_SIGMA = 0.002
+# Art arda bu kadar aykırı kayıttan sonra istatistikler yeni seviyeden yeniden başlatılır
+RESEED_AFTER = 3
+# Bu süreden uzun (saniye) veri gelmeyen borsanın istatistikleri yeniden başlatılır
+MAX_GAP = 900
+# Kotasyonun hiç değişmeden kabul edileceği azami süre (saniye)
+STALE_AFTER = 120
+
+# Durum dosyasının en sık yazılma aralığı (saniye)
+SAVE_INTERVAL = 10
+
+# --no-validation ile kapatılır
+ENABLED = True
+
+# Durum dosyasının adı; çok süreçli modda çalışan başına ayrı ad verilir
+STATE_NAME = 'validator_state'
+
+
+def quarantine_path(date, data_dir=tick_storage.DATA_DIR):
+    """Günün karantina dosyasının yolunu döndürür"""
+    return os.path.join(data_dir, f'quarantine_{date}.ndjson')
+
+
+def state_path(data_dir=tick_storage.DATA_DIR):
+    """Doğrulayıcı durum dosyasının yolunu döndürür"""
+    return os.path.join(data_dir, f'{STATE_NAME}.json')
+
+
+def _positive(value):
+    return isinstance(value, (int, float)) and math.isfinite(value) and value > 0
+
+
+class _Track:
+    """Bir (borsa, sembol) çiftinin sabit boyutlu akış istatistikleri"""
+    __slots__ = ('count', 'mean', 'var', 'outlier_run', 'last_quote', 'last_change', 'last_seen', 'last_accepted')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.outlier_run = 0
+        self.last_quote = None
+        self.last_change = None
+        self.last_seen = None
+        self.last_accepted = None
+
+    def to_list(self):
+        return [getattr(self, name) for name in self.__slots__]
+
+    @classmethod
+    def from_list(cls, values):
+        track = cls()
+        for name, value in zip(cls.__slots__, values):
+            setattr(track, name, value)
+        if track.last_quote is not None:
+            track.last_quote = tuple(track.last_quote)
+        return track
+
+
+class QuoteValidator:
+    """
+    Kayıtları tek tek kontrol eden ve borsa başına istatistikleri güncelleyen doğrulayıcı
+
+    Toplayıcının iş parçacıklarından aynı anda çağrılabilir.
+    """
+
+    def __init__(self, z_limit=Z_LIMIT, window=WINDOW, warmup=WARMUP, min_sigma=MIN_SIGMA,
+                 reseed_after=RESEED_AFTER, max_gap=MAX_GAP, stale_after=STALE_AFTER):
+        self.z_limit = z_limit
+        self.alpha = 2.0 / (window + 1)
+        self.warmup = warmup
+        self.min_sigma = min_sigma
+        self.reseed_after = reseed_after
+        self.max_gap = max_gap
+        self.stale_after = stale_after
+        self._tracks = {}
+        self._lock = threading.Lock()
+        # Aynı turdaki kayıtlar aynı zaman damgasını paylaşır; son çevrilen metin saklanır
+        self._seconds_cache = (None, None)
+
+    def _seconds(self, timestamp):
+        cached_text, seconds = self._seconds_cache
+        if timestamp != cached_text:
+            seconds = calendar.timegm(time.strptime(timestamp, '%Y-%m-%d %H:%M:%S'))
+            self._seconds_cache = (timestamp, seconds)
+        return seconds
+
+    def check(self, record, symbol=exchanges.DEFAULT_SYMBOL):
+        """
+        Kaydı kontrol eder; geçerliyse istatistiklere ekler
+
+        Returns:
+        list: Red nedenleri; kayıt geçerliyse boş liste
+        """
+        reasons = []
+        if record.get('synthetic'):
+            reasons.append('synthetic')
+        bid = record.get('bid')
+        ask = record.get('ask')
+        if not _positive(bid) or not _positive(ask):
+            reasons.append('zero_price')
+            return reasons
+        if bid > ask:
+            reasons.append('crossed')
+
+        with self._lock:
+            key = (record['exchange'], symbol)
+            track = self._tracks.get(key)
+            if track is None:
+                track = self._tracks[key] = _Track()
+            seen = self._seconds(record['timestamp'])
+            quote = (bid, ask, record.get('bid_qty'), record.get('ask_qty'))
+            if track.last_seen is not None:
+                if seen < track.last_seen:
+                    reasons.append('stale')
+                elif quote == track.last_quote and seen - track.last_change >= self.stale_after:
+                    reasons.append('stale')
+            if quote != track.last_quote:
+                track.last_quote = quote
+                track.last_change = seen
+            if track.last_seen is None or seen > track.last_seen:
+                track.last_seen = seen
+            if reasons:
+                return reasons
+            return self._score(track, math.log((bid + ask) / 2), seen)
+
+    def _score(self, track, value, seen):
+        if track.count and seen - track.last_accepted > self.max_gap:
+            track.count = 0
+        if track.count >= self.warmup:
+            sigma = max(math.sqrt(track.var), self.min_sigma)
+            if abs(value - track.mean) > self.z_limit * sigma:
+                track.outlier_run += 1
+                if track.outlier_run < self.reseed_after:
+                    return ['outlier']
+                # Fiyat birkaç turdur yeni seviyede; tek seferlik bir hata değil
+                track.count = 0
+        track.outlier_run = 0
+        if track.count == 0:
+            track.mean = value
+            track.var = 0.0
+        else:
+            diff = value - track.mean
+            increment = self.alpha * diff
+            track.mean += increment
+            track.var = (1 - self.alpha) * (track.var + diff * increment)
+        track.count += 1
+        track.last_accepted = seen
+        return []
+
+    def to_checkpoint(self):
+        """Borsa/sembol istatistiklerini JSON'a yazılabilir sözlük olarak döndürür"""
+        with self._lock:
+            return {'tracks': [[exchange, symbol] + track.to_list()
+                               for (exchange, symbol), track in self._tracks.items()]}
+
+    def load_checkpoint(self, state):
+        """to_checkpoint çıktısındaki istatistikleri yükler"""
+        with self._lock:
+            for exchange, symbol, *values in state['tracks']:
+                self._tracks[(exchange, symbol)] = _Track.from_list(values)
+
+
+# data_dir -> (doğrulayıcı, son kaydetme zamanı)
+_validators = {}
+
+
+def get_validator(data_dir=tick_storage.DATA_DIR):
+    """Klasörün doğrulayıcısını döndürür; ilk çağrıda durum dosyasından yükler"""
+    entry = _validators.get(data_dir)
+    if entry is None:
+        validator = QuoteValidator()
+        path = state_path(data_dir)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as file:
+                    validator.load_checkpoint(json.load(file))
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+                print(f"Doğrulayıcı durumu okunamadı ({path}): {e}")
+        entry = _validators[data_dir] = [validator, None]
+    return entry[0]
+
+
+def save_state(data_dir=tick_storage.DATA_DIR, force=True):
+    """Doğrulayıcı durumunu atomik olarak yazar; force değilse SAVE_INTERVAL'dan sık yazmaz"""
+    entry = _validators.get(data_dir)
+    if entry is None:
+        return
+    now = time.monotonic()
+    if not force and entry[1] is not None and now - entry[1] < SAVE_INTERVAL:
+        return
+    os.makedirs(data_dir, exist_ok=True)
+    tick_storage.atomic_write_json(state_path(data_dir), entry[0].to_checkpoint(), indent=None)
+    entry[1] = now
+
+
+def screen(records, symbol=exchanges.DEFAULT_SYMBOL, data_dir=tick_storage.DATA_DIR):
+    """
+    Kayıtları doğrular; geçmeyenleri karantina dosyasına yazar
+
+    Returns:
+    list: Veri setine eklenecek kayıtlar
+    """
+    if not ENABLED or not records:
+        return records
+    validator = get_validator(data_dir)
+    accepted = []
+    rejected = []
+    for record in records:
+        reasons = validator.check(record, symbol)
+        if not reasons:
+            accepted.append(record)
+            continue
+        for reason in reasons:
+            metrics.inc('tracker_quotes_rejected_total', exchange=record['exchange'], reason=reason)
+        print(f"⚠️ {record['exchange']} {symbol} kotasyonu karantinaya alındı ({', '.join(reasons)}): "
+              f"alış {record.get('bid')}, satış {record.get('ask')}")
+        rejected.append(dict(record, symbol=symbol, reasons=reasons))
+    if rejected:
+        tick_storage.append_lines(quarantine_path(datetime.now().strftime('%Y-%m-%d'), data_dir), rejected)
+    save_state(data_dir, force=False)
+    return accepted
+
@@ -0,0 +1,379 @@
+"""
+Borsa REST API'lerini taklit eden yerel yeniden oynatma sunucusu
+
+Kaydedilmiş kotasyonlar (varsayılan olarak data/ altındaki btc_prices
+dosyaları) her borsanın kendi yanıt biçimine çevrilerek sunulur; böylece
+get_*_data ayrıştırıcıları ve tüm toplama hattı ağ erişimi olmadan, gerçek
+yanıt yapılarıyla çalıştırılabilir. Her borsanın kayıtları sırayla döndürülür,
+advance() ile bir sonraki tura geçilir. Kayıtlar borsa ve sembol başına
+ayrılır; istekteki sembol (Coinbase'de yoldaki ürün) ilgili kaydı seçer, toplu
+ticker uç noktaları (Binance symbols=, OKX tickers, Kraken çoklu pair, Bybit
+tickers, KuCoin allTickers) her sembolü kendi kaydından döndürür. Derinlik
+(--depth) uç noktaları için kaydın en iyi fiyatlarından başlayan yapay
+seviyeler üretilir.
+
+Tek başına çalıştırmak için:
+
+    python replay_stub.py --port 8765
+    BTC_TRACKER_API_BASE=http://127.0.0.1:8765 python crypto_price_tracker.py
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import exchanges
+import tick_storage
+
+
+def _number(value):
+    """Borsaların çoğu sayıları metin olarak döndürür; eksik miktarlar 0 olur"""
+    return str(value if value is not None else 0)
+
+
+def _binance(record, symbol='BTCUSDT'):
+    return {'symbol': symbol, 'bidPrice': _number(record['bid']), 'bidQty': _number(record['bid_qty']),
+            'askPrice': _number(record['ask']), 'askQty': _number(record['ask_qty'])}
+
+
+def _okx_ticker(record, symbol):
+    return {'instId': symbol, 'bidPx': _number(record['bid']), 'askPx': _number(record['ask']),
+            'bidSz': _number(record['bid_qty']), 'askSz': _number(record['ask_qty'])}
+
+
+def _okx(record, symbol='BTC-USDT'):
+    return {'code': '0', 'msg': '', 'data': [_okx_ticker(record, symbol)]}
+
+
+def _coinbase_ticker(record, symbol='BTC-USD'):
+    return {'price': _number((record['bid'] + record['ask']) / 2)}
+
+
+def _coinbase_book(record, symbol='BTC-USD'):
+    return {'bids': [[_number(record['bid']), _number(record['bid_qty']), 1]],
+            'asks': [[_number(record['ask']), _number(record['ask_qty']), 1]]}
+
+
+def _kraken_ticker(record):
+    return {'a': [_number(record['ask']), '1', _number(record['ask_qty'])],
+            'b': [_number(record['bid']), '1', _number(record['bid_qty'])]}
+
+
+def _kraken(record, symbol='XBTUSD'):
+    return {'error': [], 'result': {exchanges.KRAKEN_RESULT_KEYS.get(symbol, symbol): _kraken_ticker(record)}}
+
+
+def _bybit(record, symbol='BTCUSDT'):
+    return {'retCode': 0, 'retMsg': 'OK', 'result': {
+        's': symbol, 'b': [[_number(record['bid']), _number(record['bid_qty'])]],
+        'a': [[_number(record['ask']), _number(record['ask_qty'])]]}}
+
+
+def _kucoin(record, symbol='BTC-USDT'):
+    # level1 uç noktası miktar döndürmez
+    return {'code': '200000', 'data': {'price': _number(record['bid']),
+                                       'bestBid': _number(record['bid']), 'bestAsk': _number(record['ask'])}}
+
+
+# Yol -> (borsa, yanıt oluşturucu). Oluşturucular (kayıt, borsadaki sembol) alır;
+# Coinbase yolundaki {symbol} istekteki ürünle eşleşir.
+ROUTES = {
+    '/api/v3/ticker/bookTicker': ('Binance', _binance),
+    '/api/v5/market/ticker': ('OKX', _okx),
+    '/products/{symbol}/ticker': ('Coinbase', _coinbase_ticker),
+    '/products/{symbol}/book': ('Coinbase', _coinbase_book),
+    '/0/public/Ticker': ('Kraken', _kraken),
+    '/v5/market/orderbook': ('Bybit', _bybit),
+    '/api/v1/market/orderbook/level1': ('KuCoin', _kucoin),
+}
+
+
+def _binance_batch(quotes):
+    return [_binance(record, symbol) for symbol, record in quotes]
+
+
+def _okx_batch(quotes):
+    return {'code': '0', 'msg': '', 'data': [_okx_ticker(record, symbol) for symbol, record in quotes]}
+
+
+def _kraken_batch(quotes):
+    return {'error': [], 'result': {exchanges.KRAKEN_RESULT_KEYS.get(symbol, symbol): _kraken_ticker(record)
+                                    for symbol, record in quotes}}
+
+
+def _bybit_batch(quotes):
+    return {'retCode': 0, 'retMsg': 'OK', 'result': {'category': 'spot', 'list': [
+        {'symbol': symbol, 'bid1Price': _number(record['bid']), 'bid1Size': _number(record['bid_qty']),
+         'ask1Price': _number(record['ask']), 'ask1Size': _number(record['ask_qty'])}
+        for symbol, record in quotes]}}
+
+
+def _kucoin_batch(quotes):
+    return {'code': '200000', 'data': {'time': 0, 'ticker': [
+        {'symbol': symbol, 'buy': _number(record['bid']), 'sell': _number(record['ask']),
+         'bestBidSize': _number(record['bid_qty']), 'bestAskSize': _number(record['ask_qty'])}
+        for symbol, record in quotes]}}
+
+
+# Toplu uç noktalar: yol -> (borsa, yanıt oluşturucu). Oluşturucular [(borsadaki sembol,
+# kayıt)] alır. Binance ve Kraken tek sembol yolunu paylaşır; symbols= veya virgüllü
+# pair= isteği bu tabloya yönlenir. Sembol belirtmeyen uç noktalar borsanın tüm
+# sembollerini döndürür.
+BATCH_ROUTES = {
+    '/api/v3/ticker/bookTicker': ('Binance', _binance_batch),
+    '/api/v5/market/tickers': ('OKX', _okx_batch),
+    '/0/public/Ticker': ('Kraken', _kraken_batch),
+    '/v5/market/tickers': ('Bybit', _bybit_batch),
+    '/api/v1/market/allTickers': ('KuCoin', _kucoin_batch),
+}
+
+# Borsa -> istekte borsa sembolünü taşıyan sorgu parametresi
+SYMBOL_PARAMS = {
+    'Binance': 'symbol',
+    'OKX': 'instId',
+    'Coinbase': 'product_id',
+    'Kraken': 'pair',
+    'Bybit': 'symbol',
+    'KuCoin': 'symbol',
+}
+
+
+# Yapay derinlik seviyeleri arasındaki fiyat farkı
+DEPTH_STEP = 0.5
+
+
+def _ladder(record, levels):
+    """Kaydın en iyi fiyatlarından başlayan yapay (fiyat, miktar) seviyeleri"""
+    bid_qty = record['bid_qty'] or 0.5
+    ask_qty = record['ask_qty'] or 0.5
+    bids = [[_number(round(record['bid'] - index * DEPTH_STEP, 2)), _number(round(bid_qty * (1 + index % 5 * 0.3), 8))]
+            for index in range(levels)]
+    asks = [[_number(round(record['ask'] + index * DEPTH_STEP, 2)), _number(round(ask_qty * (1 + index % 5 * 0.3), 8))]
+            for index in range(levels)]
+    return bids, asks
+
+
+def _binance_depth(record, levels, symbol='BTCUSDT'):
+    bids, asks = _ladder(record, levels)
+    return {'lastUpdateId': 1, 'bids': bids, 'asks': asks}
+
+
+def _okx_depth(record, levels, symbol='BTC-USDT'):
+    bids, asks = _ladder(record, levels)
+    return {'code': '0', 'msg': '', 'data': [{'bids': [level + ['0', '1'] for level in bids],
+                                             'asks': [level + ['0', '1'] for level in asks], 'ts': '0'}]}
+
+
+def _coinbase_depth(record, levels, symbol='BTC-USD'):
+    bids, asks = _ladder(record, levels)
+    return {'pricebook': {'product_id': symbol, 'time': '2025-01-01T00:00:00Z',
+                          'bids': [{'price': price, 'size': size} for price, size in bids],
+                          'asks': [{'price': price, 'size': size} for price, size in asks]}}
+
+
+def _kraken_depth(record, levels, symbol='XBTUSD'):
+    bids, asks = _ladder(record, levels)
+    return {'error': [], 'result': {exchanges.KRAKEN_RESULT_KEYS.get(symbol, symbol): {
+        'bids': [level + [0] for level in bids], 'asks': [level + [0] for level in asks]}}}
+
+
+def _bybit_depth(record, levels, symbol='BTCUSDT'):
+    bids, asks = _ladder(record, levels)
+    return {'retCode': 0, 'retMsg': 'OK', 'result': {'s': symbol, 'b': bids, 'a': asks}}
+
+
+def _kucoin_depth(record, levels, symbol='BTC-USDT'):
+    bids, asks = _ladder(record, levels)
+    return {'code': '200000', 'data': {'sequence': '1', 'bids': bids, 'asks': asks}}
+
+
+# Yol -> (borsa, yanıt oluşturucu, varsayılan seviye sayısı). Bybit derinlik için
+# ROUTES'taki yolu kullanır; istekteki seviye sayısı 1'den büyükse bu tablo seçilir.
+DEPTH_ROUTES = {
+    '/api/v3/depth': ('Binance', _binance_depth, 100),
+    '/api/v5/market/books': ('OKX', _okx_depth, 1),
+    '/api/v3/brokerage/market/product_book': ('Coinbase', _coinbase_depth, 50),
+    '/0/public/Depth': ('Kraken', _kraken_depth, 100),
+    '/v5/market/orderbook': ('Bybit', _bybit_depth, 1),
+    '/api/v1/market/orderbook/level2_100': ('KuCoin', _kucoin_depth, 100),
+}
+
+
+def _requested_levels(params):
+    """İstekteki seviye sayısı (limit, sz veya count)"""
+    for name in ('limit', 'sz', 'count'):
+        if name in params:
+            return int(params[name][0])
+    return None
+
+
+def _requested_symbols(name, params):
+    """İstekteki borsa sembolleri; sembol belirtilmemişse None"""
+    if 'symbols' in params:
+        return json.loads(params['symbols'][0])
+    param = SYMBOL_PARAMS[name]
+    if param in params:
+        return params[param][0].split(',')
+    return None
+
+
+def _single_symbol(name, params):
+    """Tek sembollük istekteki borsa sembolü; belirtilmemişse BTC/USDT karşılığı"""
+    venue_symbols = _requested_symbols(name, params)
+    return venue_symbols[0] if venue_symbols else exchanges.REGISTRY[name].symbols[exchanges.DEFAULT_SYMBOL]
+
+
+def _common_symbol(name, venue_symbol):
+    """Borsadaki sembolün ortak karşılığı (ör. Kraken XBTUSD -> BTC/USDT); bilinmiyorsa None"""
+    for symbol, candidate in exchanges.REGISTRY[name].symbols.items():
+        if candidate == venue_symbol:
+            return symbol
+    return None
+
+
+def _route_path(path):
+    """Coinbase ürün yollarını ROUTES anahtarına çevirir: (anahtar, yoldaki sembol)"""
+    parts = path.split('/')
+    if len(parts) == 4 and parts[1] == 'products':
+        return f'/products/{{symbol}}/{parts[3]}', parts[2]
+    return path, None
+
+
+def _render(path, query, store):
+    """İstenen yolun yanıtını üretir; bilinmeyen yol veya kayıt yoksa None"""
+    params = parse_qs(query)
+    levels = _requested_levels(params)
+    path, path_symbol = _route_path(path)
+    if path in DEPTH_ROUTES and (path not in ROUTES or (levels or 1) > 1):
+        name, render, default_levels = DEPTH_ROUTES[path]
+        venue_symbol = _single_symbol(name, params)
+        record = store.current(name, _common_symbol(name, venue_symbol))
+        return render(record, levels or default_levels, venue_symbol) if record is not None else None
+    if path in BATCH_ROUTES:
+        name, render = BATCH_ROUTES[path]
+        venue_symbols = _requested_symbols(name, params)
+        if path not in ROUTES or 'symbols' in params or len(venue_symbols or ()) > 1:
+            if venue_symbols is None:
+                venue_symbols = list(exchanges.REGISTRY[name].symbols.values())
+            quotes = [(venue_symbol, store.current(name, _common_symbol(name, venue_symbol)))
+                      for venue_symbol in venue_symbols]
+            # Kaydı olmayan semboller yanıtta yer almaz
+            quotes = [(venue_symbol, record) for venue_symbol, record in quotes if record is not None]
+            return render(quotes) if quotes else None
+    if path in ROUTES:
+        name, render = ROUTES[path]
+        venue_symbol = path_symbol or _single_symbol(name, params)
+        record = store.current(name, _common_symbol(name, venue_symbol))
+        return render(record, venue_symbol) if record is not None else None
+    return None
+
+
+def load_seed_records(data_dir=tick_storage.DATA_DIR):
+    """data/ ve sembol klasörlerindeki tüm günlerin kayıtlarını sembol başına tarih sırasıyla döndürür"""
+    records = []
+    for symbol_dir in tick_storage.symbol_dirs(data_dir):
+        dates = sorted({os.path.basename(path).split('_')[-1].split('.')[0]
+                        for path in glob.glob(os.path.join(symbol_dir, 'btc_prices_*'))})
+        for date in dates:
+            records.extend(tick_storage.read_day(date, symbol_dir))
+    return records
+
+
+class FixtureStore:
+    """
+    Borsa ve sembol başına kayıt listesi ve o anki tur
+
+    symbol alanı olmayan eski kayıtlar BTC/USDT sayılır. Kayıtlarda bulunmayan
+    borsalar (ör. eski dosyalarda Binance veya Bybit) için aynı sembolün tüm
+    kayıtları sırayla kullanılır; sembolün hiç kaydı yoksa yanıt 404 olur.
+    """
+
+    def __init__(self, records):
+        self.records = list(records)
+        self.by_exchange = {}
+        self.by_symbol = {}
+        for record in self.records:
+            symbol = record.get('symbol', exchanges.DEFAULT_SYMBOL)
+            self.by_exchange.setdefault((record['exchange'], symbol), []).append(record)
+            self.by_symbol.setdefault(symbol, []).append(record)
+        self.tick = 0
+
+    def advance(self):
+        self.tick += 1
+
+    def current(self, exchange, symbol=exchanges.DEFAULT_SYMBOL):
+        records = self.by_exchange.get((exchange, symbol)) or self.by_symbol.get(symbol)
+        if not records:
+            return None
+        return records[self.tick % len(records)]
+
+
+class _ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Başlık ve gövde ayrı yazıldığından Nagle gecikmesi ölçümleri bozar
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        payload = _render(path, query, self.server.store)
+        if payload is None:
+            self.send_error(404)
+            return
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(store, port=0, host='127.0.0.1'):
+    """Sunucuyu arka planda başlatır; port 0 ise boş bir port seçilir"""
+    server = ThreadingHTTPServer((host, port), _ReplayHandler)
+    server.daemon_threads = True
+    server.store = store
+    thread = threading.Thread(target=server.serve_forever, name='replay-stub', daemon=True)
+    thread.start()
+    return server
+
+
+def use_server(server):
+    """Tüm borsa isteklerini verilen sunucuya yönlendirir"""
+    host, port = server.server_address[:2]
+    for name in exchanges.API_BASE_URLS:
+        exchanges.API_BASE_URLS[name] = f'http://{host}:{port}'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Kaydedilmiş kotasyonları borsa API biçiminde sunar')
+    parser.add_argument('--port', type=int, default=8765, help='Dinlenecek port (varsayılan: 8765)')
+    parser.add_argument('--data', default=tick_storage.DATA_DIR, help='Kayıtların okunacağı klasör')
+    parser.add_argument('--tick-interval', type=float, default=1,
+                        help='Bir sonraki kayda geçiş aralığı (saniye, varsayılan: 1)')
+    args = parser.parse_args(argv)
+
+    records = load_seed_records(args.data)
+    if not records:
+        parser.error(f"{args.data} altında kayıt bulunamadı")
+    store = FixtureStore(records)
+    server = start_server(store, args.port)
+    print(f"{len(records)} kayıt http://127.0.0.1:{args.port} adresinden sunuluyor")
+
+    stop_event = threading.Event()
+    try:
+        while not stop_event.wait(args.tick_interval):
+            store.advance()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
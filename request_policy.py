@@ -0,0 +1,324 @@
+"""
+Borsa bazında gecikmeye duyarlı istek politikası
+
+Her borsa için son isteklerin süreleri tutulur ve sabit 10 sn yerine bu
+sürelerden hesaplanan bir zaman aşımı kullanılır (p99 x TIMEOUT_MULTIPLIER,
+MIN_TIMEOUT ile MAX_TIMEOUT arasında). Zaman aşımına uğrayan istekler süre
+olarak zaman aşımı değeriyle kaydedilir; böylece yavaşlayan bir borsanın
+zaman aşımı kendiliğinden büyür.
+
+Art arda FAILURE_THRESHOLD kez başarısız olan borsanın devresi açılır ve
+bekleme süresi boyunca istek atılmaz. Süre dolunca tek bir deneme isteğine
+(half-open) izin verilir; başarılı olursa devre kapanır, olmazsa bekleme süresi
+ikiye katlanarak yeniden açılır.
+
+HEDGE_ENABLED açıksa p95'i aşan isteklerin bir kopyası gönderilir ve ilk gelen
+başarılı yanıt kullanılır.
+
+Süreler ve devre durumları data/request_policy_state.json dosyasına atomik
+olarak yazılır (en fazla SAVE_INTERVAL saniyede bir ve çıkışta) ve bir sonraki
+çalıştırmada load_state ile yüklenir; böylece cron ile yapılan tek seferlik
+çalıştırmalar da önceki turların ölçümlerini ve açık devreleri görür. Çok
+süreçli modda her çalışan kendi dosyasını kullanır (STATE_NAME).
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+import requests
+
+import http_session
+import metrics
+import tick_storage
+
+MIN_TIMEOUT = 1.0
+MAX_TIMEOUT = 10.0
+TIMEOUT_MULTIPLIER = 3
+# Bir borsa adımının (ör. Coinbase ticker + order book + yedek uç nokta) toplam süresi, zaman aşımının katı
+UNIT_BUDGET_MULTIPLIER = 2
+
+LATENCY_WINDOW = 256
+MIN_SAMPLES = 20
+
+FAILURE_THRESHOLD = 3
+OPEN_SECONDS = 30
+MAX_OPEN_SECONDS = 600
+
+HEDGE_ENABLED = False
+MIN_HEDGE_DELAY = 0.05
+
+# Durum dosyasının en sık yazılma aralığı (saniye)
+SAVE_INTERVAL = 10
+# Durum dosyasının adı; çok süreçli modda çalışan başına ayrı ad verilir
+STATE_NAME = 'request_policy_state'
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ExchangePolicy:
+    """Bir borsanın gecikme geçmişi ve devre kesici durumu"""
+
+    def __init__(self, name):
+        self.name = name
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+        self.state = CLOSED
+        self.failures = 0
+        self.open_seconds = OPEN_SECONDS
+        self.opened_at = None
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q):
+        """Son isteklerin yüzdelik süresi; yeterli örnek yoksa None"""
+        with self.lock:
+            if len(self.samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    def timeout(self):
+        p99 = self.percentile(0.99)
+        if p99 is None:
+            return MAX_TIMEOUT
+        return min(MAX_TIMEOUT, max(MIN_TIMEOUT, p99 * TIMEOUT_MULTIPLIER))
+
+    def allow(self):
+        """Bu turda borsaya istek atılıp atılamayacağını döndürür"""
+        with self.lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == HALF_OPEN and not self.probe_in_flight:
+                self.probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            if self.state != CLOSED:
+                print(f"{self.name} devresi kapandı, istekler yeniden başladı")
+            self.state = CLOSED
+            self.failures = 0
+            self.open_seconds = OPEN_SECONDS
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                # Deneme isteği başarısız: bekleme süresini ikiye katlayarak yeniden açın
+                self.open_seconds = min(MAX_OPEN_SECONDS, self.open_seconds * 2)
+            elif self.state == OPEN or self.failures < FAILURE_THRESHOLD:
+                return
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.probe_in_flight = False
+        metrics.inc('tracker_circuit_open_total', exchange=self.name)
+        print(f"{self.name} devresi {self.open_seconds} sn için açıldı ({self.failures} ardışık hata)")
+
+    def remaining_open(self):
+        """Devre açıksa deneme isteğine kalan süre"""
+        with self.lock:
+            if self.state != OPEN:
+                return 0
+            return max(0.0, self.open_seconds - (time.monotonic() - self.opened_at))
+
+    def to_checkpoint(self):
+        """Süreleri ve devre durumunu JSON'a yazılabilir sözlük olarak döndürür"""
+        with self.lock:
+            # time.monotonic süreçler arasında anlamsız olduğundan açılma zamanı epoch olarak yazılır
+            opened_at = None
+            if self.opened_at is not None:
+                opened_at = time.time() - (time.monotonic() - self.opened_at)
+            return {
+                'samples': list(self.samples),
+                'state': self.state,
+                'failures': self.failures,
+                'open_seconds': self.open_seconds,
+                'opened_at': opened_at
+            }
+
+    @classmethod
+    def from_checkpoint(cls, name, state):
+        """Kontrol noktası sözlüğünden politikayı yeniden oluşturur"""
+        policy = cls(name)
+        policy.samples.extend(state['samples'])
+        policy.state = state['state']
+        policy.failures = state['failures']
+        policy.open_seconds = state['open_seconds']
+        if state['opened_at'] is not None:
+            policy.opened_at = time.monotonic() - max(0.0, time.time() - state['opened_at'])
+        return policy
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+_local = threading.local()
+_hedge_executor = None
+# Son kaydetme zamanı (time.monotonic)
+_last_save = None
+
+
+def state_path(data_dir=tick_storage.DATA_DIR):
+    """İstek politikası durum dosyasının yolunu döndürür"""
+    return os.path.join(data_dir, f'{STATE_NAME}.json')
+
+
+def get_policy(exchange):
+    """Borsanın politika nesnesini döndürür (ilk çağrıda oluşturulur)"""
+    policy = _policies.get(exchange)
+    if policy is None:
+        with _policies_lock:
+            policy = _policies.setdefault(exchange, ExchangePolicy(exchange))
+    return policy
+
+
+def load_state(data_dir=tick_storage.DATA_DIR):
+    """Kaydedilmiş süreleri ve devre durumlarını yükler; bu süreçte oluşturulmuş politikalar korunur"""
+    path = state_path(data_dir)
+    if not os.path.exists(path):
+        return
+    try:
+        with open(path, 'r') as file:
+            state = json.load(file)
+        policies = {name: ExchangePolicy.from_checkpoint(name, policy_state)
+                    for name, policy_state in state['exchanges'].items()}
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        print(f"İstek politikası durumu okunamadı ({path}): {e}")
+        return
+    with _policies_lock:
+        for name, policy in policies.items():
+            _policies.setdefault(name, policy)
+
+
+def save_state(data_dir=tick_storage.DATA_DIR, force=True):
+    """Süreleri ve devre durumlarını atomik olarak yazar; force değilse SAVE_INTERVAL'dan sık yazmaz"""
+    global _last_save
+    now = time.monotonic()
+    if not force and _last_save is not None and now - _last_save < SAVE_INTERVAL:
+        return
+    with _policies_lock:
+        policies = dict(_policies)
+    if not policies:
+        return
+    os.makedirs(data_dir, exist_ok=True)
+    state = {'exchanges': {name: policy.to_checkpoint() for name, policy in sorted(policies.items())}}
+    tick_storage.atomic_write_json(state_path(data_dir), state, indent=None)
+    _last_save = now
+
+
+def reset():
+    """Tüm borsaların geçmişini ve devre durumlarını sıfırlar"""
+    with _policies_lock:
+        _policies.clear()
+
+
+@contextmanager
+def unit_budget(exchange):
+    """
+    Bir borsa adımının tüm istekleri için ortak süre bütçesi
+
+    Birden fazla istek atan borsalarda (Coinbase) her istek bütçeden kalan
+    süreyle sınırlanır; böylece bozuk bir borsa bir turda zaman aşımını
+    birkaç kez ödemez.
+    """
+    _local.deadline = time.monotonic() + get_policy(exchange).timeout() * UNIT_BUDGET_MULTIPLIER
+    try:
+        yield
+    finally:
+        _local.deadline = None
+
+
+def request_timeout(exchange):
+    """İstek için kullanılacak zaman aşımı; bütçe dolduysa requests Timeout fırlatır"""
+    timeout = get_policy(exchange).timeout()
+    deadline = getattr(_local, 'deadline', None)
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.exceptions.Timeout(f"{exchange} için tur bütçesi doldu")
+        timeout = min(timeout, remaining)
+    return timeout
+
+
+def _get_hedge_executor():
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _policies_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='hedge')
+    return _hedge_executor
+
+
+def _hedged_get(exchange, url, timeout, delay):
+    """İlk istek delay içinde dönmezse kopyasını gönderir; ilk başarılı yanıtı döndürür"""
+    executor = _get_hedge_executor()
+    started = time.monotonic()
+    first = executor.submit(http_session.get, url, timeout=timeout)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result()
+
+    metrics.inc('tracker_hedged_requests_total', exchange=exchange)
+    second = executor.submit(http_session.get, url, timeout=max(MIN_HEDGE_DELAY, timeout - delay))
+    pending = {first, second}
+    error = None
+    while pending:
+        remaining = timeout - (time.monotonic() - started)
+        done, pending = wait(pending, timeout=max(0.0, remaining), return_when=FIRST_COMPLETED)
+        if not done:
+            raise requests.exceptions.Timeout(f"{exchange} isteği {timeout:.2f} sn içinde yanıtlanmadı")
+        for future in done:
+            if future.exception() is None:
+                if future is second:
+                    metrics.inc('tracker_hedge_wins_total', exchange=exchange)
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def send(exchange, url):
+    """
+    Borsanın politikasına göre GET isteği gönderir ve süresini kaydeder
+
+    Zaman aşımında süre olarak zaman aşımı değeri kaydedilir.
+    """
+    policy = get_policy(exchange)
+    timeout = request_timeout(exchange)
+    delay = policy.percentile(0.95) if HEDGE_ENABLED else None
+    started = time.perf_counter()
+    try:
+        if delay is not None and max(MIN_HEDGE_DELAY, delay) < timeout:
+            response = _hedged_get(exchange, url, timeout, max(MIN_HEDGE_DELAY, delay))
+        else:
+            response = http_session.get(url, timeout=timeout)
+    except requests.exceptions.Timeout:
+        policy.observe(timeout)
+        raise
+    policy.observe(time.perf_counter() - started)
+    return response
+
+
+def format_status():
+    """Açık devreleri tek satırlık özet olarak döndürür (hepsi kapalıysa None)"""
+    open_circuits = []
+    for name, policy in sorted(_policies.items()):
+        remaining = policy.remaining_open()
+        if remaining > 0:
+            open_circuits.append(f"{name} ({remaining:.0f} sn)")
+    if not open_circuits:
+        return None
+    return "Devresi açık borsalar: " + ", ".join(open_circuits)
@@ -0,0 +1,229 @@
+"""
+Katmanlı veri saklama
+
+Günler yaşlarına göre üç katmanda tutulur:
+
+    sıcak (hot)   son HOT_DAYS gün: ham NDJSON, özet, mumlar, indeks, derinlik,
+                  karantina
+    ılık (warm)   WARM_DAYS güne kadar: ham veri sıkıştırılmış sütunlu parçaya
+                  (columnar_archive.write_chunk) dönüştürülür, derinlik dosyası
+                  gzip ile sıkıştırılır; özet, tüm mumlar, VWAP ve karantina
+                  kayıtları kalır
+    soğuk (cold)  daha eski günler: yalnızca günlük özet, 1h/1d mumları ve VWAP kayıtları kalır
+
+Her günün katmanı data/retention_manifest.json dosyasında tutulur. Bakım günde
+bir kez çalışır: yeni günler bulunur, yalnızca katman değiştiren günlerin
+dosyalarına dokunulur ve klasör boyutu her dosyanın yeniden ölçülmesi yerine
+manifestteki boyutlardan hesaplanır.
+"""
+import glob
+import gzip
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+
+import candles
+import daily_summary
+import depth
+import quote_validator
+import tick_query
+import tick_storage
+
+HOT_DAYS = 7
+WARM_DAYS = 90
+
+TIER_NAMES = {'hot': 'sıcak', 'warm': 'ılık', 'cold': 'soğuk'}
+
+# Soğuk katmanda saklanan mum çözünürlükleri
+COLD_RESOLUTIONS = ('1h', '1d')
+
+MANIFEST_FILE = 'retention_manifest.json'
+
+# columnar_archive.chunk_path uzantıları; numpy'yi yalnızca sıkıştırma sırasında yüklemek için burada tekrarlanır
+CHUNK_CODECS = ('gz', 'zst')
+
+
+def manifest_path(data_dir=tick_storage.DATA_DIR):
+    """Saklama manifestinin yolunu döndürür"""
+    return os.path.join(data_dir, MANIFEST_FILE)
+
+
+def load_manifest(data_dir=tick_storage.DATA_DIR):
+    """Manifesti okur; yoksa veya bozuksa boş manifest döndürür"""
+    path = manifest_path(data_dir)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as file:
+                return json.load(file)
+        except json.JSONDecodeError as e:
+            print(f"Saklama manifesti okunamadı ({path}): {e}")
+    return {'checked': None, 'days': {}}
+
+
+def _archive_dir(data_dir):
+    return os.path.join(data_dir, 'columnar')
+
+
+def day_files(date, data_dir=tick_storage.DATA_DIR):
+    """Güne ait tüm dosya ve klasörleri döndürür"""
+    paths = [
+        tick_storage.ndjson_path(date, data_dir),
+        tick_storage.legacy_json_path(date, data_dir),
+        tick_query.index_path(date, data_dir),
+        daily_summary.summary_path(date, data_dir),
+        daily_summary.checkpoint_path(date, data_dir),
+        candles.checkpoint_path(date, data_dir),
+        depth.depth_path(date, data_dir),
+        f'{depth.depth_path(date, data_dir)}.gz',
+        depth.vwap_path(date, data_dir),
+        quote_validator.quarantine_path(date, data_dir),
+    ]
+    paths += [candles.candles_path(date, resolution, data_dir) for resolution in candles.RESOLUTIONS]
+    archive_dir = _archive_dir(data_dir)
+    paths += [os.path.join(archive_dir, date)] + [os.path.join(archive_dir, f'{date}.chunk.{codec}')
+                                                  for codec in CHUNK_CODECS]
+    return [path for path in paths if os.path.exists(path)]
+
+
+def _size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    return os.path.getsize(path)
+
+
+def _remove(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def compact_day(date, data_dir=tick_storage.DATA_DIR):
+    """
+    Günü ılık katmana taşır
+
+    Açık mumlar kapatılıp yazılır, ham kayıtlar sıkıştırılmış sütunlu parçaya
+    dönüştürülür; ardından ham dosya, indeks, kontrol noktaları ve memmap
+    arşivi silinir.
+    """
+    import columnar_archive
+
+    archive_dir = _archive_dir(data_dir)
+    if tick_storage.day_exists(date, data_dir):
+        engine = candles.load(date, data_dir)
+        engine.close_all()
+        candles.flush(engine, data_dir)
+        candles.invalidate(date, data_dir)
+
+        records = tick_storage.read_day(date, data_dir)
+        names = columnar_archive.load_dictionary(archive_dir)
+        known = len(names)
+        columns = columnar_archive.records_to_columns(records, names)
+        if len(names) != known:
+            columnar_archive.save_dictionary(names, archive_dir)
+        columnar_archive.write_chunk(date, columns, archive_dir)
+    else:
+        # Ham dosyası olmayan ama memmap arşivi bulunan gün
+        day = columnar_archive.open_day(date, archive_dir)
+        if isinstance(day, columnar_archive.DayColumns):
+            columnar_archive.write_chunk(date, {column: day[column] for column in columnar_archive.COLUMNS},
+                                         archive_dir)
+
+    depth_file = depth.depth_path(date, data_dir)
+    if os.path.exists(depth_file):
+        with open(depth_file, 'rb') as source, gzip.open(f'{depth_file}.gz', 'wb') as target:
+            shutil.copyfileobj(source, target)
+
+    for path in (depth_file, tick_storage.ndjson_path(date, data_dir), tick_storage.legacy_json_path(date, data_dir),
+                 tick_query.index_path(date, data_dir), daily_summary.checkpoint_path(date, data_dir),
+                 candles.checkpoint_path(date, data_dir), columnar_archive.day_path(date, archive_dir)):
+        _remove(path)
+
+
+def freeze_day(date, data_dir=tick_storage.DATA_DIR):
+    """Günü soğuk katmana taşır: ham veri parçası, derinlik ve karantina dosyaları ve ince mumlar silinir"""
+    archive_dir = _archive_dir(data_dir)
+    _remove(f'{depth.depth_path(date, data_dir)}.gz')
+    _remove(quote_validator.quarantine_path(date, data_dir))
+    for codec in CHUNK_CODECS:
+        _remove(os.path.join(archive_dir, f'{date}.chunk.{codec}'))
+    for resolution in candles.RESOLUTIONS:
+        if resolution not in COLD_RESOLUTIONS:
+            _remove(candles.candles_path(date, resolution, data_dir))
+
+
+def _discover_dates(data_dir):
+    """Klasördeki günleri bulur (günde bir kez çağrılır)"""
+    dates = set()
+    for pattern in ('btc_prices_*', 'summary_*.json', 'candles_*', 'depth_*', 'quarantine_*'):
+        for path in glob.glob(os.path.join(data_dir, pattern)):
+            date = os.path.basename(path).split('_')[-1].split('.')[0]
+            if len(date) == 10:
+                dates.add(date)
+    for path in glob.glob(os.path.join(_archive_dir(data_dir), '*.chunk.*')):
+        dates.add(os.path.basename(path)[:10])
+    return dates
+
+
+def maintain(hot_days=HOT_DAYS, warm_days=WARM_DAYS, max_hot_files=30, data_dir=tick_storage.DATA_DIR,
+             force=False, today=None):
+    """
+    Günleri yaşlarına göre katmanlarına taşır
+
+    Parameters:
+    hot_days (int): Ham verinin saklanacağı gün sayısı
+    warm_days (int): Sıkıştırılmış ham verinin saklanacağı gün sayısı
+    max_hot_files (int): Sıcak katmanda tutulacak en fazla ham veri günü
+    force (bool): Bugün zaten çalışmış olsa da bakımı yeniden çalıştırır
+    today (datetime): Test ve ölçümler için bugünün tarihi
+
+    Returns:
+    dict: Güncel manifest
+    """
+    manifest = load_manifest(data_dir)
+    today = today or datetime.now()
+    today_str = today.strftime('%Y-%m-%d')
+    if not force and manifest.get('checked') == today_str:
+        return manifest
+
+    hot_cutoff = (today - timedelta(days=hot_days)).strftime('%Y-%m-%d')
+    warm_cutoff = (today - timedelta(days=warm_days)).strftime('%Y-%m-%d')
+    days = manifest.setdefault('days', {})
+    for date in _discover_dates(data_dir):
+        days.setdefault(date, {'tier': 'hot', 'bytes': None})
+
+    # Sıcak katmandaki gün sayısı sınırı aşıyorsa en eskiler erkenden sıkıştırılır
+    hot_dates = sorted(date for date, entry in days.items() if entry['tier'] == 'hot' and date >= hot_cutoff)
+    early = set(hot_dates[:-max_hot_files]) if max_hot_files and len(hot_dates) > max_hot_files else set()
+
+    for date in sorted(days):
+        entry = days[date]
+        target = 'hot' if date >= hot_cutoff and date not in early else 'warm' if date >= warm_cutoff else 'cold'
+        if entry['tier'] == 'hot' and target != 'hot':
+            compact_day(date, data_dir)
+            print(f"{date} sıkıştırılmış arşive taşındı")
+        if entry['tier'] != 'cold' and target == 'cold':
+            freeze_day(date, data_dir)
+            print(f"{date} yalnızca özet ve saatlik/günlük mumlarla saklanıyor")
+        if target != entry['tier'] or entry['bytes'] is None or target == 'hot':
+            paths = day_files(date, data_dir)
+            if not paths:
+                del days[date]
+                continue
+            entry['bytes'] = sum(_size(path) for path in paths)
+        entry['tier'] = target
+
+    manifest['checked'] = today_str
+    os.makedirs(data_dir, exist_ok=True)
+    tick_storage.atomic_write_json(manifest_path(data_dir), manifest)
+    return manifest
+
+
+def tier_sizes(manifest):
+    """Manifestten katman başına gün sayısını ve bayt toplamını döndürür"""
+    sizes = {}
+    for entry in manifest['days'].values():
+        count, total = sizes.get(entry['tier'], (0, 0))
+        sizes[entry['tier']] = (count + 1, total + (entry['bytes'] or 0))
+    return sizes
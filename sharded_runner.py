@@ -0,0 +1,385 @@
+"""
+Çok süreçli (sharded) veri toplama
+
+Çok sayıda (borsa, sembol) çifti izlendiğinde tek bir yorumlayıcıda yanıtların
+ayrıştırılması ve kayıtların kodlanması GIL nedeniyle sıraya girer. Bu modda
+istek birimleri (exchanges.plan_requests) çalışan süreçlere bölünür:
+
+    çalışan süreçler   kendi birimlerini her turda çeker, kayıtları sembolün
+                       klasöründeki (tick_storage.symbol_dir) kendi segment
+                       dosyalarına ekler:
+                       data/segments/YYYY-MM-DD/worker_N.ndjson (BTC/USDT)
+                       data/symbols/ETH-USDT/segments/YYYY-MM-DD/worker_N.ndjson
+    koordinatör        belirli aralıklarla segmentlerin yeni satırlarını okur,
+                       zaman damgasına göre sıralayıp aynı klasördeki günün
+                       NDJSON dosyasına yeniden kodlamadan ekler; sembolün
+                       günlük özetini ve mumlarını günceller
+
+Koordinatör her segmentte nereye kadar okuduğunu ve günün dosyasının o andaki
+boyutunu data/segments/YYYY-MM-DD/merge_state.json dosyasında tutar. Ekleme
+yapılıp durum yazılamadan kesilen bir koordinatör yeniden başladığında günün
+dosyası kayıtlı boyuta kısaltılır ve bu satırlar segmentlerden yeniden eklenir;
+özet ve mum motorları dosya küçüldüğü için günü baştan üretir.
+
+Bu modda günün dosyasına yalnızca koordinatör yazar; aynı klasörde tek seferlik
+(cron) çalıştırma veya daemon modu aynı anda kullanılmamalıdır.
+"""
+import glob
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+
+import candles
+import daily_summary
+import exchanges
+import http_session
+import metrics
+import quote_validator
+import request_policy
+import tick_storage
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+SEGMENTS_DIR = 'segments'
+STATE_FILE = 'merge_state.json'
+
+# Geçmiş bir günün segmentleri, son yazmadan bu kadar süre sonra silinir (saniye)
+SEGMENT_GRACE = 120
+
+# Çalışan başına azami istek iş parçacığı sayısı
+MAX_FETCH_THREADS = 32
+
+# (veri klasörü, tarih) -> birleştirme durumu
+_states = {}
+
+
+def segment_dir(date, data_dir=tick_storage.DATA_DIR):
+    """Günün segment klasörünün yolunu döndürür"""
+    return os.path.join(data_dir, SEGMENTS_DIR, date)
+
+
+def segment_path(date, worker_id, data_dir=tick_storage.DATA_DIR):
+    """Çalışanın gün için segment dosyasının yolunu döndürür"""
+    return os.path.join(segment_dir(date, data_dir), f'worker_{worker_id}.ndjson')
+
+
+def state_path(date, data_dir=tick_storage.DATA_DIR):
+    """Günün birleştirme durumu dosyasının yolunu döndürür"""
+    return os.path.join(segment_dir(date, data_dir), STATE_FILE)
+
+
+def partition(units, workers):
+    """
+    İstek birimlerini çalışanlara dağıtır
+
+    Birimler borsa ve sembole göre sıralanıp sırayla dağıtılır; böylece aynı
+    borsanın birimleri farklı çalışanlara yayılır ve plan değişmedikçe her
+    (borsa, sembol) çifti hep aynı çalışanda kalır.
+
+    Parameters:
+    units (list): (borsa adı, semboller) demetleri
+    workers (int): Çalışan sayısı
+
+    Returns:
+    list: Çalışan başına birim listeleri (boş çalışanlar atlanır)
+    """
+    shards = [[] for _ in range(workers)]
+    for index, unit in enumerate(sorted(units, key=lambda unit: (unit[1], unit[0]))):
+        shards[index % workers].append(unit)
+    return [shard for shard in shards if shard]
+
+
+def _fetch_tick(executor, units, tick_deadline, data_dir=tick_storage.DATA_DIR):
+    """
+    Çalışanın birimlerini eşzamanlı çeker; süresinde yanıt vermeyenler atlanır, geçersiz kotasyonlar karantinaya alınır
+
+    Returns:
+    dict: Sembol -> kabul edilen kayıtlar
+    """
+    futures = [executor.submit(exchanges.fetch_unit, exchanges.REGISTRY[name], list(symbols))
+               for name, symbols in units]
+    wait(futures, timeout=tick_deadline)
+
+    by_symbol = {}
+    for (name, _), future in zip(units, futures):
+        if not future.done():
+            future.cancel()
+            metrics.inc('tracker_deadline_missed_total', exchange=name)
+            print(f"❌ {name} {tick_deadline} sn içinde yanıt vermedi, bu turda atlandı")
+            continue
+        for symbol, record in future.result().items():
+            by_symbol.setdefault(symbol, []).append(record)
+
+    return {symbol: quote_validator.screen(symbol_records, symbol, data_dir)
+            for symbol, symbol_records in by_symbol.items()}
+
+
+def worker_settings():
+    """Komut satırı bayraklarıyla değiştirilen modül ayarlarını çalışanlara aktarılmak üzere toplar"""
+    return {
+        'debug': exchanges.DEBUG,
+        'hedge': request_policy.HEDGE_ENABLED,
+        'validate': quote_validator.ENABLED,
+    }
+
+
+def apply_settings(settings, api_base=None):
+    """worker_settings çıktısını ve (varsa) borsa API adresini bu süreçte uygular"""
+    if api_base:
+        for name in exchanges.API_BASE_URLS:
+            exchanges.API_BASE_URLS[name] = api_base
+    if settings:
+        exchanges.DEBUG = settings['debug']
+        request_policy.HEDGE_ENABLED = settings['hedge']
+        quote_validator.ENABLED = settings['validate']
+
+
+def _worker_main(worker_id, units, interval, tick_deadline, start, stop_event, max_ticks=None,
+                 data_dir=tick_storage.DATA_DIR, api_base=None, settings=None):
+    """
+    Çalışan sürecin döngüsü
+
+    Turlar koordinatörün başlangıç zamanına (start, epoch saniye) göre
+    planlanır; böylece tüm çalışanlar aynı anda istek gönderir.
+    """
+    # Ctrl+C tüm süreç grubuna gider; çalışanlar koordinatörün durdurma olayını bekler
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # spawn ile başlatılan süreç modülleri yeniden yüklediğinden --debug, --hedge ve --no-validation
+    # ayarları ana süreçten aktarılır
+    apply_settings(settings, api_base)
+    # Birimler çalışanlara sabit sırayla bölündüğünden aynı çalışan aynı borsa/sembol çiftlerini doğrular
+    quote_validator.STATE_NAME = f'validator_state_worker_{worker_id}'
+    request_policy.STATE_NAME = f'request_policy_state_worker_{worker_id}'
+    request_policy.load_state(data_dir)
+    http_session.configure_pools(exchanges.pool_sizes([(exchanges.REGISTRY[name], symbols) for name, symbols in units]))
+
+    executor = ThreadPoolExecutor(max_workers=min(MAX_FETCH_THREADS, len(units) * 2),
+                                  thread_name_prefix=f'worker-{worker_id}')
+    tick_index = 0
+    try:
+        while not stop_event.is_set() and (max_ticks is None or tick_index < max_ticks):
+            current_date = datetime.now().strftime('%Y-%m-%d')
+            for symbol, records in _fetch_tick(executor, units, tick_deadline, data_dir).items():
+                if not records:
+                    continue
+                # Semboller ayrı günlük dosyalara birleştirildiğinden segmentler de sembol klasöründe tutulur
+                path = segment_path(current_date, worker_id, tick_storage.symbol_dir(symbol, data_dir))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tick_storage.append_lines(path, records)
+            request_policy.save_state(data_dir, force=False)
+
+            tick_index += 1
+            next_tick = start + tick_index * interval
+            now = time.time()
+            if next_tick < now and interval > 0:
+                tick_index += int((now - next_tick) // interval) + 1
+                next_tick = start + tick_index * interval
+            stop_event.wait(max(0.0, next_tick - time.time()))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        quote_validator.save_state(data_dir)
+        request_policy.save_state(data_dir)
+
+
+def _load_state(date, data_dir):
+    """
+    Günün birleştirme durumunu yükler ve günün dosyasını durumla tutarlı hale getirir
+    """
+    path = tick_storage.ndjson_path(date, data_dir)
+    tick_storage.recover(path)
+    size = os.path.getsize(path) if os.path.exists(path) else 0
+
+    state = None
+    if os.path.exists(state_path(date, data_dir)):
+        try:
+            with open(state_path(date, data_dir), 'r') as file:
+                state = json.load(file)
+        except json.JSONDecodeError as e:
+            print(f"Birleştirme durumu okunamadı ({state_path(date, data_dir)}): {e}")
+
+    if state is None:
+        # Segmentler ilk kez birleştiriliyor; dosyadaki mevcut kayıtlar korunur. Durum
+        # eklemeden önce yazılır, böylece ilk ekleme de kesintiye karşı korunur
+        state = {'offsets': {}, 'day_size': size}
+        tick_storage.atomic_write_json(state_path(date, data_dir), state, indent=None)
+        return state
+    if size > state['day_size']:
+        # Eklenmiş ama durumu yazılamamış satırlar segmentlerden yeniden eklenecek
+        with open(path, 'rb+') as file:
+            file.truncate(state['day_size'])
+        print(f"{path} birleştirme durumuna göre {size - state['day_size']} bayt kısaltıldı")
+    elif size < state['day_size']:
+        state['day_size'] = size
+    return state
+
+
+def merge_day(date, data_dir=tick_storage.DATA_DIR):
+    """
+    Günün segmentlerine eklenen yeni satırları günün dosyasına ekler
+
+    Returns:
+    int: Eklenen kayıt sayısı
+    """
+    key = (data_dir, date)
+    state = _states.get(key)
+    if state is None:
+        state = _states[key] = _load_state(date, data_dir)
+
+    lines = []
+    records = []
+    offsets = dict(state['offsets'])
+    with metrics.timer('tracker_stage_duration_seconds', stage='merge'):
+        for path in sorted(glob.glob(os.path.join(segment_dir(date, data_dir), 'worker_*.ndjson'))):
+            name = os.path.basename(path)
+            new_lines, new_records, offsets[name] = tick_storage.read_lines_from(path, offsets.get(name, 0))
+            lines.extend(new_lines)
+            records.extend(new_records)
+        # Her segment kendi içinde sıralı olduğundan Timsort bu parçaları doğrusala yakın sürede birleştirir
+        order = sorted(range(len(records)), key=lambda index: records[index].get('timestamp') or '')
+
+    if records:
+        with metrics.timer('tracker_stage_duration_seconds', stage='persist'):
+            end_offset = tick_storage.append_encoded(date, [lines[index] for index in order], data_dir)
+        metrics.inc('tracker_records_total', len(records))
+        state['day_size'] = end_offset
+    if offsets != state['offsets']:
+        state['offsets'] = offsets
+        tick_storage.atomic_write_json(state_path(date, data_dir), state, indent=None)
+
+    if records:
+        records = [records[index] for index in order]
+        with metrics.timer('tracker_stage_duration_seconds', stage='summarize'):
+            daily_summary.update_daily_summary(date, records, end_offset, data_dir)
+        with metrics.timer('tracker_stage_duration_seconds', stage='rollup'):
+            candles.update_candles(date, records, end_offset, data_dir)
+    return len(records)
+
+
+def _finish_day(date, data_dir):
+    """Geçmiş günün segmentleri tamamen birleştirildiyse ve artık yazılmıyorsa siler"""
+    state = _states.get((data_dir, date))
+    paths = glob.glob(os.path.join(segment_dir(date, data_dir), 'worker_*.ndjson'))
+    if state is None or any(os.path.getsize(path) > state['offsets'].get(os.path.basename(path), 0)
+                            for path in paths):
+        return
+    if any(time.time() - os.path.getmtime(path) < SEGMENT_GRACE for path in paths):
+        return
+    shutil.rmtree(segment_dir(date, data_dir))
+    del _states[(data_dir, date)]
+
+
+def merge_all(data_dir=tick_storage.DATA_DIR):
+    """
+    Tüm sembol klasörlerinde tüm günlerin segmentlerini eskiden yeniye birleştirir
+
+    Returns:
+    int: Eklenen toplam kayıt sayısı
+    """
+    today = datetime.now().strftime('%Y-%m-%d')
+    merged = 0
+    for symbol_dir in tick_storage.symbol_dirs(data_dir):
+        for path in sorted(glob.glob(os.path.join(symbol_dir, SEGMENTS_DIR, '*'))):
+            date = os.path.basename(path)
+            merged += merge_day(date, symbol_dir)
+            if date < today:
+                _finish_day(date, symbol_dir)
+    return merged
+
+
+def _start_worker(context, worker_id, units, options):
+    process = context.Process(target=_worker_main, args=(worker_id, units), kwargs=options,
+                              name=f'collector-{worker_id}', daemon=True)
+    process.start()
+    return process
+
+
+def run_sharded(workers=DEFAULT_WORKERS, symbols=(exchanges.DEFAULT_SYMBOL,), venues=None, interval=60,
+                flush_interval=60, tick_deadline=None, cleanup=None, cleanup_interval=3600, max_ticks=None,
+                data_dir=tick_storage.DATA_DIR, units=None, api_bases=None):
+    """
+    Toplama işini çalışan süreçlere bölerek sürekli çalıştırır
+
+    Parameters:
+    workers (int): Çalışan süreç sayısı
+    symbols (tuple): Ortak semboller
+    venues (list): Borsa adları (varsayılan: kayıtlı tüm borsalar)
+    interval (float): Turlar arası süre (saniye; 0 ise turlar beklemeden art arda)
+    flush_interval (float): Segmentlerin günün dosyasına birleştirilme aralığı (saniye)
+    tick_deadline (float): Tur başına azami süre; verilmezse interval ile 12 sn'nin küçüğü
+    cleanup (callable): Koordinatörde cleanup_interval'da bir çağrılacak veri bakımı
+    max_ticks (int): Çalışan başına tur sayısı; verilmezse durdurulana kadar
+    units (list): (borsa adı, semboller) birimleri; verilmezse symbols ve venues'ten planlanır
+    api_bases (list): Çalışan başına borsa API adresi (yerel yeniden oynatma sunucularına karşı ölçüm için)
+
+    Returns:
+    int: Birleştirilen toplam kayıt sayısı
+    """
+    if units is None:
+        units = [(adapter.name, tuple(unit)) for adapter, unit in exchanges.plan_requests(symbols, venues)]
+    if tick_deadline is None:
+        tick_deadline = min(interval, 12) if interval > 0 else 12
+    shards = partition(units, max(1, workers))
+    print(f"Çok süreçli toplama başlatıldı: {len(units)} istek birimi {len(shards)} çalışana bölündü, "
+          f"her {flush_interval} sn'de bir birleştirilecek")
+
+    # fork, koordinatörde çalışan metrik ve HTTP iş parçacıklarını kopyalayacağından spawn kullanılır
+    context = multiprocessing.get_context('spawn')
+    # Çalışanlar süreçler arası olayı bekler; sinyal işleyicisi yalnızca koordinatörün kendi olayını
+    # kurar, çünkü süreçler arası olayın kilidi beklerken sinyal işleyicisinden alınamaz. Kendi olayı da
+    # ayrı bir iş parçacığından kurulur: sinyal ana iş parçacığı olayın kilidini tutarken gelirse
+    # işleyicideki set() aynı kilidi bekleyerek kilitlenir
+    stop_event = context.Event()
+    stopping = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"Sinyal alındı ({signum}), çalışanlar durduruluyor ve segmentler birleştiriliyor...")
+        threading.Thread(target=stopping.set, daemon=True).start()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    start = time.time()
+    settings = worker_settings()
+    options = [{'interval': interval, 'tick_deadline': tick_deadline, 'start': start, 'stop_event': stop_event,
+                'max_ticks': max_ticks, 'data_dir': data_dir, 'settings': settings,
+                'api_base': api_bases[worker_id % len(api_bases)] if api_bases else None}
+               for worker_id in range(len(shards))]
+    processes = [_start_worker(context, worker_id, shard, options[worker_id])
+                 for worker_id, shard in enumerate(shards)]
+
+    merged = 0
+    last_cleanup = None
+    try:
+        while not stopping.is_set():
+            now = time.monotonic()
+            if cleanup is not None and (last_cleanup is None or now - last_cleanup >= cleanup_interval):
+                cleanup()
+                last_cleanup = now
+
+            stopping.wait(flush_interval)
+            merged += merge_all(data_dir)
+
+            for worker_id, process in enumerate(processes):
+                if process.is_alive() or stopping.is_set() or (max_ticks is not None and process.exitcode == 0):
+                    continue
+                print(f"Çalışan {worker_id} beklenmedik şekilde sonlandı (çıkış kodu {process.exitcode}), "
+                      f"yeniden başlatılıyor")
+                metrics.inc('tracker_worker_restarts_total', worker=str(worker_id))
+                processes[worker_id] = _start_worker(context, worker_id, shards[worker_id], options[worker_id])
+            if max_ticks is not None and not any(process.is_alive() for process in processes):
+                break
+    finally:
+        stop_event.set()
+        for process in processes:
+            process.join(timeout=tick_deadline + 5)
+            if process.is_alive():
+                process.terminate()
+        merged += merge_all(data_dir)
+        print(f"Çok süreçli toplama durduruldu, {merged} kayıt birleştirildi")
+    return merged
@@ -0,0 +1,70 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import arbitrage_scanner
+
+
+def _dense_records(ticks, crossed_tick):
+    records = []
+    for tick in range(ticks):
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(1_750_000_000 + tick))
+        for exchange in ('Binance', 'OKX', 'Kraken'):
+            ask = 80001.0
+            if exchange == 'OKX' and tick == crossed_tick:
+                ask = 79950.0
+            records.append({'exchange': exchange, 'timestamp': timestamp, 'bid': 80000.0, 'ask': ask,
+                            'bid_qty': 0.5, 'ask_qty': 0.25})
+    return records
+
+
+def test_dense_ticks_form_one_snapshot_per_tick():
+    # Daemon --interval 1: turlar 5 sn'lik pencereden sık; tek turluk fırsat kaybolmamalı
+    opportunities = arbitrage_scanner.scan_records(_dense_records(600, 300), fees={})
+
+    assert len(opportunities) == 1
+    opportunity = opportunities[0]
+    assert opportunity['buy_exchange'] == 'OKX'
+    assert opportunity['snapshots'] == 1
+    assert opportunity['start'] == (1_750_000_000 + 300) * 1000
+    assert opportunity['max_net_spread'] == 50.0
+    assert opportunity['max_size'] == 0.25
+
+
+def test_quotes_of_one_tick_split_across_seconds_share_a_snapshot():
+    records = [
+        {'exchange': 'Binance', 'timestamp': '2025-01-01 00:00:00', 'bid': 100.0, 'ask': 101.0,
+         'bid_qty': 1.0, 'ask_qty': 1.0},
+        {'exchange': 'OKX', 'timestamp': '2025-01-01 00:00:01', 'bid': 103.0, 'ask': 104.0,
+         'bid_qty': 1.0, 'ask_qty': 1.0},
+    ]
+    opportunities = arbitrage_scanner.scan_records(records, fees={})
+
+    assert [(o['buy_exchange'], o['sell_exchange'], o['max_net_spread']) for o in opportunities] == \
+        [('Binance', 'OKX', 2.0)]
+
+
+def _reference_snapshots(timestamps, exchange_ids, max_gap_ms):
+    # Kayıt kayıt ilerleyen tanım: borsa tekrarında veya pencere dolunca yeni görüntü
+    ids, current, start, seen = [], 0, timestamps[0], set()
+    for timestamp, exchange_id in zip(timestamps, exchange_ids):
+        if exchange_id in seen or timestamp - start > max_gap_ms:
+            current, start, seen = current + 1, timestamp, set()
+        seen.add(exchange_id)
+        ids.append(current)
+    return ids
+
+
+def test_vectorized_snapshot_ids_match_sequential_definition():
+    rng = np.random.default_rng(7)
+    for _ in range(500):
+        count = int(rng.integers(1, 80))
+        timestamps = np.sort(rng.integers(0, 40000, count)).astype(np.int64)
+        exchange_ids = rng.integers(0, int(rng.integers(1, 7)), count)
+        max_gap_ms = int(rng.integers(0, 8000))
+        assert arbitrage_scanner._assign_snapshots(timestamps, exchange_ids, max_gap_ms).tolist() == \
+            _reference_snapshots(timestamps.tolist(), exchange_ids.tolist(), max_gap_ms)
@@ -0,0 +1,100 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import exchanges
+import metrics
+import request_policy
+import tick_storage
+
+
+def _error_count(name, kind):
+    return sum(counter['value'] for counter in metrics.snapshot()['counters']
+               if counter['name'] == 'tracker_request_errors_total'
+               and counter['labels'] == {'exchange': name, 'kind': kind})
+
+
+def test_fetch_without_quotes_counts_as_failure():
+    request_policy.reset()
+    metrics.reset()
+    # Coinbase'in ticker ve spot fiyat uç noktaları da başarısız olduğunda fetch None döndürür
+    adapter = exchanges.ExchangeAdapter('Stub', symbols={'BTC/USDT': 'BTC-USD'}, fetch=lambda symbol: None)
+
+    for _ in range(request_policy.FAILURE_THRESHOLD):
+        assert exchanges.fetch_unit(adapter, ['BTC/USDT']) == {}
+
+    assert request_policy.get_policy('Stub').state == request_policy.OPEN
+    assert _error_count('Stub', 'data') == request_policy.FAILURE_THRESHOLD
+    request_policy.reset()
+
+
+def test_fetch_with_quote_closes_failure_run():
+    request_policy.reset()
+    quote = exchanges.Quote(80000.0, 80001.0, 1.0, 1.0)
+    adapter = exchanges.ExchangeAdapter('Stub', symbols={'BTC/USDT': 'BTC-USD'}, fetch=lambda symbol: quote)
+    request_policy.get_policy('Stub').record_failure()
+
+    assert exchanges.call_with_policy(adapter, adapter.fetch_quotes, ['BTC/USDT']) == {'BTC/USDT': quote}
+    assert request_policy.get_policy('Stub').failures == 0
+    request_policy.reset()
+
+
+# Borsaların toplu ticker yanıtlarından kısaltılmış örnekler; istenmeyen semboller de yanıtta bulunur
+BATCH_PAYLOADS = {
+    'Binance': [
+        {'symbol': 'BTCUSDT', 'bidPrice': '80000.10', 'bidQty': '1.5', 'askPrice': '80000.20', 'askQty': '0.7'},
+        {'symbol': 'ETHUSDT', 'bidPrice': '3000.10', 'bidQty': '12.0', 'askPrice': '3000.20', 'askQty': '8.0'},
+    ],
+    'OKX': {'code': '0', 'data': [
+        {'instId': 'SOL-USDT', 'bidPx': '150.1', 'bidSz': '3', 'askPx': '150.2', 'askSz': '4'},
+        {'instId': 'ETH-USDT', 'bidPx': '3000.3', 'bidSz': '11', 'askPx': '3000.4', 'askSz': '9'},
+        {'instId': 'BTC-USDT', 'bidPx': '80000.3', 'bidSz': '0.5', 'askPx': '80000.4', 'askSz': '0.6'},
+    ]},
+    'Kraken': {'error': [], 'result': {
+        'XXBTZUSD': {'a': ['80000.6', '1', '1.100'], 'b': ['80000.5', '2', '2.200']},
+        'XETHZUSD': {'a': ['3000.6', '5', '5.500'], 'b': ['3000.5', '6', '6.600']},
+    }},
+    'Bybit': {'retCode': 0, 'result': {'list': [
+        {'symbol': 'ETHUSDT', 'bid1Price': '3000.7', 'bid1Size': '7', 'ask1Price': '3000.8', 'ask1Size': '8'},
+        {'symbol': 'BTCUSDT', 'bid1Price': '80000.7', 'bid1Size': '0.3', 'ask1Price': '80000.8', 'ask1Size': '0.4'},
+        {'symbol': 'SOLUSDT', 'bid1Price': '150.7', 'bid1Size': '1', 'ask1Price': '150.8', 'ask1Size': '1'},
+    ]}},
+    'KuCoin': {'code': '200000', 'data': {'ticker': [
+        {'symbol': 'BTC-USDT', 'buy': '80000.9', 'sell': '80001.0', 'bestBidSize': '0.2', 'bestAskSize': '0.1'},
+        {'symbol': 'ETH-USDT', 'buy': '3000.9', 'sell': '3001.0', 'bestBidSize': '4', 'bestAskSize': '3'},
+    ]}},
+}
+
+EXPECTED = {
+    'Binance': {'BTC/USDT': (80000.1, 80000.2, 1.5, 0.7), 'ETH/USDT': (3000.1, 3000.2, 12.0, 8.0)},
+    'OKX': {'BTC/USDT': (80000.3, 80000.4, 0.5, 0.6), 'ETH/USDT': (3000.3, 3000.4, 11.0, 9.0)},
+    'Kraken': {'BTC/USDT': (80000.5, 80000.6, 2.2, 1.1), 'ETH/USDT': (3000.5, 3000.6, 6.6, 5.5)},
+    'Bybit': {'BTC/USDT': (80000.7, 80000.8, 0.3, 0.4), 'ETH/USDT': (3000.7, 3000.8, 7.0, 8.0)},
+    'KuCoin': {'BTC/USDT': (80000.9, 80001.0, 0.2, 0.1), 'ETH/USDT': (3000.9, 3001.0, 4.0, 3.0)},
+}
+
+
+def test_batch_parsers_keep_quotes_apart_per_symbol(monkeypatch):
+    request_policy.reset()
+    monkeypatch.setattr(exchanges, '_get_json', lambda name, url, exchange=None: BATCH_PAYLOADS[name])
+
+    for name, expected in EXPECTED.items():
+        adapter = exchanges.REGISTRY[name]
+        assert adapter.plan(list(expected)) == [list(expected)], name
+        records = exchanges.fetch_unit(adapter, list(expected))
+        assert sorted(records) == sorted(expected), name
+        for symbol, (bid, ask, bid_qty, ask_qty) in expected.items():
+            record = records[symbol]
+            assert record['symbol'] == symbol
+            assert record['exchange'] == name
+            assert (record['bid'], record['ask'], record['bid_qty'], record['ask_qty']) == (bid, ask, bid_qty, ask_qty)
+    request_policy.reset()
+
+
+def test_symbol_dir_keeps_default_symbol_in_data_dir(tmp_path):
+    assert tick_storage.symbol_dir('BTC/USDT', str(tmp_path)) == str(tmp_path)
+    eth_dir = tick_storage.symbol_dir('ETH/USDT', str(tmp_path))
+    assert eth_dir == os.path.join(str(tmp_path), 'symbols', 'ETH-USDT')
+    os.makedirs(eth_dir)
+    assert tick_storage.symbol_dirs(str(tmp_path)) == [str(tmp_path), eth_dir]
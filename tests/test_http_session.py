@@ -0,0 +1,82 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import crypto_price_tracker
+import exchanges
+import http_session
+import quote_validator
+import replay_stub
+
+SYMBOLS = ('BTC/USDT', 'ETH/USDT')
+
+
+# Borsa ve sembol başına farklı fiyatlar: yanlış sembolün kaydı dönerse test fark eder
+PRICES = {'BTC/USDT': 80000.0, 'ETH/USDT': 3000.0}
+
+
+def _records():
+    records = []
+    for index, name in enumerate(sorted(exchanges.REGISTRY)):
+        for symbol, price in PRICES.items():
+            records.append({'exchange': name, 'symbol': symbol, 'timestamp': '2025-01-01 00:00:00',
+                            'bid': price + index, 'ask': price + index + 0.5,
+                            'bid_qty': 1.0 + index, 'ask_qty': 2.0 + index})
+    return records
+
+
+def test_pools_sized_from_plan_keep_connections_across_ticks(monkeypatch):
+    server = replay_stub.start_server(replay_stub.FixtureStore(_records()))
+    monkeypatch.setattr(exchanges, 'API_BASE_URLS', dict(exchanges.API_BASE_URLS))
+    monkeypatch.setattr(quote_validator, 'ENABLED', False)
+    replay_stub.use_server(server)
+    http_session.close_session()
+    try:
+        units = exchanges.plan_requests(SYMBOLS)
+        # Stub sunucusunda tüm borsalar aynı adresi paylaşır: havuz tüm birimleri karşılamalı
+        assert exchanges.pool_sizes(units) == {exchanges.API_BASE_URLS['Binance']: len(units)}
+
+        for _ in range(5):
+            crypto_price_tracker.collect_quotes(SYMBOLS, tick_deadline=10)
+        stats = http_session.get_stats()
+    finally:
+        http_session.close_session()
+        http_session.configure_pools({})
+        server.shutdown()
+
+    host_stats = stats['127.0.0.1']
+    assert host_stats['requests'] >= 5 * len(units)
+    # İlk turdan sonra yeni el sıkışma olmaz
+    assert host_stats['connections'] <= len(units)
+
+
+def test_coinbase_pool_covers_both_hosts():
+    units = exchanges.plan_requests(SYMBOLS, ['Coinbase'])
+    assert exchanges.pool_sizes(units) == {exchanges.API_BASE_URLS['Coinbase']: 2,
+                                           exchanges.API_BASE_URLS['CoinbaseSpot']: 2}
+
+
+def test_batch_and_single_routes_return_each_symbol(monkeypatch):
+    records = _records()
+    server = replay_stub.start_server(replay_stub.FixtureStore(records))
+    monkeypatch.setattr(exchanges, 'API_BASE_URLS', dict(exchanges.API_BASE_URLS))
+    monkeypatch.setattr(quote_validator, 'ENABLED', False)
+    replay_stub.use_server(server)
+    http_session.close_session()
+    try:
+        quotes = crypto_price_tracker.collect_quotes(SYMBOLS, tick_deadline=10)
+    finally:
+        http_session.close_session()
+        http_session.configure_pools({})
+        server.shutdown()
+
+    expected = {(record['exchange'], record['symbol']): record for record in records}
+    for symbol in SYMBOLS:
+        got = {record['exchange']: record for record in quotes[symbol]}
+        assert sorted(got) == sorted(exchanges.REGISTRY), symbol
+        for name, record in got.items():
+            source = expected[(name, symbol)]
+            assert record['symbol'] == symbol
+            assert (record['bid'], record['ask']) == (source['bid'], source['ask']), (name, symbol)
+            assert (record['bid_qty'], record['ask_qty']) == (source['bid_qty'], source['ask_qty']), (name, symbol)
@@ -0,0 +1,38 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import daily_summary
+import publish_server
+import tick_storage
+
+
+def _write_day(data_dir, date, bid):
+    records = [{'exchange': 'Binance', 'symbol': 'BTC/USDT', 'timestamp': f'{date} 00:00:00', 'bid': bid,
+                'ask': bid + 1, 'bid_qty': 1.0, 'ask_qty': 1.0}]
+    tick_storage.append_records(date, records, data_dir)
+    tick_storage.atomic_write_json(daily_summary.summary_path(date, data_dir), {'date': date})
+
+
+def test_date_change_drops_previous_day(tmp_path):
+    data_dir = str(tmp_path)
+    _write_day(data_dir, '2025-01-01', 80000.0)
+    publisher = publish_server.Publisher(data_dir)
+    assert publisher.refresh()
+    first_etag = publisher.ticks_resource().etag
+    assert publisher.tick_batches
+
+    # Ertesi günün özeti yazıldı, henüz kayıt yok: önceki günün kayıtları yayınlanmamalı
+    tick_storage.atomic_write_json(daily_summary.summary_path('2025-01-02', data_dir), {'date': '2025-01-02'})
+    assert publisher.refresh()
+    assert json.loads(publisher.ticks_resource().body) == []
+    assert publisher.ticks_resource().etag != first_etag
+    assert not publisher.tick_batches
+    assert json.loads(publisher.summary.body) == {'date': '2025-01-02'}
+
+    _write_day(data_dir, '2025-01-02', 81000.0)
+    assert publisher.refresh()
+    assert [record['bid'] for record in json.loads(publisher.ticks_resource().body)] == [81000.0]
+    assert [json.loads(line)['bid'] for _, lines in publisher.tick_batches for line in lines] == [81000.0]
@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import quote_validator
+
+
+def _record(minute, mid, bid_qty=1.0):
+    return {'exchange': 'Binance', 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(1_750_000_000 + minute * 60)),
+            'bid': mid - 0.5, 'ask': mid + 0.5, 'bid_qty': bid_qty, 'ask_qty': 1.0}
+
+
+def _cron_run(data_dir, record):
+    # Her cron çalıştırması yeni bir süreçtir: bellekteki doğrulayıcılar bırakılır
+    quote_validator._validators.clear()
+    return quote_validator.screen([record], 'BTC/USDT', str(data_dir))
+
+
+def test_statistics_survive_between_one_shot_runs(tmp_path):
+    for minute in range(30):
+        assert _cron_run(tmp_path, _record(minute, 80000.0 + minute % 3, bid_qty=minute)) != []
+
+    assert os.path.exists(quote_validator.state_path(str(tmp_path)))
+    assert _cron_run(tmp_path, _record(30, 88000.0)) == []
+    assert _cron_run(tmp_path, _record(31, 80001.0, bid_qty=99)) != []
+
+
+def test_unchanged_quote_is_stale_across_runs(tmp_path):
+    results = [_cron_run(tmp_path, _record(minute, 80000.0)) for minute in range(3)]
+
+    assert [bool(result) for result in results] == [True, True, False]
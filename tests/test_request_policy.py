@@ -0,0 +1,87 @@
+import json
+import os
+import signal
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import depth
+import exchanges
+import http_session
+import replay_stub
+import request_policy
+
+
+def _cron_run(data_dir, latency=None, failed=False):
+    # Her cron çalıştırması yeni bir süreçtir: bellekteki politikalar bırakılır
+    request_policy.reset()
+    request_policy._last_save = None
+    request_policy.load_state(str(data_dir))
+    policy = request_policy.get_policy('Binance')
+    allowed = policy.allow()
+    if allowed:
+        if latency is not None:
+            policy.observe(latency)
+        if failed:
+            policy.record_failure()
+        else:
+            policy.record_success()
+    request_policy.save_state(str(data_dir))
+    return policy, allowed
+
+
+def test_latency_samples_survive_between_one_shot_runs(tmp_path):
+    for _ in range(request_policy.MIN_SAMPLES):
+        policy, _ = _cron_run(tmp_path, latency=0.5)
+
+    assert os.path.exists(request_policy.state_path(str(tmp_path)))
+    assert policy.timeout() == 0.5 * request_policy.TIMEOUT_MULTIPLIER
+    policy, _ = _cron_run(tmp_path)
+    assert len(policy.samples) == request_policy.MIN_SAMPLES
+
+
+def test_circuit_opens_across_runs_and_probes_after_wait(tmp_path):
+    results = [_cron_run(tmp_path, failed=True)[1] for _ in range(request_policy.FAILURE_THRESHOLD)]
+    assert results == [True] * request_policy.FAILURE_THRESHOLD
+
+    policy, allowed = _cron_run(tmp_path)
+    assert not allowed
+    assert policy.remaining_open() > request_policy.OPEN_SECONDS - 5
+
+    # Bekleme süresi önceki çalıştırmalarda dolmuş gibi açılma zamanını geri alın
+    policy.opened_at = time.monotonic() - request_policy.OPEN_SECONDS
+    request_policy.save_state(str(tmp_path))
+    policy, allowed = _cron_run(tmp_path)
+    assert allowed
+    assert policy.state == request_policy.CLOSED
+
+
+def test_depth_mode_persists_policy_state(tmp_path, monkeypatch):
+    request_policy.reset()
+    request_policy._last_save = None
+    record = {'exchange': 'Binance', 'timestamp': '2025-01-01 00:00:00', 'bid': 80000.0, 'ask': 80001.0,
+              'bid_qty': 1.0, 'ask_qty': 1.0}
+    server = replay_stub.start_server(replay_stub.FixtureStore([record]))
+    monkeypatch.setattr(exchanges, 'API_BASE_URLS', dict(exchanges.API_BASE_URLS))
+    monkeypatch.setattr(request_policy, 'STATE_NAME', request_policy.STATE_NAME)
+    replay_stub.use_server(server)
+    handlers = signal.getsignal(signal.SIGINT), signal.getsignal(signal.SIGTERM)
+    timer = threading.Timer(0.5, os.kill, (os.getpid(), signal.SIGTERM))
+    timer.start()
+    try:
+        depth.run_depth(levels=5, interval=0.1, venues=['Binance'], tick_deadline=5, data_dir=str(tmp_path))
+    finally:
+        timer.cancel()
+        signal.signal(signal.SIGINT, handlers[0])
+        signal.signal(signal.SIGTERM, handlers[1])
+        http_session.close_session()
+        http_session.configure_pools({})
+        server.shutdown()
+
+    path = os.path.join(str(tmp_path), 'request_policy_state_depth.json')
+    with open(path) as file:
+        state = json.load(file)
+    assert state['exchanges']['Binance']['samples']
+    request_policy.reset()
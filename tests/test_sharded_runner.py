@@ -0,0 +1,112 @@
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import candles
+import daily_summary
+import exchanges
+import quote_validator
+import replay_stub
+import request_policy
+import sharded_runner
+import tick_storage
+
+
+def test_spawned_worker_sees_parent_flags(monkeypatch):
+    monkeypatch.setattr(exchanges, 'DEBUG', True)
+    monkeypatch.setattr(request_policy, 'HEDGE_ENABLED', True)
+    monkeypatch.setattr(quote_validator, 'ENABLED', False)
+    settings = sharded_runner.worker_settings()
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(1, mp_context=context, initializer=sharded_runner.apply_settings,
+                             initargs=(settings,)) as pool:
+        assert pool.submit(sharded_runner.worker_settings).result(timeout=60) == {
+            'debug': True, 'hedge': True, 'validate': False}
+
+
+def test_worker_main_applies_debug_flag(tmp_path, capfd):
+    record = {'exchange': 'Binance', 'timestamp': '2025-01-01 00:00:00', 'bid': 80000.0, 'ask': 80001.0,
+              'bid_qty': 1.0, 'ask_qty': 1.0}
+    server = replay_stub.start_server(replay_stub.FixtureStore([record]))
+    try:
+        host, port = server.server_address[:2]
+        context = multiprocessing.get_context('spawn')
+        stop_event = context.Event()
+        process = context.Process(target=sharded_runner._worker_main, args=(0, [('Binance', ('BTC/USDT',))]), kwargs={
+            'interval': 0, 'tick_deadline': 10, 'start': time.time(), 'stop_event': stop_event,
+            'max_ticks': 1, 'data_dir': str(tmp_path), 'api_base': f'http://{host}:{port}',
+            'settings': {'debug': True, 'hedge': True, 'validate': True}})
+        process.start()
+        process.join(60)
+        assert process.exitcode == 0
+    finally:
+        server.shutdown()
+
+    assert "Binance API'sine istek gönderiliyor" in capfd.readouterr().out
+    segments = list(tmp_path.glob('segments/*/worker_0.ndjson'))
+    assert len(segments) == 1
+
+
+def _write_segment(data_dir, symbol, records):
+    path = sharded_runner.segment_path('2025-01-01', 0, tick_storage.symbol_dir(symbol, data_dir))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tick_storage.append_lines(path, records)
+
+
+def test_merge_keeps_symbols_in_separate_day_files(tmp_path):
+    data_dir = str(tmp_path)
+    btc = [{'exchange': name, 'symbol': 'BTC/USDT', 'timestamp': '2025-01-01 00:00:00',
+            'bid': bid, 'ask': bid + 1, 'bid_qty': 1.0, 'ask_qty': 1.0}
+           for name, bid in (('Binance', 80000.0), ('OKX', 79990.0))]
+    eth = [{'exchange': name, 'symbol': 'ETH/USDT', 'timestamp': '2025-01-01 00:00:00',
+            'bid': bid, 'ask': bid + 0.5, 'bid_qty': 1.0, 'ask_qty': 1.0}
+           for name, bid in (('Binance', 3000.0), ('OKX', 3001.0))]
+    _write_segment(data_dir, 'BTC/USDT', btc)
+    _write_segment(data_dir, 'ETH/USDT', eth)
+
+    assert sharded_runner.merge_all(data_dir) == 4
+
+    eth_dir = tick_storage.symbol_dir('ETH/USDT', data_dir)
+    assert [record['symbol'] for record in tick_storage.read_day('2025-01-01', data_dir)] == ['BTC/USDT'] * 2
+    assert [record['symbol'] for record in tick_storage.read_day('2025-01-01', eth_dir)] == ['ETH/USDT'] * 2
+    with open(daily_summary.summary_path('2025-01-01', data_dir)) as file:
+        btc_summary = json.load(file)
+    with open(daily_summary.summary_path('2025-01-01', eth_dir)) as file:
+        eth_summary = json.load(file)
+    assert btc_summary['arbitrage_opportunity'] == 80000.0 - 79991.0
+    assert eth_summary['arbitrage_opportunity'] == 3001.0 - 3000.5
+    assert os.path.exists(candles.checkpoint_path('2025-01-01', eth_dir))
+
+
+def test_worker_writes_segments_per_symbol(tmp_path):
+    prices = {'BTC/USDT': 80000.0, 'ETH/USDT': 3000.0}
+    records = [{'exchange': 'Coinbase', 'symbol': symbol, 'timestamp': '2025-01-01 00:00:00', 'bid': price,
+                'ask': price + 1, 'bid_qty': 1.0, 'ask_qty': 1.0} for symbol, price in prices.items()]
+    server = replay_stub.start_server(replay_stub.FixtureStore(records))
+    try:
+        host, port = server.server_address[:2]
+        context = multiprocessing.get_context('spawn')
+        stop_event = context.Event()
+        process = context.Process(target=sharded_runner._worker_main, kwargs={
+            'worker_id': 0, 'units': [('Coinbase', ('BTC/USDT',)), ('Coinbase', ('ETH/USDT',))],
+            'interval': 0, 'tick_deadline': 10, 'start': time.time(), 'stop_event': stop_event,
+            'max_ticks': 1, 'data_dir': str(tmp_path), 'api_base': f'http://{host}:{port}'})
+        process.start()
+        process.join(60)
+        assert process.exitcode == 0
+    finally:
+        server.shutdown()
+
+    sharded_runner.merge_all(str(tmp_path))
+    for symbol in ('BTC/USDT', 'ETH/USDT'):
+        symbol_dir = tick_storage.symbol_dir(symbol, str(tmp_path))
+        dates = [os.path.basename(path)[11:21] for path in os.listdir(symbol_dir) if path.startswith('btc_prices_')]
+        assert len(dates) == 1
+        assert [(record['symbol'], record['bid']) for record in tick_storage.read_day(dates[0], symbol_dir)] == \
+            [(symbol, prices[symbol])]
@@ -0,0 +1,239 @@
+"""
+Seyrek zaman indeksi ile ham kayıtlar üzerinde aralık sorguları
+
+Her günün NDJSON dosyası için data/tick_index_YYYY-MM-DD.json dosyasında
+seyrek bir indeks tutulur: dosya BLOCK_RECORDS satırlık bloklara bölünür ve
+her blok için bayt konumu, uzunluğu, en küçük/en büyük zaman damgası ve
+içerdiği borsalar saklanır. Sorgular yalnızca zaman aralığı ve borsa filtresiyle
+örtüşen blokların baytlarını okur; tüm günün ayrıştırılması gerekmez.
+
+Dosyalar yalnızca sona ekleme ile büyüdüğünden indeks her sorguda yalnızca
+son indekslenen konumdan sonraki baytları okuyarak güncellenir. Eski biçimdeki
+(JSON liste) ve sıkıştırılmış arşive taşınmış günler için indeks yoktur; bu
+günler tamamen okunup filtrelenir.
+"""
+import glob
+import json
+import os
+from datetime import date as date_cls, timedelta
+
+import fast_json
+import tick_storage
+
+# Bir indeks bloğundaki satır sayısı
+BLOCK_RECORDS = 256
+
+
+def index_path(date, data_dir=tick_storage.DATA_DIR):
+    """Günün indeks dosyasının yolunu döndürür"""
+    return os.path.join(data_dir, f'tick_index_{date}.json')
+
+
+def _scan_blocks(path, offset):
+    """
+    Dosyayı offset'ten itibaren okuyup blok listesi üretir
+
+    Returns:
+    tuple: (bloklar, tamamlanmış son satırın bittiği bayt konumu)
+    """
+    blocks = []
+    block = None
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        for line in file:
+            if not line.endswith(b'\n'):
+                break
+            if block is None:
+                block = {'offset': offset, 'length': 0, 'count': 0,
+                         'min_time': None, 'max_time': None, 'exchanges': []}
+            block['length'] += len(line)
+            block['count'] += 1
+            offset += len(line)
+            try:
+                record = fast_json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            timestamp = record.get('timestamp')
+            if timestamp:
+                if block['min_time'] is None or timestamp < block['min_time']:
+                    block['min_time'] = timestamp
+                if block['max_time'] is None or timestamp > block['max_time']:
+                    block['max_time'] = timestamp
+            if record.get('exchange') not in block['exchanges']:
+                block['exchanges'].append(record.get('exchange'))
+            if block['count'] == BLOCK_RECORDS:
+                blocks.append(block)
+                block = None
+    if block is not None:
+        blocks.append(block)
+    return blocks, offset
+
+
+def ensure_index(date, data_dir=tick_storage.DATA_DIR):
+    """
+    Günün indeksini döndürür; dosyaya indeksten sonra eklenen satırları indeksler
+
+    Returns:
+    dict: {'date', 'size', 'blocks'}; gün NDJSON biçiminde değilse None
+    """
+    path = tick_storage.ndjson_path(date, data_dir)
+    if not os.path.exists(path):
+        return None
+
+    size = os.path.getsize(path)
+    index = None
+    idx_path = index_path(date, data_dir)
+    if os.path.exists(idx_path):
+        try:
+            with open(idx_path, 'r') as file:
+                index = json.load(file)
+        except json.JSONDecodeError:
+            index = None
+
+    if index is None or index['size'] > size:
+        # İndeks yok ya da dosya yeniden yazılmış
+        index = {'date': date, 'size': 0, 'blocks': []}
+    if index['size'] == size:
+        return index
+
+    # Yarım kalan son blok yeni satırlarla birlikte yeniden indekslenir
+    start = index['size']
+    if index['blocks'] and index['blocks'][-1]['count'] < BLOCK_RECORDS:
+        start = index['blocks'].pop()['offset']
+    blocks, end = _scan_blocks(path, start)
+    index['blocks'].extend(blocks)
+    index['size'] = end
+    tick_storage.atomic_write_json(idx_path, index, indent=None)
+    return index
+
+
+def _read_block(file, block):
+    file.seek(block['offset'])
+    data = file.read(block['length'])
+    records = []
+    for line in data.splitlines():
+        try:
+            records.append(fast_json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return records
+
+
+def _matches(record, start, end, exchanges):
+    timestamp = record.get('timestamp') or ''
+    if start is not None and timestamp < start:
+        return False
+    if end is not None and timestamp > end:
+        return False
+    return exchanges is None or record.get('exchange') in exchanges
+
+
+def _block_matches(block, start, end, exchanges):
+    if block['min_time'] is None:
+        if start is not None or end is not None:
+            return False
+    elif (start is not None and block['max_time'] < start) or (end is not None and block['min_time'] > end):
+        return False
+    return exchanges is None or any(name in exchanges for name in block['exchanges'])
+
+
+def _archive_dir(data_dir):
+    return os.path.join(data_dir, 'columnar')
+
+
+def _full_day_records(date, data_dir):
+    """İndeksi olmayan günün tüm kayıtları: eski JSON dosyası veya sıkıştırılmış parça"""
+    if tick_storage.day_exists(date, data_dir):
+        return tick_storage.iter_records(date, data_dir)
+
+    import columnar_archive
+    archive_dir = _archive_dir(data_dir)
+    path = columnar_archive.find_chunk(date, archive_dir)
+    if path is None:
+        return []
+    return columnar_archive.columns_to_records(columnar_archive.ChunkColumns(path),
+                                               columnar_archive.load_dictionary(archive_dir))
+
+
+def query_day(date, start=None, end=None, exchanges=None, data_dir=tick_storage.DATA_DIR):
+    """Günün dosyasından zaman aralığı ve borsa filtresine uyan kayıtları döndürür"""
+    exchanges = set(exchanges) if exchanges else None
+    index = ensure_index(date, data_dir)
+    if index is None:
+        # Bayt konumu olmadığından tüm gün okunur
+        return [record for record in _full_day_records(date, data_dir)
+                if _matches(record, start, end, exchanges)]
+
+    records = []
+    with open(tick_storage.ndjson_path(date, data_dir), 'rb') as file:
+        for block in index['blocks']:
+            if _block_matches(block, start, end, exchanges):
+                records.extend(record for record in _read_block(file, block)
+                               if _matches(record, start, end, exchanges))
+    return records
+
+
+def available_dates(data_dir=tick_storage.DATA_DIR):
+    """Ham veri dosyası veya sıkıştırılmış parçası bulunan günleri sıralı olarak döndürür"""
+    dates = {os.path.basename(path).split('_')[-1].split('.')[0]
+             for path in glob.glob(os.path.join(data_dir, 'btc_prices_*'))}
+    dates.update(os.path.basename(path)[:10] for path in glob.glob(os.path.join(_archive_dir(data_dir), '*.chunk.*')))
+    return sorted(dates)
+
+
+def normalize_time(value, end=False):
+    """
+    'YYYY-MM-DD', 'YYYY-MM-DD HH:MM' veya 'YYYY-MM-DD HH:MM:SS' değerini tam
+    zaman damgasına tamamlar; end True ise aralığın sonu olarak yuvarlanır
+    """
+    value = value.replace('T', ' ').strip()
+    if len(value) == 10:
+        return value + (' 23:59:59' if end else ' 00:00:00')
+    if len(value) == 16:
+        return value + (':59' if end else ':00')
+    return value[:19]
+
+
+def query_range(start, end, exchanges=None, data_dir=tick_storage.DATA_DIR):
+    """
+    Zaman aralığındaki (her iki uç dahil, UTC) kayıtları zaman sırasıyla döndürür
+
+    Dosya adlarındaki gün yerel saate göre, zaman damgaları UTC olduğundan
+    aralığın bir gün öncesi ve sonrasındaki dosyalar da indeksle kontrol edilir.
+    """
+    start = normalize_time(start)
+    end = normalize_time(end, end=True)
+    first = (date_cls.fromisoformat(start[:10]) - timedelta(days=1)).isoformat()
+    last = (date_cls.fromisoformat(end[:10]) + timedelta(days=1)).isoformat()
+
+    records = []
+    for date in available_dates(data_dir):
+        if first <= date <= last:
+            records.extend(query_day(date, start, end, exchanges, data_dir))
+    records.sort(key=lambda record: record.get('timestamp') or '')
+    return records
+
+
+def latest(count, exchanges=None, data_dir=tick_storage.DATA_DIR):
+    """Filtreye uyan son count kaydı eskiden yeniye sırayla döndürür"""
+    exchanges = set(exchanges) if exchanges else None
+    collected = []
+    for date in reversed(available_dates(data_dir)):
+        index = ensure_index(date, data_dir)
+        if index is None:
+            day_records = [record for record in _full_day_records(date, data_dir)
+                           if _matches(record, None, None, exchanges)]
+            collected = day_records[-(count - len(collected)):] + collected
+        else:
+            with open(tick_storage.ndjson_path(date, data_dir), 'rb') as file:
+                for block in reversed(index['blocks']):
+                    if not _block_matches(block, None, None, exchanges):
+                        continue
+                    block_records = [record for record in _read_block(file, block)
+                                     if _matches(record, None, None, exchanges)]
+                    collected = block_records + collected
+                    if len(collected) >= count:
+                        break
+        if len(collected) >= count:
+            break
+    return collected[-count:] if count > 0 else []
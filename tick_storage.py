@@ -0,0 +1,341 @@
+"""
+Yalnızca ekleme yapan (append-only) günlük veri deposu
+
+Her tur, günün NDJSON dosyasına (data/btc_prices_YYYY-MM-DD.ndjson) satır başına
+bir kayıt olacak şekilde tek bir write çağrısıyla eklenir. Böylece tur başına iş
+günün o ana kadarki boyutundan bağımsızdır ve dosya hiçbir zaman baştan yazılmaz.
+Yarım kalmış bir yazma yalnızca son satırı bozabilir; bu satır bir sonraki
+açılışta kesilerek atılır.
+
+Eski biçimdeki (girintili JSON listesi) günlük dosyalar okunmaya devam eder ve
+export_json ile aynı biçimde yeniden üretilebilir.
+
+Bir veri klasöründeki günlük dosyalar tek bir sembolün kayıtlarını içerir:
+varsayılan sembol (BTC/USDT) veri klasörünün kendisinde, diğer semboller
+data/symbols/ETH-USDT gibi alt klasörlerde tutulur (symbol_dir).
+"""
+import glob
+import json
+import os
+import time
+
+import fast_json
+
+DATA_DIR = 'data'
+
+# Veri klasörünün kendisinde (btc_prices_* dosyaları) tutulan sembol
+DEFAULT_SYMBOL = 'BTC/USDT'
+SYMBOLS_DIR = 'symbols'
+
+# Bu süreçte kurtarma kontrolünden geçmiş dosyalar
+_recovered_paths = set()
+
+# Son biçimlendirilen saniye ve zaman damgası metni
+_timestamp_cache = (None, None)
+
+
+def symbol_dir(symbol, data_dir=DATA_DIR):
+    """
+    Sembolün veri klasörünü döndürür
+
+    Günlük dosya, özet, mumlar, indeks ve sütunlu arşiv bu klasörde tutulduğundan
+    bu modüller kayıtlardaki 'symbol' alanına bakmadan sembol bazında ayrılmış olur.
+    """
+    if symbol == DEFAULT_SYMBOL:
+        return data_dir
+    return os.path.join(data_dir, SYMBOLS_DIR, symbol.replace('/', '-'))
+
+
+def symbol_dirs(data_dir=DATA_DIR):
+    """Veri klasörünü ve içindeki sembol klasörlerini döndürür"""
+    return [data_dir] + sorted(path for path in glob.glob(os.path.join(data_dir, SYMBOLS_DIR, '*'))
+                               if os.path.isdir(path))
+
+
+def ndjson_path(date, data_dir=DATA_DIR):
+    """Günün NDJSON dosya yolunu döndürür"""
+    return os.path.join(data_dir, f'btc_prices_{date}.ndjson')
+
+
+def legacy_json_path(date, data_dir=DATA_DIR):
+    """Günün eski biçimdeki JSON dosya yolunu döndürür"""
+    return os.path.join(data_dir, f'btc_prices_{date}.json')
+
+
+def now_ms():
+    """Şu anki zamanı tamsayı epoch milisaniye olarak döndürür"""
+    return time.time_ns() // 1_000_000
+
+
+def format_timestamp(epoch_ms):
+    """
+    Epoch milisaniyeyi kayıtlardaki 'YYYY-MM-DD HH:MM:SS' (UTC) biçimine çevirir
+
+    Aynı saniyedeki kayıtlar için metin yeniden üretilmez.
+    """
+    global _timestamp_cache
+    second = epoch_ms // 1000
+    cached_second, text = _timestamp_cache
+    if cached_second != second:
+        text = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(second))
+        _timestamp_cache = (second, text)
+    return text
+
+
+def atomic_write_json(path, obj, indent=2):
+    """JSON verisini geçici dosyaya yazıp os.replace ile atomik olarak yerine koyar"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(obj, file, indent=indent)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def recover(path):
+    """
+    Yarım kalmış son satırı keserek dosyayı tutarlı hale getirir
+
+    Returns:
+    int: Atılan bayt sayısı
+    """
+    if not os.path.exists(path):
+        return 0
+
+    with open(path, 'rb+') as file:
+        size = file.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+        file.seek(size - 1)
+        if file.read(1) == b'\n':
+            return 0
+
+        # Son satır sonu karakterini geriye doğru bloklar halinde arayın
+        position = size
+        last_newline = -1
+        while position > 0 and last_newline < 0:
+            block_start = max(0, position - 4096)
+            file.seek(block_start)
+            block = file.read(position - block_start)
+            index = block.rfind(b'\n')
+            if index >= 0:
+                last_newline = block_start + index
+            position = block_start
+
+        new_size = last_newline + 1
+        file.truncate(new_size)
+
+    dropped = size - new_size
+    print(f"{path} dosyasında yarım kalmış {dropped} baytlık kayıt atıldı")
+    return dropped
+
+
+def _migrate_legacy(date, data_dir):
+    """Günün eski biçimdeki JSON dosyasını (varsa) NDJSON'a bir kez dönüştürür"""
+    legacy_path = legacy_json_path(date, data_dir)
+    path = ndjson_path(date, data_dir)
+    if not os.path.exists(legacy_path) or os.path.exists(path):
+        return
+
+    with open(legacy_path, 'r') as file:
+        try:
+            records = json.load(file)
+        except json.JSONDecodeError:
+            # Bozuk dosyayı silmeyin, yanına taşıyıp incelemeye bırakın
+            os.replace(legacy_path, f'{legacy_path}.corrupt')
+            print(f"{legacy_path} geçersiz JSON, {legacy_path}.corrupt olarak ayrıldı")
+            return
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as file:
+        file.write(''.join(_encode(record) for record in records))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    os.remove(legacy_path)
+    print(f"{legacy_path} dosyası {path} biçimine dönüştürüldü ({len(records)} kayıt)")
+
+
+def _encode(record):
+    """Kaydı tek satırlık JSON olarak kodlar"""
+    return json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def append_bytes(path, payload, fsync=False):
+    """
+    Önceden kodlanmış NDJSON satırlarını dosyanın sonuna tek write çağrısıyla ekler
+
+    Dosya bu süreçte ilk kez yazılıyorsa önce yarım kalmış son satır atılır.
+
+    Returns:
+    int: Yazmadan sonra dosyanın bayt cinsinden sonu
+    """
+    if path not in _recovered_paths:
+        recover(path)
+        _recovered_paths.add(path)
+    return append_raw(path, payload, fsync)
+
+
+def append_raw(path, payload, fsync=False):
+    """
+    Baytları dosyanın sonuna tek write çağrısıyla ekler (kurtarma kontrolü yapılmaz)
+
+    Returns:
+    int: Yazmadan sonra dosyanın bayt cinsinden sonu
+    """
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        # Tek write çağrısı: tur ya tamamen eklenir ya da yalnızca son satır yarım kalır
+        written = os.write(fd, payload)
+        while written < len(payload):
+            written += os.write(fd, payload[written:])
+        if fsync:
+            os.fsync(fd)
+        return os.lseek(fd, 0, os.SEEK_CUR)
+    finally:
+        os.close(fd)
+
+
+def append_lines(path, records, fsync=False):
+    """
+    Kayıtları bir NDJSON dosyasının sonuna tek write çağrısıyla ekler
+
+    Returns:
+    int: Yazmadan sonra dosyanın bayt cinsinden sonu
+    """
+    return append_bytes(path, ''.join(_encode(record) for record in records).encode('utf-8'), fsync)
+
+
+def _day_file(date, data_dir):
+    """Günün NDJSON dosya yolunu döndürür; gerekirse eski biçimdeki dosyayı dönüştürür"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = ndjson_path(date, data_dir)
+    if path not in _recovered_paths:
+        _migrate_legacy(date, data_dir)
+    return path
+
+
+def append_records(date, records, data_dir=DATA_DIR, fsync=False):
+    """
+    Kayıtları günün NDJSON dosyasına ekler
+
+    Parameters:
+    date (str): YYYY-MM-DD formatında gün
+    records (list): Eklenecek kayıtlar
+    data_dir (str): Veri klasörü
+    fsync (bool): True ise yazmadan sonra disk senkronizasyonu beklenir
+
+    Returns:
+    int: Yazmadan sonra dosyanın bayt cinsinden sonu (kayıt yoksa None)
+    """
+    if not records:
+        return None
+    return append_lines(_day_file(date, data_dir), records, fsync)
+
+
+def append_encoded(date, lines, data_dir=DATA_DIR, fsync=False):
+    """
+    Başka bir NDJSON dosyasından okunmuş satırları yeniden kodlamadan günün dosyasına ekler
+
+    Returns:
+    int: Yazmadan sonra dosyanın bayt cinsinden sonu (satır yoksa None)
+    """
+    if not lines:
+        return None
+    return append_bytes(_day_file(date, data_dir), b''.join(lines), fsync)
+
+
+def iter_lines(path, limit=None):
+    """
+    NDJSON dosyasındaki kayıtları sırayla döndürür
+
+    limit verilirse yalnızca dosyanın ilk limit baytı okunur.
+    """
+    position = 0
+    with open(path, 'rb') as file:
+        for line_number, line in enumerate(file, 1):
+            position += len(line)
+            if limit is not None and position > limit:
+                break
+            if not line.endswith(b'\n'):
+                # Yazılmakta olan ya da yarım kalmış son satır
+                break
+            try:
+                yield fast_json.loads(line)
+            except json.JSONDecodeError:
+                print(f"{path}:{line_number} okunamadı, satır atlandı")
+
+
+def iter_records(date, data_dir=DATA_DIR):
+    """Günün kayıtlarını sırayla döndürür (NDJSON veya eski JSON biçimi)"""
+    path = ndjson_path(date, data_dir)
+    if os.path.exists(path):
+        yield from iter_lines(path)
+        return
+
+    legacy_path = legacy_json_path(date, data_dir)
+    if os.path.exists(legacy_path):
+        with open(legacy_path, 'r') as file:
+            try:
+                records = json.load(file)
+            except json.JSONDecodeError:
+                print(f"{legacy_path} geçersiz JSON formatı")
+                return
+        yield from records
+
+
+def read_lines_from(path, offset):
+    """
+    NDJSON dosyasını verilen bayt konumundan itibaren okur
+
+    Returns:
+    tuple: (ham satırlar, kayıtlar, okunan son satırın bittiği bayt konumu);
+        okunamayan satırlar iki listede de yer almaz
+    """
+    lines = []
+    records = []
+    if not os.path.exists(path):
+        return lines, records, offset
+
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        for line in file:
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            try:
+                records.append(fast_json.loads(line))
+            except json.JSONDecodeError:
+                print(f"{path} dosyasında okunamayan satır atlandı")
+                continue
+            lines.append(line)
+    return lines, records, offset
+
+
+def read_from(date, offset, data_dir=DATA_DIR):
+    """
+    Günün NDJSON dosyasını verilen bayt konumundan itibaren okur
+
+    Returns:
+    tuple: (tamamlanmış satırlardaki kayıtlar, okunan son satırın bittiği bayt konumu)
+    """
+    _, records, offset = read_lines_from(ndjson_path(date, data_dir), offset)
+    return records, offset
+
+
+def read_day(date, data_dir=DATA_DIR):
+    """Günün tüm kayıtlarını eski JSON biçimiyle aynı liste yapısında döndürür"""
+    return list(iter_records(date, data_dir))
+
+
+def day_exists(date, data_dir=DATA_DIR):
+    """Gün için herhangi bir biçimde veri dosyası olup olmadığını döndürür"""
+    return os.path.exists(ndjson_path(date, data_dir)) or os.path.exists(legacy_json_path(date, data_dir))
+
+
+def export_json(date, output_path=None, data_dir=DATA_DIR):
+    """Günün verilerini eski btc_prices_YYYY-MM-DD.json biçiminde dışa aktarır"""
+    output_path = output_path or legacy_json_path(date, data_dir)
+    records = read_day(date, data_dir)
+    atomic_write_json(output_path, records)
+    return output_path
@@ -0,0 +1,398 @@
+"""
+WebSocket üzerinden en iyi alış/satış (BBO) akış modu
+
+REST ticker'larını dakikada bir sorgulamak yerine her borsanın BBO akışına
+abone olunur. Her borsa için bir adaptör vardır; adaptörler gelen mesajları
+get_*_data fonksiyonlarının döndürdüğü kayıt yapısına çevirir:
+
+    {'exchange', 'symbol', 'timestamp', 'bid', 'ask', 'bid_qty', 'ask_qty'}
+
+Bağlantı koptuğunda adaptör artan bekleme süreleriyle yeniden bağlanır ve
+aboneliklerini yeniler. Kayıtlar sınırlı bir asyncio kuyruğu üzerinden depolama
+yazıcısına gider; kuyruk dolduğunda adaptörler okumayı bekletir (backpressure).
+
+Bu mod isteğe bağlı 'websockets' paketini gerektirir. BTC_TRACKER_WS_BASE
+tanımlıysa tüm adaptörler bu adrese bağlanır; replay_server ile kaydedilmiş
+mesajlar yerel olarak yeniden oynatılabilir.
+"""
+import asyncio
+import json
+import os
+import signal
+import time
+import uuid
+from datetime import datetime
+
+import candles
+import daily_summary
+import fast_json
+import http_session
+import metrics
+import quote_validator
+import tick_storage
+
+try:
+    import websockets
+except ImportError:  # pragma: no cover - isteğe bağlı bağımlılık
+    websockets = None
+
+WS_BASE_OVERRIDE = os.environ.get('BTC_TRACKER_WS_BASE', '').rstrip('/')
+
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 60
+
+
+def _record(exchange, bid, ask, bid_qty, ask_qty):
+    """get_*_data çıktısıyla aynı yapıda kayıt oluşturur"""
+    return {
+        'exchange': exchange,
+        'symbol': tick_storage.DEFAULT_SYMBOL,
+        'timestamp': tick_storage.format_timestamp(tick_storage.now_ms()),
+        'bid': float(bid),
+        'ask': float(ask),
+        'bid_qty': float(bid_qty) if bid_qty is not None else None,
+        'ask_qty': float(ask_qty) if ask_qty is not None else None
+    }
+
+
+class ExchangeStream:
+    """Borsa akış adaptörlerinin temel sınıfı"""
+    name = None
+    url = None
+    path = None  # BTC_TRACKER_WS_BASE kullanıldığında bağlanılacak yol
+    heartbeat_interval = None
+    heartbeat_message = None
+
+    async def connect_url(self):
+        """Bağlanılacak WebSocket adresini döndürür"""
+        if WS_BASE_OVERRIDE:
+            return f'{WS_BASE_OVERRIDE}{self.path}'
+        return self.url
+
+    def subscribe_messages(self):
+        """Bağlantı kurulduktan sonra gönderilecek abonelik mesajları"""
+        return []
+
+    def parse(self, message):
+        """Ham mesajı kayda çevirir; kotasyon içermeyen mesajlar için None döndürür"""
+        raise NotImplementedError
+
+
+class BinanceStream(ExchangeStream):
+    name = 'Binance'
+    url = 'wss://stream.binance.com:9443/ws/btcusdt@bookTicker'
+    path = '/ws/btcusdt@bookTicker'
+
+    def parse(self, message):
+        data = fast_json.loads(message)
+        if 'b' not in data or 'a' not in data:
+            return None
+        return _record(self.name, data['b'], data['a'], data['B'], data['A'])
+
+
+class OKXStream(ExchangeStream):
+    name = 'OKX'
+    url = 'wss://ws.okx.com:8443/ws/v5/public'
+    path = '/ws/v5/public'
+    heartbeat_interval = 25
+    heartbeat_message = 'ping'
+
+    def subscribe_messages(self):
+        return [{'op': 'subscribe', 'args': [{'channel': 'bbo-tbt', 'instId': 'BTC-USDT'}]}]
+
+    def parse(self, message):
+        if message == 'pong':
+            return None
+        data = fast_json.loads(message)
+        if 'data' not in data or not data['data']:
+            return None
+        book = data['data'][0]
+        if not book.get('bids') or not book.get('asks'):
+            return None
+        bid, ask = book['bids'][0], book['asks'][0]
+        return _record(self.name, bid[0], ask[0], bid[1], ask[1])
+
+
+class CoinbaseStream(ExchangeStream):
+    name = 'Coinbase'
+    url = 'wss://ws-feed.exchange.coinbase.com'
+    path = '/coinbase'
+
+    def subscribe_messages(self):
+        return [{'type': 'subscribe', 'product_ids': ['BTC-USD'], 'channels': ['ticker']}]
+
+    def parse(self, message):
+        data = fast_json.loads(message)
+        if data.get('type') != 'ticker':
+            return None
+        return _record(self.name, data['best_bid'], data['best_ask'],
+                       data.get('best_bid_size'), data.get('best_ask_size'))
+
+
+class KrakenStream(ExchangeStream):
+    name = 'Kraken'
+    url = 'wss://ws.kraken.com/v2'
+    path = '/v2'
+
+    def subscribe_messages(self):
+        return [{'method': 'subscribe', 'params': {'channel': 'ticker', 'symbol': ['BTC/USD']}}]
+
+    def parse(self, message):
+        data = fast_json.loads(message)
+        if data.get('channel') != 'ticker' or not data.get('data'):
+            return None
+        ticker = data['data'][0]
+        return _record(self.name, ticker['bid'], ticker['ask'], ticker.get('bid_qty'), ticker.get('ask_qty'))
+
+
+class BybitStream(ExchangeStream):
+    name = 'Bybit'
+    url = 'wss://stream.bybit.com/v5/public/spot'
+    path = '/v5/public/spot'
+    heartbeat_interval = 20
+    heartbeat_message = {'op': 'ping'}
+
+    def __init__(self):
+        # orderbook.1 güncellemeleri yalnızca değişen tarafı içerir
+        self.bid = None
+        self.ask = None
+
+    def subscribe_messages(self):
+        self.bid = self.ask = None
+        return [{'op': 'subscribe', 'args': ['orderbook.1.BTCUSDT']}]
+
+    def parse(self, message):
+        data = fast_json.loads(message)
+        if not data.get('topic', '').startswith('orderbook.') or 'data' not in data:
+            return None
+        book = data['data']
+        if book.get('b'):
+            self.bid = book['b'][0]
+        if book.get('a'):
+            self.ask = book['a'][0]
+        if self.bid is None or self.ask is None:
+            return None
+        return _record(self.name, self.bid[0], self.ask[0], self.bid[1], self.ask[1])
+
+
+class KuCoinStream(ExchangeStream):
+    name = 'KuCoin'
+    path = '/kucoin'
+    bullet_url = 'https://api.kucoin.com/api/v1/bullet-public'
+    heartbeat_interval = 18
+
+    async def connect_url(self):
+        if WS_BASE_OVERRIDE:
+            return f'{WS_BASE_OVERRIDE}{self.path}'
+
+        # KuCoin her bağlantı için REST üzerinden geçici bir token verir
+        response = await asyncio.to_thread(http_session.get_session().post, self.bullet_url, timeout=10)
+        data = response.json()['data']
+        server = data['instanceServers'][0]
+        self.heartbeat_interval = server.get('pingInterval', 18000) / 1000
+        return f"{server['endpoint']}?token={data['token']}&connectId={uuid.uuid4().hex}"
+
+    @property
+    def heartbeat_message(self):
+        return {'id': str(int(time.time() * 1000)), 'type': 'ping'}
+
+    def subscribe_messages(self):
+        return [{'id': str(int(time.time() * 1000)), 'type': 'subscribe',
+                 'topic': '/market/ticker:BTC-USDT', 'privateChannel': False, 'response': True}]
+
+    def parse(self, message):
+        data = fast_json.loads(message)
+        if data.get('type') != 'message' or 'data' not in data:
+            return None
+        ticker = data['data']
+        return _record(self.name, ticker['bestBid'], ticker['bestAsk'],
+                       ticker.get('bestBidSize'), ticker.get('bestAskSize'))
+
+
+STREAM_ADAPTERS = {
+    adapter.name: adapter
+    for adapter in (BinanceStream, OKXStream, CoinbaseStream, KrakenStream, BybitStream, KuCoinStream)
+}
+
+
+def _encode_message(message):
+    return message if isinstance(message, str) else json.dumps(message)
+
+
+async def _heartbeat(websocket, adapter):
+    """Borsanın beklediği uygulama seviyesindeki ping mesajlarını gönderir"""
+    while True:
+        await asyncio.sleep(adapter.heartbeat_interval)
+        await websocket.send(_encode_message(adapter.heartbeat_message))
+
+
+async def run_adapter(adapter, queue, stop_event, recorder=None, min_interval=0):
+    """
+    Tek bir borsanın akışını okur; bağlantı koparsa yeniden bağlanıp abone olur
+
+    Parameters:
+    adapter (ExchangeStream): Borsa adaptörü
+    queue (asyncio.Queue): Kayıtların gönderileceği sınırlı kuyruk
+    stop_event (asyncio.Event): Durdurma sinyali
+    recorder (file): Verilirse ham mesajlar yeniden oynatma için bu dosyaya yazılır
+    min_interval (float): Aynı borsadan iki kayıt arasındaki asgari süre (saniye)
+    """
+    delay = RECONNECT_MIN_DELAY
+    last_emit = 0.0
+    while not stop_event.is_set():
+        heartbeat = None
+        try:
+            url = await adapter.connect_url()
+            print(f"{adapter.name} akışına bağlanılıyor: {url.split('?')[0]}")
+            async with websockets.connect(url, ping_interval=20, close_timeout=5) as websocket:
+                for message in adapter.subscribe_messages():
+                    await websocket.send(_encode_message(message))
+                if adapter.heartbeat_interval:
+                    heartbeat = asyncio.ensure_future(_heartbeat(websocket, adapter))
+
+                async for message in websocket:
+                    if recorder is not None:
+                        recorder.write(json.dumps({'path': adapter.path, 'frame': message}) + '\n')
+                    record = adapter.parse(message)
+                    if record is None:
+                        continue
+                    delay = RECONNECT_MIN_DELAY
+
+                    now = time.monotonic()
+                    if now - last_emit < min_interval:
+                        continue
+                    if not quote_validator.screen([record]):
+                        continue
+                    last_emit = now
+                    # Kuyruk doluysa burada beklenir; okuma yavaşlar ve yazıcı yetişir
+                    await queue.put(record)
+                    if stop_event.is_set():
+                        break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"{adapter.name} akış hatası: {e}")
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+
+        if stop_event.is_set():
+            break
+        print(f"{adapter.name} akışına {delay} sn sonra yeniden bağlanılacak")
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+
+def _persist(records):
+    """Kayıtları günün dosyasına ekleyip özeti günceller (iş parçacığında çalışır)"""
+    current_date = datetime.now().strftime('%Y-%m-%d')
+    with metrics.timer('tracker_stage_duration_seconds', stage='persist'):
+        end_offset = tick_storage.append_records(current_date, records)
+    metrics.inc('tracker_records_total', len(records))
+    with metrics.timer('tracker_stage_duration_seconds', stage='summarize'):
+        daily_summary.update_daily_summary(current_date, records, end_offset)
+    with metrics.timer('tracker_stage_duration_seconds', stage='rollup'):
+        candles.update_candles(current_date, records, end_offset)
+
+
+async def storage_writer(queue, stop_event, flush_interval=1.0, batch_size=500):
+    """Kuyruktaki kayıtları toplu halde depolama katmanına yazar"""
+    batch = []
+    deadline = time.monotonic() + flush_interval
+    while True:
+        timeout = max(0.0, deadline - time.monotonic())
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), timeout=timeout))
+        except asyncio.TimeoutError:
+            pass
+
+        if batch and (len(batch) >= batch_size or time.monotonic() >= deadline):
+            records, batch = batch, []
+            await asyncio.to_thread(_persist, records)
+        if time.monotonic() >= deadline:
+            deadline = time.monotonic() + flush_interval
+
+        if stop_event.is_set() and queue.empty():
+            break
+
+    if batch:
+        await asyncio.to_thread(_persist, batch)
+    print("Akış yazıcısı durduruldu, bekleyen kayıtlar diske yazıldı")
+
+
+async def run_stream(exchanges=None, flush_interval=1.0, queue_size=10000, min_interval=0, record_path=None):
+    """
+    Seçilen borsaların akışlarını başlatır ve durdurulana kadar çalışır
+
+    Parameters:
+    exchanges (list): Borsa adları (varsayılan: tümü)
+    flush_interval (float): Diske yazma aralığı (saniye)
+    queue_size (int): Adaptörlerle yazıcı arasındaki kuyruğun kapasitesi
+    min_interval (float): Borsa başına iki kayıt arasındaki asgari süre (saniye)
+    record_path (str): Verilirse ham mesajlar bu NDJSON dosyasına kaydedilir
+    """
+    if websockets is None:
+        raise RuntimeError("Akış modu için 'websockets' paketi gerekli: pip install websockets")
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    queue = asyncio.Queue(maxsize=queue_size)
+    recorder = open(record_path, 'a') if record_path else None
+    adapters = [STREAM_ADAPTERS[name]() for name in (exchanges or STREAM_ADAPTERS)]
+    print(f"Akış modu başlatıldı: {', '.join(adapter.name for adapter in adapters)}")
+
+    writer = asyncio.ensure_future(storage_writer(queue, stop_event, flush_interval))
+    readers = [asyncio.ensure_future(run_adapter(adapter, queue, stop_event, recorder, min_interval))
+               for adapter in adapters]
+    try:
+        await stop_event.wait()
+    finally:
+        stop_event.set()
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+        quote_validator.save_state()
+        await writer
+        if recorder is not None:
+            recorder.close()
+        print("Akış modu durduruldu")
+
+
+async def replay_server(record_path, host='127.0.0.1', port=8766, speed=None):
+    """
+    Kaydedilmiş mesajları yerel bir WebSocket sunucusundan yeniden oynatır
+
+    Her bağlantıya, bağlanılan yola (ör. /ws/btcusdt@bookTicker) ait kayıtlı
+    mesajlar sırayla gönderilir. Toplayıcı BTC_TRACKER_WS_BASE=ws://host:port
+    ile bu sunucuya yönlendirilebilir.
+
+    Parameters:
+    speed (float): Verilirse mesajlar arasında 1/speed saniye beklenir
+    """
+    if websockets is None:
+        raise RuntimeError("Yeniden oynatma için 'websockets' paketi gerekli: pip install websockets")
+
+    frames = {}
+    with open(record_path, 'r') as file:
+        for line in file:
+            entry = json.loads(line)
+            frames.setdefault(entry['path'], []).append(entry['frame'])
+
+    async def handler(websocket, path=None):
+        request = getattr(websocket, 'request', None)
+        path = request.path if request is not None else (path or websocket.path)
+        for frame in frames.get(path.split('?')[0], []):
+            await websocket.send(frame)
+            if speed:
+                await asyncio.sleep(1 / speed)
+        await websocket.wait_closed()
+
+    async with websockets.serve(handler, host, port):
+        print(f"Yeniden oynatma sunucusu ws://{host}:{port} adresinde çalışıyor")
+        await asyncio.Future()